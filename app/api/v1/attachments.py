@@ -1,10 +1,12 @@
 import logging
-from typing import Annotated, List
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Request
-from fastapi.responses import FileResponse
+from typing import Annotated, Dict, List, Optional
+from urllib.parse import quote
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Request, Response
+from fastapi.responses import FileResponse, RedirectResponse, StreamingResponse
 from sqlalchemy import select, delete
 from sqlalchemy.orm import joinedload
 
+from app.core.config import settings
 from app.core.dependencies import AsyncSessionDep, get_current_user
 from app.core.permissions import Action, check_sales_record_permissions, get_sales_record
 from app.models.user import User
@@ -13,8 +15,13 @@ from app.models.attachment import Attachment, AttachmentType
 from app.models.audit_log import AuditAction, AuditResourceType
 from app.schemas.attachment import AttachmentResponse, AttachmentCreate
 from app.services.audit_service import AuditService
-from app.utils.file_handler import file_handler
+from app.services.blob_service import BlobService
+from app.services.preview_service import preview_generator
+from app.storage import storage
+from app.utils.file_handler import FileSizeExceededError, file_handler
 from app.utils.logger import get_logger
+from app.utils.preview_renderer import PREVIEW_MEDIA_TYPE, can_preview
+from app.utils.zip_stream import ZipEntry, iter_zip, unique_arcname
 
 # 获取当前模块的logger
 logger = get_logger(__name__)
@@ -39,21 +46,92 @@ MAX_FILE_SIZE = 10 * 1024 * 1024
 MAX_ATTACHMENTS_PER_RECORD = 20
 
 
+def attachment_etag(attachment: Attachment, variant: Optional[str] = None) -> str:
+    """附件的ETag：文件按内容MD5存储，MD5即内容的强校验值；variant 区分预览图等派生内容"""
+    if variant:
+        return f'"{attachment.file_md5}-{variant}"'
+    return f'"{attachment.file_md5}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """判断 If-None-Match 请求头是否命中ETag（支持多个值、弱校验前缀和 *）"""
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or any(value.removeprefix("W/") == etag for value in candidates)
+
+
+def content_disposition(filename: str, disposition_type: str = "attachment") -> str:
+    """构建 Content-Disposition 响应头（非ASCII文件名按RFC 5987编码，与FileResponse一致）"""
+    quoted_filename = quote(filename)
+    if quoted_filename != filename:
+        return f"{disposition_type}; filename*=utf-8''{quoted_filename}"
+    return f'{disposition_type}; filename="{filename}"'
+
+
+def download_cache_headers(attachment: Attachment, variant: Optional[str] = None) -> Dict[str, str]:
+    """下载响应的缓存头：附件内容不会变化，允许浏览器长期缓存（需要登录，只允许私有缓存）"""
+    return {
+        "ETag": attachment_etag(attachment, variant),
+        "Cache-Control": f"private, max-age={settings.ATTACHMENT_CACHE_MAX_AGE}, immutable",
+    }
+
+
+# 打包下载时每种附件放在单独的目录中
+ARCHIVE_FOLDERS = {
+    AttachmentType.SALES.value: "销售附件",
+    AttachmentType.LOGISTICS.value: "后勤附件",
+}
+
+
+async def build_archive_entries(attachments: List[Attachment]) -> List[ZipEntry]:
+    """附件列表转为压缩包条目：按类型分目录，重名文件追加序号，跳过物理文件缺失的附件"""
+    entries = []
+    used_names = set()
+    for attachment in attachments:
+        if not await storage.exists(attachment.stored_filename):
+            logger.warning(f"打包时文件不存在，已跳过 - attachment_id: {attachment.id}, stored_filename: {attachment.stored_filename}")
+            continue
+        folder = ARCHIVE_FOLDERS.get(attachment.attachment_type, attachment.attachment_type)
+        # 文件名中的路径分隔符会在解压时变成目录，替换掉
+        filename = attachment.original_filename.replace("/", "_").replace("\\", "_")
+        entries.append(ZipEntry(
+            arcname=unique_arcname(f"{folder}/{filename}", used_names),
+            key=attachment.stored_filename,
+            content_type=attachment.content_type,
+            file_size=attachment.file_size,
+            modified_at=attachment.created_at
+        ))
+    return entries
+
+
+def schedule_previews(attachments: List[Attachment]) -> None:
+    """附件提交后在后台预生成预览图（队列已满时跳过，不等待）"""
+    for attachment in attachments:
+        preview_generator.schedule(attachment.stored_filename, attachment.content_type)
+
+
 async def validate_and_save_attachments(
     files: List[UploadFile],
     sales_record_id: int,
     attachment_type: str,
     db: AsyncSessionDep,
-    user_id: int
+    user_id: int,
+    release_connection: bool = False
 ) -> List[Attachment]:
     """
     验证并保存附件的内部函数
     
+    文件先放入存储（不持有锁），再在事务中按文件名加锁登记引用，持锁期间只确认对象存在，
+    不会在持有咨询锁时等待对象存储的上传。
+    
     - **files**: 上传的文件列表
     - **sales_record_id**: 销售记录ID
     - **attachment_type**: 附件类型 (sales/logistics)
     - **db**: 数据库会话
     - **user_id**: 用户ID（用于日志记录）
+    - **release_connection**: 会话中只有读操作时传True，放入存储前提交只读事务，
+      上传期间不占用连接池中的连接（会话中有未提交的写入时不能使用）
     
     Returns:
         List[Attachment]: 创建的附件对象列表
@@ -97,8 +175,8 @@ async def validate_and_save_attachments(
     
     # 验证所有文件
     for file in files:
-        # 检查文件大小
-        if file.size > MAX_FILE_SIZE:
+        # 检查文件大小（声明的大小，实际大小在保存时按读取的字节数检查）
+        if file.size is not None and file.size > MAX_FILE_SIZE:
             raise HTTPException(
                 status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
                 detail=f"文件 {file.filename} 太大，最大允许 {MAX_FILE_SIZE // (1024*1024)}MB"
@@ -111,16 +189,45 @@ async def validate_and_save_attachments(
                 detail=f"不支持的文件类型: {file.content_type}"
             )
     
+    if release_connection:
+        await db.commit()
+    
     # 保存文件并创建附件记录
     attachments = []
-    saved_files = []  # 跟踪已保存的文件，用于错误回滚
+    placed_files = []  # 跟踪已放入存储的文件，用于错误回滚
+    staged = []  # (上传文件, file_md5, 临时文件路径, file_size, stored_filename)
+    restaged = []  # 重新写入的临时文件
     
     try:
+        # 先把所有文件写入临时文件并计算MD5（不持有锁）
         for file in files:
-            # 保存文件
-            file_md5, stored_filename, file_size = await file_handler.save_upload_file(file)
-            saved_files.append(stored_filename)
-            
+            try:
+                file_md5, tmp_path, file_size = await file_handler.stage_upload_file(file, max_size=MAX_FILE_SIZE)
+            except FileSizeExceededError:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"文件 {file.filename} 太大，最大允许 {MAX_FILE_SIZE // (1024*1024)}MB"
+                )
+            stored_filename = file_handler.generate_stored_filename(file.filename, file_md5)
+            staged.append((file, file_md5, tmp_path, file_size, stored_filename))
+        
+        # 不持有锁时放入存储（已有相同文件时丢弃临时文件），对象按内容命名，重复放入没有影响
+        for file, file_md5, tmp_path, file_size, stored_filename in staged:
+            await storage.put_file(tmp_path, stored_filename, file.content_type, file_md5)
+            placed_files.append(stored_filename)
+        
+        # 登记文件引用。add_reference 持有按文件名的咨询锁直到事务提交，按文件名顺序加锁，
+        # 避免两个请求以相反顺序上传相同的文件时互相等待而死锁
+        for file, file_md5, tmp_path, file_size, stored_filename in sorted(staged, key=lambda item: item[4]):
+            await BlobService.add_reference(db, stored_filename, file_md5, file_size, file.content_type)
+            if not await storage.exists(stored_filename):
+                # 放入存储后、加锁前被并发的清理删除（很少发生），持锁重新写入
+                logger.info(f"文件在登记引用前被删除，重新写入 - {stored_filename}")
+                _, tmp_path, _ = await file_handler.stage_upload_file(file, max_size=MAX_FILE_SIZE)
+                restaged.append(tmp_path)
+                await storage.put_file(tmp_path, stored_filename, file.content_type, file_md5)
+        
+        for file, file_md5, tmp_path, file_size, stored_filename in staged:
             # 创建附件记录
             attachment_data = AttachmentCreate(
                 sales_record_id=sales_record_id,
@@ -144,19 +251,16 @@ async def validate_and_save_attachments(
     except Exception as e:
         logger.error(f"保存附件失败: {str(e)}", exc_info=True)
         
-        # 清理已保存的文件
-        for stored_filename in saved_files:
+        # 回滚文件引用，清理不再被引用的文件
+        await db.rollback()
+        for stored_filename in set(placed_files):
             try:
-                # 检查文件是否被其他记录引用
-                result = await db.execute(
-                    select(Attachment).where(Attachment.stored_filename == stored_filename)
-                )
-                if not result.scalar_one_or_none():
-                    file_handler.delete_file(stored_filename)
+                if await BlobService.purge_if_unreferenced(db, stored_filename):
                     logger.info(f"清理：删除未被引用的文件 - {stored_filename}")
                 else:
                     logger.info(f"清理：文件被其他记录引用，不删除 - {stored_filename}")
             except Exception as cleanup_error:
+                await db.rollback()
                 logger.warning(f"清理文件时出错: {cleanup_error}")
         
         # 重新抛出原始异常
@@ -167,6 +271,11 @@ async def validate_and_save_attachments(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"保存附件失败: {str(e)}"
             )
+    
+    finally:
+        # 未放入存储的临时文件（出错时）
+        for tmp_path in [item[2] for item in staged] + restaged:
+            file_handler.discard_staged_file(tmp_path)
 
 
 @router.post("/upload/{sales_record_id}", response_model=List[AttachmentResponse])
@@ -232,33 +341,38 @@ async def upload_attachments(
         )
     
     # 调用内部函数处理附件
-    attachments = await validate_and_save_attachments(files, sales_record_id, attachment_type, db, current_user.id)
+    attachments = await validate_and_save_attachments(
+        files, sales_record_id, attachment_type, db, current_user.id, release_connection=True
+    )
     
     try:
         await db.commit()
         for attachment in attachments:
             await db.refresh(attachment)
+        schedule_previews(attachments)
         
-        # 记录审计日志
-        try:
-            file_names = [att.original_filename for att in attachments]
-            await AuditService.log_action(
-                db=db,
-                user_id=current_user.id,
-                action=AuditAction.CREATE,
-                resource_type=AuditResourceType.ATTACHMENT,
-                resource_id=sales_record_id,
-                description=f"上传{attachment_type}附件",
-                details={
-                    "attachment_type": attachment_type,
-                    "file_count": len(attachments),
-                    "file_names": file_names,
-                    "sales_record_id": sales_record_id
-                },
-                request=request
-            )
-        except Exception as audit_error:
-            logger.warning(f"记录审计日志失败: {audit_error}")
+        # 记录审计日志（每个附件一条，与删除附件的日志一样可以按 stored_filename 查询）
+        for attachment in attachments:
+            try:
+                await AuditService.log_action(
+                    db=db,
+                    user_id=current_user.id,
+                    action=AuditAction.CREATE,
+                    resource_type=AuditResourceType.ATTACHMENT,
+                    resource_id=attachment.id,
+                    description=f"上传{attachment_type}附件",
+                    details={
+                        "attachment_id": attachment.id,
+                        "attachment_type": attachment_type,
+                        "original_filename": attachment.original_filename,
+                        "stored_filename": attachment.stored_filename,
+                        "file_size": attachment.file_size,
+                        "sales_record_id": sales_record_id
+                    },
+                    request=request
+                )
+            except Exception as audit_error:
+                logger.warning(f"记录审计日志失败: {audit_error}")
         
         logger.info(f"附件上传完成 - sales_record_id: {sales_record_id}, 附件类型: {attachment_type}, 成功上传 {len(attachments)} 个文件")
         return attachments
@@ -267,19 +381,15 @@ async def upload_attachments(
         logger.error(f"保存附件记录失败: {str(e)}", exc_info=True)
         await db.rollback()
         
-        # 清理已保存的文件
-        for attachment in attachments:
+        # 清理不再被引用的文件
+        for stored_filename in {attachment.stored_filename for attachment in attachments}:
             try:
-                # 检查文件是否被其他记录引用
-                result = await db.execute(
-                    select(Attachment).where(Attachment.stored_filename == attachment.stored_filename)
-                )
-                if not result.scalar_one_or_none():
-                    file_handler.delete_file(attachment.stored_filename)
-                    logger.info(f"回滚：删除未被引用的文件 - {attachment.stored_filename}")
+                if await BlobService.purge_if_unreferenced(db, stored_filename):
+                    logger.info(f"回滚：删除未被引用的文件 - {stored_filename}")
                 else:
-                    logger.info(f"回滚：文件被其他记录引用，不删除 - {attachment.stored_filename}")
+                    logger.info(f"回滚：文件被其他记录引用，不删除 - {stored_filename}")
             except Exception as cleanup_error:
+                await db.rollback()
                 logger.warning(f"清理文件时出错: {cleanup_error}")
         
         raise HTTPException(
@@ -325,17 +435,69 @@ async def get_attachments(
     return attachments
 
 
+@router.get("/{sales_record_id}/archive")
+@check_sales_record_permissions(Action.READ, lambda db, sales_record_id, **kwargs: get_sales_record(db, sales_record_id, **kwargs))
+async def download_attachments_archive(
+    sales_record_id: int,
+    db: AsyncSessionDep,
+    current_user: Annotated[User, Depends(get_current_user)],
+    attachment_type: str = None
+):
+    """
+    打包下载销售记录的附件（ZIP）
+
+    压缩包边读文件边生成并流式返回，不在服务器上生成完整的压缩包。
+
+    - **sales_record_id**: 销售记录ID
+    - **attachment_type**: 可选，只打包该类型的附件 (sales: 销售附件, logistics: 后勤附件)
+    """
+    logger.info(f"打包下载附件 - sales_record_id: {sales_record_id}, attachment_type: {attachment_type}, user_id: {current_user.id}")
+
+    query = select(Attachment).where(Attachment.sales_record_id == sales_record_id)
+    if attachment_type:
+        if attachment_type not in [AttachmentType.SALES.value, AttachmentType.LOGISTICS.value]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"无效的附件类型: {attachment_type}"
+            )
+        query = query.where(Attachment.attachment_type == attachment_type)
+    query = query.order_by(Attachment.attachment_type, Attachment.created_at)
+
+    attachments = (await db.execute(query)).scalars().all()
+    entries = await build_archive_entries(attachments)
+    if not entries:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="没有可下载的附件"
+        )
+
+    sales_record = await db.get(SalesRecord, sales_record_id)
+    archive_name = f"{sales_record.order_number}_附件.zip"
+    logger.info(f"开始打包附件 - sales_record_id: {sales_record_id}, 文件数: {len(entries)}")
+    return StreamingResponse(
+        iter_zip(entries, storage),
+        media_type="application/zip",
+        headers={"Content-Disposition": content_disposition(archive_name)}
+    )
+
+
 @router.get("/download/{attachment_id}")
 @check_sales_record_permissions(Action.READ, lambda db, attachment_id, **kwargs: get_attachment_sales_record(db, attachment_id))
 async def download_attachment(
     attachment_id: int,
     db: AsyncSessionDep,
-    current_user: Annotated[User, Depends(get_current_user)]
-) -> FileResponse:
+    current_user: Annotated[User, Depends(get_current_user)],
+    request: Request
+) -> Response:
     """
     下载附件
     
     - **attachment_id**: 附件ID
+    
+    响应带 ETag（文件MD5）和长期缓存头，请求带 If-None-Match 且未变化时返回304；
+    支持 Range 分段下载。配置 ATTACHMENT_ACCEL_REDIRECT_PREFIX 后只返回
+    X-Accel-Redirect 响应头，文件内容由nginx直接发送。
+    使用对象存储（STORAGE_BACKEND=s3）时重定向到预签名URL。
     """
     logger.info(f"下载附件 - attachment_id: {attachment_id}, user_id: {current_user.id}")
     
@@ -352,22 +514,109 @@ async def download_attachment(
             detail="附件不存在"
         )
     
+    # 浏览器缓存的内容仍然有效
+    headers = download_cache_headers(attachment)
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
     # 检查文件是否存在
-    if not file_handler.file_exists(attachment.stored_filename):
+    file_path = storage.local_path(attachment.stored_filename)
+    if file_path is None and not await storage.exists(attachment.stored_filename):
         logger.error(f"文件不存在 - stored_filename: {attachment.stored_filename}")
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="文件不存在"
         )
     
-    file_path = file_handler.get_file_path(attachment.stored_filename)
-    
     logger.info(f"开始下载文件 - 原文件名: {attachment.original_filename}, 存储文件名: {attachment.stored_filename}")
     
+    if file_path is None:
+        # 文件在对象存储中：重定向到预签名URL，由对象存储直接发送（同样支持Range）
+        url = await storage.presigned_url(attachment.stored_filename, attachment.original_filename, attachment.content_type)
+        if url:
+            return RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT, headers={"Cache-Control": "no-store"})
+        # 未开启预签名下载时由应用转发
+        headers["Content-Disposition"] = content_disposition(attachment.original_filename)
+        headers["Content-Length"] = str(attachment.file_size)
+        return StreamingResponse(
+            storage.iter_chunks(attachment.stored_filename),
+            media_type=attachment.content_type,
+            headers=headers
+        )
+    
+    if settings.ATTACHMENT_ACCEL_REDIRECT_PREFIX:
+        # 交给nginx发送文件（nginx同样支持Range）
+        relative_path = file_path.relative_to(file_handler.upload_dir).as_posix()
+        headers["X-Accel-Redirect"] = settings.ATTACHMENT_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + quote(relative_path)
+        headers["Content-Disposition"] = content_disposition(attachment.original_filename)
+        return Response(headers=headers, media_type=attachment.content_type)
+    
+    # FileResponse 处理 Range / If-Range（使用这里设置的ETag）
     return FileResponse(
         path=str(file_path),
         filename=attachment.original_filename,
-        media_type=attachment.content_type
+        media_type=attachment.content_type,
+        headers=headers
+    )
+
+
+@router.get("/preview/{attachment_id}")
+@check_sales_record_permissions(Action.READ, lambda db, attachment_id, **kwargs: get_attachment_sales_record(db, attachment_id))
+async def preview_attachment(
+    attachment_id: int,
+    db: AsyncSessionDep,
+    current_user: Annotated[User, Depends(get_current_user)],
+    request: Request
+) -> Response:
+    """
+    获取附件预览图（JPEG）
+    
+    - **attachment_id**: 附件ID
+    
+    图片返回缩略图，PDF返回第一页，最长边为 PREVIEW_MAX_SIZE 像素。
+    预览图在上传后后台预生成，没有时在本次请求中生成并缓存；不支持预览的类型返回415。
+    """
+    result = await db.execute(
+        select(Attachment).where(Attachment.id == attachment_id)
+    )
+    attachment = result.scalar_one_or_none()
+    
+    if not attachment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="附件不存在"
+        )
+    
+    if not can_preview(attachment.content_type):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"该文件类型不支持预览: {attachment.content_type}"
+        )
+    
+    headers = download_cache_headers(attachment, f"preview-{preview_generator.max_size}")
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    try:
+        preview_path = await preview_generator.get_preview(attachment.stored_filename, attachment.content_type)
+    except Exception as e:
+        logger.error(f"生成预览图失败 - stored_filename: {attachment.stored_filename}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="生成预览图失败"
+        )
+    
+    if preview_path is None:
+        logger.error(f"文件不存在 - stored_filename: {attachment.stored_filename}")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="文件不存在"
+        )
+    
+    return FileResponse(
+        path=str(preview_path),
+        media_type=PREVIEW_MEDIA_TYPE,
+        headers=headers
     )
 
 
@@ -437,16 +686,13 @@ async def delete_attachment(
     original_filename = attachment.original_filename
     
     try:
-        # 删除数据库记录
+        # 删除数据库记录，同一事务中释放文件引用
         await db.execute(delete(Attachment).where(Attachment.id == attachment_id))
+        await BlobService.release_reference(db, stored_filename)
         await db.commit()
         
         # 删除文件（如果没有其他记录引用此文件）
-        result = await db.execute(
-            select(Attachment).where(Attachment.stored_filename == stored_filename)
-        )
-        if not result.scalar_one_or_none():
-            file_handler.delete_file(stored_filename)
+        if await BlobService.purge_if_unreferenced(db, stored_filename):
             logger.info(f"文件已删除 - stored_filename: {stored_filename}")
         else:
             logger.info(f"文件仍被其他记录引用，不删除 - stored_filename: {stored_filename}")
@@ -464,6 +710,7 @@ async def delete_attachment(
                     "attachment_id": attachment_id,
                     "attachment_type": attachment.attachment_type,
                     "original_filename": original_filename,
+                    "stored_filename": stored_filename,
                     "sales_record_id": attachment.sales_record_id
                 },
                 request=request
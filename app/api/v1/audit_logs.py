@@ -1,21 +1,26 @@
-from typing import List, Optional, Annotated
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select, func, and_
+from datetime import datetime, time, timedelta, timezone
+from typing import Any, Dict, List, Optional, Annotated
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.dependencies import AsyncSessionDep, get_current_user
+from app.models.audit_log import AuditAction, AuditResourceType
 from app.models.user import User, UserRole
 from app.schemas.audit_log import AuditLogQuery, AuditLogResponse
-from app.services.audit_service import AuditService
+from app.services.audit_service import EXPORT_FORMATS, AuditService, parse_detail_filters
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 router = APIRouter()
 
+# 审计日志列表支持的总数计算方式
+TOTAL_MODES = ("exact", "estimated", "none")
 
-@router.get("", response_model=dict)
-async def get_audit_logs(
+
+async def get_audit_log_filters(
     db: AsyncSessionDep,
     current_user: Annotated[User, Depends(get_current_user)],
     user_id: Optional[int] = Query(None, description="用户ID"),
@@ -24,10 +29,103 @@ async def get_audit_logs(
     resource_type: Optional[str] = Query(None, description="资源类型"),
     resource_id: Optional[int] = Query(None, description="资源ID"),
     success: Optional[bool] = Query(None, description="操作是否成功"),
+    detail: Optional[List[str]] = Query(None, description="详细信息过滤，格式 key=value，可重复，例如 sales_record_id=123"),
     start_date: Optional[str] = Query(None, description="开始时间 (YYYY-MM-DD)"),
-    end_date: Optional[str] = Query(None, description="结束时间 (YYYY-MM-DD)"),
+    end_date: Optional[str] = Query(None, description="结束时间 (YYYY-MM-DD)")
+) -> Dict[str, Any]:
+    """
+    解析审计日志过滤条件并应用权限规则（列表和导出共用）
+    
+    普通用户只能查看自己的操作记录，通过电话号码查询其他用户仅限管理员和高级用户。
+    
+    Returns:
+        AuditLogQuery 的过滤字段
+    """
+    # 权限检查
+    if current_user.role not in [UserRole.ADMIN.value, UserRole.SENIOR.value]:
+        # 普通用户只能查看自己的记录
+        if user_id is not None and user_id != current_user.id:
+            raise HTTPException(
+                status_code=403,
+                detail="普通用户只能查看自己的操作记录"
+            )
+        user_id = current_user.id
+    
+    # 通过电话号码查询用户ID
+    if phone is not None:
+        # 只有管理员和高级用户可以通过电话号码查询其他用户
+        if current_user.role not in [UserRole.ADMIN.value, UserRole.SENIOR.value]:
+            raise HTTPException(
+                status_code=403,
+                detail="普通用户不能通过电话号码查询其他用户的记录"
+            )
+        
+        # 查询用户
+        stmt = select(User).where(User.phone == phone)
+        result = await db.execute(stmt)
+        target_user = result.scalar_one_or_none()
+        
+        if target_user is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"未找到电话号码为 {phone} 的用户"
+            )
+        
+        user_id = target_user.id
+    
+    # 解析日期
+    start_datetime = None
+    end_datetime = None
+    if start_date:
+        try:
+            start_datetime = datetime.strptime(start_date, "%Y-%m-%d")
+        except ValueError:
+            raise HTTPException(
+                status_code=400,
+                detail="开始时间格式错误，请使用 YYYY-MM-DD 格式"
+            )
+    
+    if end_date:
+        try:
+            end_datetime = datetime.combine(
+                datetime.strptime(end_date, "%Y-%m-%d").date(),
+                time(23, 59, 59)
+            )
+        except ValueError:
+            raise HTTPException(
+                status_code=400,
+                detail="结束时间格式错误，请使用 YYYY-MM-DD 格式"
+            )
+    
+    # 解析详细信息过滤条件
+    try:
+        details = parse_detail_filters(detail) if detail else None
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+    
+    return {
+        "user_id": user_id,
+        "action": action,
+        "resource_type": resource_type,
+        "resource_id": resource_id,
+        "success": success,
+        "details": details,
+        "start_date": start_datetime,
+        "end_date": end_datetime
+    }
+
+
+@router.get("", response_model=dict)
+async def get_audit_logs(
+    db: AsyncSessionDep,
+    filters: Annotated[Dict[str, Any], Depends(get_audit_log_filters)],
     page: int = Query(1, ge=1, description="页码"),
-    size: int = Query(20, ge=1, le=100, description="每页数量")
+    size: int = Query(20, ge=1, le=100, description="每页数量"),
+    cursor: Optional[str] = Query(None, description="分页游标（取自上一页的 next_cursor），传入后忽略页码"),
+    total_mode: str = Query("exact", description="总数计算方式：exact 精确 / estimated 估算 / none 不计算")
 ):
     """
     获取审计日志列表
@@ -36,90 +134,51 @@ async def get_audit_logs(
     普通用户只能查看自己的操作记录
     
     支持通过电话号码查询用户的审计记录（仅管理员和高级用户）
+    
+    按时间倒序返回。除页码分页外支持游标分页：响应中的 next_cursor 传给下一次请求的
+    cursor 参数，翻页耗时不随页数增加。total_mode=estimated 时总数超过上限后返回估算值
+    （total_is_estimate 为 true），none 时不计算总数。
+    
+    detail 按详细信息中的键值过滤（JSONB包含查询），例如
+    detail=sales_record_id=123 查询涉及该销售记录的所有操作，
+    detail=stored_filename=xxx.pdf 查询涉及该存储文件的附件操作。
     """
     try:
-        # 权限检查
-        if current_user.role not in [UserRole.ADMIN.value, UserRole.SENIOR.value]:
-            # 普通用户只能查看自己的记录
-            if user_id is not None and user_id != current_user.id:
-                raise HTTPException(
-                    status_code=403,
-                    detail="普通用户只能查看自己的操作记录"
-                )
-            user_id = current_user.id
-        
-        # 通过电话号码查询用户ID
-        if phone is not None:
-            # 只有管理员和高级用户可以通过电话号码查询其他用户
-            if current_user.role not in [UserRole.ADMIN.value, UserRole.SENIOR.value]:
-                raise HTTPException(
-                    status_code=403,
-                    detail="普通用户不能通过电话号码查询其他用户的记录"
-                )
-            
-            # 查询用户
-            stmt = select(User).where(User.phone == phone)
-            result = await db.execute(stmt)
-            target_user = result.scalar_one_or_none()
-            
-            if target_user is None:
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"未找到电话号码为 {phone} 的用户"
-                )
-            
-            user_id = target_user.id
-        
-        # 解析日期
-        start_datetime = None
-        end_datetime = None
-        if start_date:
-            try:
-                from datetime import datetime
-                start_datetime = datetime.strptime(start_date, "%Y-%m-%d")
-            except ValueError:
-                raise HTTPException(
-                    status_code=400,
-                    detail="开始时间格式错误，请使用 YYYY-MM-DD 格式"
-                )
-        
-        if end_date:
-            try:
-                from datetime import datetime, time
-                end_datetime = datetime.combine(
-                    datetime.strptime(end_date, "%Y-%m-%d").date(),
-                    time(23, 59, 59)
-                )
-            except ValueError:
-                raise HTTPException(
-                    status_code=400,
-                    detail="结束时间格式错误，请使用 YYYY-MM-DD 格式"
-                )
+        if total_mode not in TOTAL_MODES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"无效的总数计算方式: {total_mode}"
+            )
         
         # 构建查询参数
         query = AuditLogQuery(
-            user_id=user_id,
-            action=action,
-            resource_type=resource_type,
-            resource_id=resource_id,
-            success=success,
-            start_date=start_datetime,
-            end_date=end_datetime,
+            **filters,
             page=page,
-            size=size
+            size=size,
+            cursor=cursor,
+            total_mode=total_mode
         )
         
         # 查询审计日志
-        audit_logs, total = await AuditService.get_audit_logs(db, query)
+        try:
+            result = await AuditService.get_audit_logs(db, query)
+        except ValueError:
+            raise HTTPException(
+                status_code=400,
+                detail="无效的游标"
+            )
+        total = result["total"]
         
         return {
             "success": True,
             "data": {
-                "items": audit_logs,
+                "items": result["items"],
                 "total": total,
+                "total_is_estimate": result["total_is_estimate"],
                 "page": page,
                 "size": size,
-                "pages": (total + size - 1) // size
+                "pages": (total + size - 1) // size if total is not None else None,
+                "next_cursor": result["next_cursor"]
             }
         }
         
@@ -133,6 +192,50 @@ async def get_audit_logs(
         )
 
 
+@router.get("/export")
+async def export_audit_logs(
+    db: AsyncSessionDep,
+    current_user: Annotated[User, Depends(get_current_user)],
+    filters: Annotated[Dict[str, Any], Depends(get_audit_log_filters)],
+    request: Request,
+    format: str = Query("jsonl", description="导出格式：jsonl/csv")
+):
+    """
+    导出审计日志（gzip压缩的 JSONL 或 CSV）
+    
+    过滤条件和权限规则与审计日志列表相同，按时间正序输出全部符合条件的记录。
+    数据通过服务端游标分批读取、边压缩边发送，内存占用与导出的时间范围无关。
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"无效的导出格式: {format}"
+        )
+    query = AuditLogQuery(**filters)
+    
+    # 导出本身也记录审计日志
+    try:
+        await AuditService.log_action(
+            db=db,
+            user_id=current_user.id,
+            action=AuditAction.DOWNLOAD,
+            resource_type=AuditResourceType.SYSTEM,
+            description=f"导出审计日志（{format}）",
+            details={key: value for key, value in filters.items() if value is not None},
+            request=request
+        )
+    except Exception as audit_error:
+        logger.warning(f"记录审计日志失败: {audit_error}")
+    
+    filename = f"audit_logs_{datetime.now(timezone.utc):%Y%m%d%H%M%S}.{format}.gz"
+    logger.info(f"导出审计日志 - user_id: {current_user.id}, format: {format}, filters: {filters}")
+    return StreamingResponse(
+        AuditService.export_audit_logs(query, format),
+        media_type="application/gzip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
 @router.get("/recent", response_model=List[AuditLogResponse])
 async def get_recent_actions(
     db: AsyncSessionDep,
@@ -169,6 +272,8 @@ async def get_audit_stats(
     获取审计统计信息
     
     只有管理员和高级用户可以查看统计信息
+    
+    返回汇总、按操作类型/资源类型的数量，以及每日操作趋势（daily，UTC日期）
     """
     try:
         # 权限检查
@@ -178,77 +283,12 @@ async def get_audit_stats(
                 detail="权限不足，只有管理员和高级用户可以查看统计信息"
             )
         
-        from datetime import datetime, timedelta
-        from app.models.audit_log import AuditLog
-        
-        # 计算时间范围
-        end_date = datetime.now()
+        # 计算时间范围（UTC）
+        end_date = datetime.now(timezone.utc)
         start_date = end_date - timedelta(days=days)
         
-        # 总操作数
-        total_operations_result = await db.execute(
-            select(func.count(AuditLog.id)).filter(
-                and_(
-                    AuditLog.created_at >= start_date,
-                    AuditLog.created_at <= end_date
-                )
-            )
-        )
-        total_operations = total_operations_result.scalar()
-        
-        # 成功操作数
-        successful_operations_result = await db.execute(
-            select(func.count(AuditLog.id)).filter(
-                and_(
-                    AuditLog.created_at >= start_date,
-                    AuditLog.created_at <= end_date,
-                    AuditLog.success == True
-                )
-            )
-        )
-        successful_operations = successful_operations_result.scalar()
-        
-        # 失败操作数
-        failed_operations = total_operations - successful_operations
-        
-        # 按操作类型统计
-        action_stats_result = await db.execute(
-            select(AuditLog.action, func.count(AuditLog.id).label('count'))
-            .filter(
-                and_(
-                    AuditLog.created_at >= start_date,
-                    AuditLog.created_at <= end_date
-                )
-            )
-            .group_by(AuditLog.action)
-        )
-        action_stats = action_stats_result.all()
-        
-        # 按资源类型统计
-        resource_stats_result = await db.execute(
-            select(AuditLog.resource_type, func.count(AuditLog.id).label('count'))
-            .filter(
-                and_(
-                    AuditLog.created_at >= start_date,
-                    AuditLog.created_at <= end_date
-                )
-            )
-            .group_by(AuditLog.resource_type)
-        )
-        resource_stats = resource_stats_result.all()
-        
-        # 活跃用户统计
-        active_users_result = await db.execute(
-            select(func.count(func.distinct(AuditLog.user_id)))
-            .filter(
-                and_(
-                    AuditLog.created_at >= start_date,
-                    AuditLog.created_at <= end_date,
-                    AuditLog.user_id.isnot(None)
-                )
-            )
-        )
-        active_users = active_users_result.scalar()
+        # 汇总、按操作类型/资源类型统计和每日趋势在一次扫描中完成
+        stats = await AuditService.get_audit_stats(db, start_date, end_date)
         
         return {
             "period": {
@@ -256,15 +296,7 @@ async def get_audit_stats(
                 "end_date": end_date.isoformat(),
                 "days": days
             },
-            "summary": {
-                "total_operations": total_operations,
-                "successful_operations": successful_operations,
-                "failed_operations": failed_operations,
-                "success_rate": round(successful_operations / total_operations * 100, 2) if total_operations > 0 else 0,
-                "active_users": active_users
-            },
-            "action_stats": {action: count for action, count in action_stats},
-            "resource_stats": {resource_type: count for resource_type, count in resource_stats}
+            **stats
         }
         
     except HTTPException:
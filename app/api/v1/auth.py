@@ -9,8 +9,8 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.core.security import create_access_token, get_password_hash, verify_password
-from app.core.dependencies import AsyncSessionDep, get_current_user, get_current_active_senior_or_admin
+from app.core.security import create_access_token, get_password_hash_async, verify_password_async
+from app.core.dependencies import AsyncSessionDep, get_current_user, get_current_active_senior_or_admin, invalidate_user_cache
 from app.models.user import User, UserFunction, UserRole
 from app.models.audit_log import AuditAction, AuditResourceType
 from app.schemas.user import UserCreate, UserResponse, PasswordReset, UserInfoUpdate
@@ -43,7 +43,7 @@ async def login(
     )
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(form_data.password, user.password_hash):
+    if not user or not await verify_password_async(form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="手机号或密码错误",
@@ -167,7 +167,7 @@ async def register(
     user = User(
         phone=user_in.phone,
         email=user_in.email,
-        password_hash=get_password_hash(user_in.password),
+        password_hash=await get_password_hash_async(user_in.password),
         full_name=user_in.full_name,
         role=user_in.role,
         function=user_in.function,
@@ -250,8 +250,9 @@ async def reset_password(
         )
     
     # 更新密码
-    user.password_hash = get_password_hash(reset_data.new_password)
+    user.password_hash = await get_password_hash_async(reset_data.new_password)
     await db.commit()
+    await invalidate_user_cache(user.id)
     
     # 记录审计日志
     try:
@@ -269,7 +270,8 @@ async def reset_password(
             resource_id=user.id,
             description=f"重置密码: {user.full_name} ({user.phone})",
             details=audit_details,
-            request=request
+            request=request,
+            sync=True  # 用户账号变更的审计在响应前落库
         )
     except Exception as audit_error:
         # 审计失败不应该影响密码重置
@@ -383,6 +385,7 @@ async def update_user_info(
         user.is_active = user_update.is_active
     
     await db.commit()
+    await invalidate_user_cache(user.id)
     await db.refresh(user)
     
     # 记录审计日志
@@ -414,7 +417,8 @@ async def update_user_info(
             resource_id=user.id,
             description=f"更新用户信息: {user.full_name} ({user.phone})",
             details=audit_details,
-            request=request
+            request=request,
+            sync=True  # 用户账号变更的审计在响应前落库
         )
     except Exception as audit_error:
         # 审计失败不应该影响用户信息更新
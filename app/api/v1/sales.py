@@ -1,8 +1,9 @@
 import logging
 from typing import Annotated, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Form, Request
-from sqlalchemy import select, or_
-from sqlalchemy.orm import joinedload
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Form, Request, Response
+from sqlalchemy import Float, select, or_, func, literal, true
+from sqlalchemy.orm import joinedload, selectinload
+from pydantic import TypeAdapter
 from datetime import datetime, UTC
 
 from app.core.dependencies import AsyncSessionDep, get_current_user
@@ -16,19 +17,114 @@ from app.models.procurement import Procurement
 from app.schemas.sales_record import (
     SalesRecordCreate,
     SalesRecordUpdate,
-    SalesRecordResponse
+    SalesRecordResponse,
+    SalesRecordSummary
 )
 from app.utils.logger import get_logger
+from app.utils.pagination import encode_cursor, decode_cursor
 from app.services.audit_service import AuditService
+from app.services.blob_service import BlobService
+from app.services.sales_rollup_service import SalesRollupService
+from app.services.stats_service import StatsService
 
 # 导入附件处理函数
-from app.api.v1.attachments import validate_and_save_attachments
+from app.api.v1.attachments import schedule_previews, validate_and_save_attachments
 
 # 获取当前模块的logger
 logger = get_logger(__name__)
 
 router = APIRouter(prefix="/sales", tags=["销售记录"])
 
+# 销售记录的预加载选项
+# 多对一关系（创建人、审核人）用joinedload随主查询一起取回；
+# 一对多集合（附件、运费、采购）用selectinload按主键批量IN查询，
+# 避免多个集合JOIN在一起产生笛卡尔积（20附件 x 10运费 x 10采购 = 每个订单2000行）
+SALES_RECORD_LOAD_OPTIONS = (
+    joinedload(SalesRecord.user),
+    joinedload(SalesRecord.logistics_approved_by),
+    joinedload(SalesRecord.final_approved_by),
+    selectinload(SalesRecord.attachments),
+    selectinload(SalesRecord.shipping_fees),
+    selectinload(SalesRecord.procurement),
+)
+
+# 列表摘要视图的序列化器（直接从查询行生成JSON，不构建ORM对象）
+SALES_RECORD_SUMMARY_LIST = TypeAdapter(List[SalesRecordSummary])
+
+
+def build_sales_summary_query():
+    """构建销售记录摘要查询
+
+    只取销售记录的标量列和创建人姓名，附件数量、运费/采购的数量与合计
+    通过关联子查询在数据库中计算，一页数据只需一条查询。
+    聚合子查询总会返回一行，所以LATERAL用内连接不会丢失没有运费/采购的订单。
+    total_amount 的计算方式与 SalesRecord.total_amount 属性保持一致。
+    """
+    attachments_count = (
+        select(func.count(Attachment.id))
+        .where(Attachment.sales_record_id == SalesRecord.id)
+        .scalar_subquery()
+    )
+    # 运费、采购各用一个LATERAL子查询同时算出数量和合计
+    fees = (
+        select(
+            func.count(ShippingFees.id).label("count"),
+            func.coalesce(func.sum(ShippingFees.shipping_fee), 0.0).label("total"),
+        )
+        .where(ShippingFees.sales_record_id == SalesRecord.id)
+        .lateral("fees")
+    )
+    procurements = (
+        select(
+            func.count(Procurement.id).label("count"),
+            func.coalesce(func.sum(Procurement.amount), 0.0).label("total"),
+        )
+        .where(Procurement.sales_record_id == SalesRecord.id)
+        .lateral("procurements")
+    )
+    # 总金额 = 总价 - 出厂价 - (运费 + 采购 - 退款 - 退税) / 汇率
+    # 用原生除法运算符，避免SQLAlchemy把汇率CAST成FLOAT(4)（单精度）
+    rmb_costs = fees.c.total + procurements.c.total - SalesRecord.refund_amount - SalesRecord.tax_refund
+    total_amount = (
+        SalesRecord.total_price
+        - SalesRecord.factory_price
+        - rmb_costs.self_group().op("/", return_type=Float)(SalesRecord.exchange_rate)
+    )
+
+    return (
+        select(
+            SalesRecord.id,
+            SalesRecord.order_number,
+            SalesRecord.user_id,
+            User.full_name.label("creator_name"),
+            SalesRecord.order_type,
+            SalesRecord.order_source,
+            SalesRecord.product_name,
+            SalesRecord.quantity,
+            SalesRecord.unit_price,
+            SalesRecord.total_price,
+            SalesRecord.exchange_rate,
+            SalesRecord.factory_price,
+            SalesRecord.refund_amount,
+            SalesRecord.tax_refund,
+            SalesRecord.profit,
+            SalesRecord.stage,
+            SalesRecord.is_voided,
+            attachments_count.label("attachments_count"),
+            fees.c.count.label("shipping_fees_count"),
+            fees.c.total.label("shipping_fees_total"),
+            procurements.c.count.label("procurement_count"),
+            procurements.c.total.label("procurement_total"),
+            total_amount.label("total_amount"),
+            SalesRecord.created_at,
+            SalesRecord.updated_at,
+        )
+        .select_from(SalesRecord)
+        .outerjoin(User, User.id == SalesRecord.user_id)
+        .join(fees, true())
+        .join(procurements, true())
+    )
+
 @router.get("/check-order-number/{order_number}")
 @check_sales_record_permissions(Action.CREATE)
 async def check_order_number(
@@ -152,8 +248,11 @@ async def create_sales_record(
     db.add(record)
     
     try:
-        # 先提交销售记录以获取ID
+        # 先提交销售记录以获取ID，同一事务中计入销售日汇总
+        await db.flush()
+        await SalesRollupService.add_record(db, record.id)
         await db.commit()
+        await StatsService.invalidate_dashboard_stats()
         await db.refresh(record)
         
         logger.info(f"销售记录创建成功 - id: {record.id}, order_number: {record.order_number}")
@@ -167,20 +266,14 @@ async def create_sales_record(
             await db.commit()
             for attachment in attachments:
                 await db.refresh(attachment)
+            schedule_previews(attachments)
             
             logger.info(f"附件处理完成 - record_id: {record.id}, 附件数量: {len(attachments)}")
         
         # 重新查询以获取关联数据
         result = await db.execute(
             select(SalesRecord)
-            .options(
-                joinedload(SalesRecord.user),
-                joinedload(SalesRecord.logistics_approved_by),
-                joinedload(SalesRecord.final_approved_by),
-                joinedload(SalesRecord.attachments),
-                joinedload(SalesRecord.shipping_fees),
-                joinedload(SalesRecord.procurement)
-            )
+            .options(*SALES_RECORD_LOAD_OPTIONS)
             .where(SalesRecord.id == record.id)
         )
         final_record = result.unique().scalar_one()
@@ -190,6 +283,7 @@ async def create_sales_record(
         # 记录审计日志
         try:
             audit_details = {
+                "sales_record_id": final_record.id,
                 "order_number": final_record.order_number,
                 "order_type": final_record.order_type,
                 "order_source": final_record.order_source,
@@ -228,17 +322,13 @@ async def create_sales_record(
                 created_attachments = result.scalars().all()
                 
                 # 清理已保存的文件
-                for attachment in created_attachments:
+                for stored_filename in {attachment.stored_filename for attachment in created_attachments}:
                     try:
                         # 检查文件是否被其他记录引用
-                        result = await db.execute(
-                            select(Attachment).where(Attachment.stored_filename == attachment.stored_filename)
-                        )
-                        if not result.scalar_one_or_none():
-                            from app.utils.file_handler import file_handler
-                            file_handler.delete_file(attachment.stored_filename)
-                            logger.info(f"清理：删除未被引用的文件 - {attachment.stored_filename}")
+                        if await BlobService.purge_if_unreferenced(db, stored_filename):
+                            logger.info(f"清理：删除未被引用的文件 - {stored_filename}")
                     except Exception as cleanup_error:
+                        await db.rollback()
                         logger.warning(f"清理文件时出错: {cleanup_error}")
             except Exception as query_error:
                 logger.warning(f"查询附件记录时出错: {query_error}")
@@ -253,32 +343,60 @@ async def create_sales_record(
 async def get_sales_records(
     db: AsyncSessionDep,
     current_user: Annotated[User, Depends(get_current_user)],
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="分页游标（取自上一页响应头 X-Next-Cursor）"),
     stage: str = None,
     order_type: str = None,
-    search: str = None
+    search: str = None,
+    search_mode: str = Query("contains", description="搜索方式：contains 子串匹配 / similarity 相似度排序"),
+    view: str = Query("full", description="返回视图：full 完整数据 / summary 列表摘要")
 ) -> List[SalesRecord]:
     """
     获取销售记录列表（带分页）
     
     - **skip**: 跳过的记录数
     - **limit**: 返回的记录数
+    - **cursor**: 游标分页，传入后忽略skip，从游标位置继续向后取数据
     - **stage**: 按阶段筛选 (stage_1/stage_2/stage_3/stage_4/stage_5)
     - **order_type**: 按订单类型筛选 (alibaba/domestic/exhibition)
     - **search**: 搜索订单号或产品名称
+    - **search_mode**: contains（默认）按子串匹配，结果按ID倒序；
+      similarity 按 word_similarity 模糊匹配并按相似度排序，可容忍错别字，不支持游标分页
+    - **view**: full 返回完整的销售记录（含创建人、审核人、附件、运费、采购明细）；
+      summary 只返回列表页需要的字段，附件数量、运费/采购的数量与合计在数据库中计算
+    
+    如果还有下一页，响应头 **X-Next-Cursor** 中会返回下一页的游标。
+    游标按ID定位，深分页不需要扫描并丢弃前面的记录。
     """
-    logger.info(f"获取销售记录列表 - user_id: {current_user.id} ({current_user.role}), skip: {skip}, limit: {limit}")
-    logger.debug(f"筛选条件 - stage: {stage}, order_type: {order_type}, search: {search}")
-    
-    query = select(SalesRecord).options(
-        joinedload(SalesRecord.user),
-        joinedload(SalesRecord.logistics_approved_by),
-        joinedload(SalesRecord.final_approved_by),
-        joinedload(SalesRecord.attachments),
-        joinedload(SalesRecord.shipping_fees),
-        joinedload(SalesRecord.procurement)
-    )
+    logger.info(f"获取销售记录列表 - user_id: {current_user.id} ({current_user.role}), skip: {skip}, limit: {limit}, cursor: {cursor}")
+    logger.debug(f"筛选条件 - stage: {stage}, order_type: {order_type}, search: {search}, search_mode: {search_mode}, view: {view}")
+    
+    if view not in ("full", "summary"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"无效的视图: {view}"
+        )
+    
+    if search_mode not in ("contains", "similarity"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"无效的搜索方式: {search_mode}"
+        )
+    
+    # 相似度模式按相似度排序，ID游标无法定位，只能使用skip分页
+    similarity_search = bool(search) and search_mode == "similarity"
+    if similarity_search and cursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="相似度搜索不支持游标分页，请使用skip"
+        )
+    
+    if view == "summary":
+        query = build_sales_summary_query()
+    else:
+        query = select(SalesRecord).options(*SALES_RECORD_LOAD_OPTIONS)
     
     # 权限控制：所有用户都可以看到所有记录
     logger.debug(f"用户 {current_user.id} ({current_user.role}) 查看所有记录")
@@ -308,26 +426,75 @@ async def get_sales_records(
         query = query.where(SalesRecord.order_type == order_type)
         logger.debug(f"订单类型筛选 - {order_type}")
     
-    # 搜索
-    if search:
+    # 搜索（两个字段都有pg_trgm GIN索引）
+    if similarity_search:
+        # search <% column 即 word_similarity(search, column) 超过阈值，可以使用三元组索引
         query = query.where(
             or_(
-                SalesRecord.order_number.contains(search),
-                SalesRecord.product_name.contains(search)
+                literal(search).op("<%")(SalesRecord.order_number),
+                literal(search).op("<%")(SalesRecord.product_name)
+            )
+        ).order_by(
+            func.greatest(
+                func.word_similarity(search, SalesRecord.order_number),
+                func.word_similarity(search, SalesRecord.product_name)
+            ).desc()
+        )
+        logger.debug(f"相似度搜索 - {search}")
+    elif search:
+        # autoescape转义用户输入中的 % 和 _，按字面子串匹配
+        query = query.where(
+            or_(
+                SalesRecord.order_number.contains(search, autoescape=True),
+                SalesRecord.product_name.contains(search, autoescape=True)
             )
         )
         logger.debug(f"搜索筛选 - {search}")
     
-    # 按ID倒序排序（最新记录在前）
+    # 游标定位：只取ID小于上一页最后一条记录的数据
+    if cursor:
+        try:
+            last_id = int(decode_cursor(cursor)["id"])
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="无效的分页游标"
+            )
+        query = query.where(SalesRecord.id < last_id)
+        logger.debug(f"游标分页 - id < {last_id}")
+    
+    # 按ID倒序排序（最新记录在前；相似度搜索时作为相同相似度的次序）
     query = query.order_by(SalesRecord.id.desc())
     
-    # 分页
-    query = query.offset(skip).limit(limit)
+    # 分页：多取一条用于判断是否还有下一页
+    if not cursor:
+        query = query.offset(skip)
+    query = query.limit(limit + 1)
     
     result = await db.execute(query)
-    records = result.unique().scalars().all()
+    if view == "summary":
+        records = result.mappings().all()
+    else:
+        records = result.unique().scalars().all()
+    
+    next_cursor = None
+    if len(records) > limit:
+        records = records[:limit]
+        # 相似度搜索不按ID排序，不返回游标
+        if not similarity_search:
+            next_cursor = encode_cursor({"id": records[-1]["id"] if view == "summary" else records[-1].id})
+            response.headers["X-Next-Cursor"] = next_cursor
     
     logger.info(f"查询完成 - 返回 {len(records)} 条记录")
+    
+    if view == "summary":
+        # 摘要行直接序列化为JSON返回，跳过response_model的校验
+        content = SALES_RECORD_SUMMARY_LIST.dump_json(
+            SALES_RECORD_SUMMARY_LIST.validate_python([dict(row) for row in records])
+        )
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+        return Response(content=content, media_type="application/json", headers=headers)
+    
     return records
 
 @router.get("/{record_id}", response_model=SalesRecordResponse)
@@ -344,14 +511,7 @@ async def get_sales_record_by_id(
     
     result = await db.execute(
         select(SalesRecord)
-        .options(
-            joinedload(SalesRecord.user),
-            joinedload(SalesRecord.logistics_approved_by),
-            joinedload(SalesRecord.final_approved_by),
-            joinedload(SalesRecord.attachments),
-            joinedload(SalesRecord.shipping_fees),
-            joinedload(SalesRecord.procurement)
-        )
+        .options(*SALES_RECORD_LOAD_OPTIONS)
         .where(SalesRecord.id == record_id)
     )
     record = result.unique().scalar_one_or_none()
@@ -392,14 +552,7 @@ async def update_sales_record(
     # 查询记录
     result = await db.execute(
         select(SalesRecord)
-        .options(
-            joinedload(SalesRecord.user),
-            joinedload(SalesRecord.logistics_approved_by),
-            joinedload(SalesRecord.final_approved_by),
-            joinedload(SalesRecord.attachments),
-            joinedload(SalesRecord.shipping_fees),
-            joinedload(SalesRecord.procurement)
-        )
+        .options(*SALES_RECORD_LOAD_OPTIONS)
         .where(SalesRecord.id == record_id)
     )
     record = result.unique().scalar_one_or_none()
@@ -435,24 +588,23 @@ async def update_sales_record(
         update_data.pop('factory_price')
     
     try:
+        # 修改前先从销售日汇总中扣除旧值
+        await SalesRollupService.remove_record(db, record.id)
+        
         for field, value in update_data.items():
             logger.debug(f"设置字段 {field}: {getattr(record, field, '未设置')} -> {value}")
             setattr(record, field, value)
         
+        await db.flush()
+        await SalesRollupService.add_record(db, record.id)
         await db.commit()
+        await StatsService.invalidate_dashboard_stats()
         await db.refresh(record)
         
         # 重新预加载所有需要的关系以避免懒加载
         result = await db.execute(
             select(SalesRecord)
-            .options(
-                joinedload(SalesRecord.user),
-                joinedload(SalesRecord.logistics_approved_by),
-                joinedload(SalesRecord.final_approved_by),
-                joinedload(SalesRecord.attachments),
-                joinedload(SalesRecord.shipping_fees),
-                joinedload(SalesRecord.procurement)
-            )
+            .options(*SALES_RECORD_LOAD_OPTIONS)
             .where(SalesRecord.id == record_id)
         )
         record = result.unique().scalar_one()
@@ -462,6 +614,7 @@ async def update_sales_record(
         # 记录审计日志
         try:
             audit_details = {
+                "sales_record_id": record_id,
                 "updated_fields": list(update_data.keys()),
                 "changes": update_data,
                 "order_number": record.order_number
@@ -535,35 +688,33 @@ async def delete_sales_record(
     logger.info(f"准备删除记录 - id: {record_id}, order_number: {order_number}")
     
     try:
-        # 删除销售记录（会自动删除附件表记录）
+        # 从销售日汇总中扣除，再删除销售记录（会自动删除附件表记录）
+        await SalesRollupService.remove_record(db, record.id)
+        # 按文件名顺序更新 blob 行，与上传时的加锁顺序一致，避免死锁
+        for attachment_info in sorted(attachments_to_delete, key=lambda item: item['stored_filename']):
+            await BlobService.release_reference(db, attachment_info['stored_filename'])
         await db.delete(record)
         await db.commit()
+        await StatsService.invalidate_dashboard_stats()
         logger.info(f"销售记录删除成功 - id: {record_id}, order_number: {order_number}")
         
         # 删除物理文件
         if attachments_to_delete:
-            from app.utils.file_handler import file_handler
-            
-            for attachment_info in attachments_to_delete:
+            for stored_filename in {attachment_info['stored_filename'] for attachment_info in attachments_to_delete}:
                 try:
-                    # 检查文件是否被其他记录引用（防止误删共享文件）
-                    result = await db.execute(
-                        select(Attachment).where(Attachment.stored_filename == attachment_info['stored_filename'])
-                    )
-                    if not result.scalar_one_or_none():
-                        # 文件没有被其他记录引用，可以安全删除
-                        if file_handler.delete_file(attachment_info['stored_filename']):
-                            logger.info(f"成功删除附件文件 - {attachment_info['stored_filename']} ({attachment_info['original_filename']})")
-                        else:
-                            logger.warning(f"删除附件文件失败 - {attachment_info['stored_filename']} ({attachment_info['original_filename']})")
+                    # 文件没有被其他记录引用时才删除（防止误删共享文件）
+                    if await BlobService.purge_if_unreferenced(db, stored_filename):
+                        logger.info(f"成功删除附件文件 - {stored_filename}")
                     else:
-                        logger.info(f"附件文件被其他记录引用，跳过删除 - {attachment_info['stored_filename']}")
+                        logger.info(f"附件文件被其他记录引用，跳过删除 - {stored_filename}")
                 except Exception as file_error:
-                    logger.error(f"处理附件文件时出错 - {attachment_info['stored_filename']}: {file_error}")
+                    await db.rollback()
+                    logger.error(f"处理附件文件时出错 - {stored_filename}: {file_error}")
         
         # 记录审计日志
         try:
             audit_details = {
+                "sales_record_id": record_id,
                 "order_number": order_number,
                 "deleted_attachments_count": len(attachments_to_delete)
             }
@@ -608,14 +759,7 @@ async def submit_sales_record(
     # 查询记录
     result = await db.execute(
         select(SalesRecord)
-        .options(
-            joinedload(SalesRecord.user),
-            joinedload(SalesRecord.logistics_approved_by),
-            joinedload(SalesRecord.final_approved_by),
-            joinedload(SalesRecord.attachments),
-            joinedload(SalesRecord.shipping_fees),
-            joinedload(SalesRecord.procurement)
-        )
+        .options(*SALES_RECORD_LOAD_OPTIONS)
         .where(SalesRecord.id == record_id)
     )
     record = result.unique().scalar_one_or_none()
@@ -629,6 +773,9 @@ async def submit_sales_record(
     current_stage = record.stage
     
     try:
+        # 阶段变更前先从销售日汇总中扣除旧阶段
+        await SalesRollupService.remove_record(db, record.id)
+        
         if current_stage == OrderStage.STAGE_1.value:
             # 阶段一 -> 阶段二：销售人员提交待初步审核
             if record.user_id != current_user.id:
@@ -655,20 +802,16 @@ async def submit_sales_record(
                 detail=f"记录当前处于阶段 {current_stage}，无法提交到下一阶段"
             )
         
+        await db.flush()
+        await SalesRollupService.add_record(db, record.id)
         await db.commit()
+        await StatsService.invalidate_dashboard_stats()
         await db.refresh(record)
         
         # 重新预加载所有需要的关系以避免懒加载
         result = await db.execute(
             select(SalesRecord)
-            .options(
-                joinedload(SalesRecord.user),
-                joinedload(SalesRecord.logistics_approved_by),
-                joinedload(SalesRecord.final_approved_by),
-                joinedload(SalesRecord.attachments),
-                joinedload(SalesRecord.shipping_fees),
-                joinedload(SalesRecord.procurement)
-            )
+            .options(*SALES_RECORD_LOAD_OPTIONS)
             .where(SalesRecord.id == record_id)
         )
         record = result.unique().scalar_one()
@@ -678,6 +821,7 @@ async def submit_sales_record(
         # 记录审计日志
         try:
             audit_details = {
+                "sales_record_id": record_id,
                 "order_number": record.order_number,
                 "previous_stage": current_stage,
                 "new_stage": record.stage,
@@ -728,14 +872,7 @@ async def approve_sales_record(
     # 查询记录
     result = await db.execute(
         select(SalesRecord)
-        .options(
-            joinedload(SalesRecord.user),
-            joinedload(SalesRecord.logistics_approved_by),
-            joinedload(SalesRecord.final_approved_by),
-            joinedload(SalesRecord.attachments),
-            joinedload(SalesRecord.shipping_fees),
-            joinedload(SalesRecord.procurement)
-        )
+        .options(*SALES_RECORD_LOAD_OPTIONS)
         .where(SalesRecord.id == record_id)
     )
     record = result.unique().scalar_one_or_none()
@@ -749,6 +886,9 @@ async def approve_sales_record(
     current_stage = record.stage
     
     try:
+        # 阶段变更前先从销售日汇总中扣除旧阶段
+        await SalesRollupService.remove_record(db, record.id)
+        
         if current_stage == OrderStage.STAGE_2.value:
             # 阶段二 -> 阶段三：后勤人员初步审核通过
             if not current_user.has_logistics_function():
@@ -779,20 +919,16 @@ async def approve_sales_record(
                 detail=f"记录当前处于阶段 {current_stage}，无法进行审核操作"
             )
         
+        await db.flush()
+        await SalesRollupService.add_record(db, record.id)
         await db.commit()
+        await StatsService.invalidate_dashboard_stats()
         await db.refresh(record)
         
         # 重新预加载所有需要的关系以避免懒加载
         result = await db.execute(
             select(SalesRecord)
-            .options(
-                joinedload(SalesRecord.user),
-                joinedload(SalesRecord.logistics_approved_by),
-                joinedload(SalesRecord.final_approved_by),
-                joinedload(SalesRecord.attachments),
-                joinedload(SalesRecord.shipping_fees),
-                joinedload(SalesRecord.procurement)
-            )
+            .options(*SALES_RECORD_LOAD_OPTIONS)
             .where(SalesRecord.id == record_id)
         )
         record = result.unique().scalar_one()
@@ -802,6 +938,7 @@ async def approve_sales_record(
         # 记录审计日志
         try:
             audit_details = {
+                "sales_record_id": record_id,
                 "order_number": record.order_number,
                 "previous_stage": current_stage,
                 "new_stage": record.stage,
@@ -855,14 +992,7 @@ async def withdraw_sales_record(
     # 查询记录
     result = await db.execute(
         select(SalesRecord)
-        .options(
-            joinedload(SalesRecord.user),
-            joinedload(SalesRecord.logistics_approved_by),
-            joinedload(SalesRecord.final_approved_by),
-            joinedload(SalesRecord.attachments),
-            joinedload(SalesRecord.shipping_fees),
-            joinedload(SalesRecord.procurement)
-        )
+        .options(*SALES_RECORD_LOAD_OPTIONS)
         .where(SalesRecord.id == record_id)
     )
     record = result.unique().scalar_one_or_none()
@@ -876,6 +1006,9 @@ async def withdraw_sales_record(
     current_stage = record.stage
     
     try:
+        # 阶段变更前先从销售日汇总中扣除旧阶段
+        await SalesRollupService.remove_record(db, record.id)
+        
         if current_stage == OrderStage.STAGE_2.value:
             # 阶段二 -> 阶段一：创建记录的本人可以撤回
             if record.user_id != current_user.id:
@@ -928,20 +1061,16 @@ async def withdraw_sales_record(
                 detail=f"记录当前处于阶段 {current_stage}，无法进行撤回操作"
             )
         
+        await db.flush()
+        await SalesRollupService.add_record(db, record.id)
         await db.commit()
+        await StatsService.invalidate_dashboard_stats()
         await db.refresh(record)
         
         # 重新预加载所有需要的关系以避免懒加载
         result = await db.execute(
             select(SalesRecord)
-            .options(
-                joinedload(SalesRecord.user),
-                joinedload(SalesRecord.logistics_approved_by),
-                joinedload(SalesRecord.final_approved_by),
-                joinedload(SalesRecord.attachments),
-                joinedload(SalesRecord.shipping_fees),
-                joinedload(SalesRecord.procurement)
-            )
+            .options(*SALES_RECORD_LOAD_OPTIONS)
             .where(SalesRecord.id == record_id)
         )
         record = result.unique().scalar_one()
@@ -951,6 +1080,7 @@ async def withdraw_sales_record(
         # 记录审计日志
         try:
             audit_details = {
+                "sales_record_id": record_id,
                 "order_number": record.order_number,
                 "previous_stage": current_stage,
                 "new_stage": record.stage,
@@ -1010,14 +1140,7 @@ async def void_sales_record(
     # 获取销售记录
     result = await db.execute(
         select(SalesRecord)
-        .options(
-            joinedload(SalesRecord.user),
-            joinedload(SalesRecord.logistics_approved_by),
-            joinedload(SalesRecord.final_approved_by),
-            joinedload(SalesRecord.attachments),
-            joinedload(SalesRecord.shipping_fees),
-            joinedload(SalesRecord.procurement)
-        )
+        .options(*SALES_RECORD_LOAD_OPTIONS)
         .where(SalesRecord.id == record_id)
     )
     record = result.unique().scalar_one_or_none()
@@ -1037,6 +1160,9 @@ async def void_sales_record(
             detail="销售记录已经作废"
         )
     
+    # 作废记录不计入销售日汇总，先扣除
+    await SalesRollupService.remove_record(db, record.id)
+    
     # 设置作废状态
     if hasattr(record, 'is_voided'):
         record.is_voided = True
@@ -1055,19 +1181,13 @@ async def void_sales_record(
             procurement.updated_at = datetime.now(UTC)
     
     await db.commit()
+    await StatsService.invalidate_dashboard_stats()
     await db.refresh(record)
     
     # 重新查询以获取完整的关联数据
     result = await db.execute(
         select(SalesRecord)
-        .options(
-            joinedload(SalesRecord.user),
-            joinedload(SalesRecord.logistics_approved_by),
-            joinedload(SalesRecord.final_approved_by),
-            joinedload(SalesRecord.attachments),
-            joinedload(SalesRecord.shipping_fees),
-            joinedload(SalesRecord.procurement)
-        )
+        .options(*SALES_RECORD_LOAD_OPTIONS)
         .where(SalesRecord.id == record_id)
     )
     final_record = result.unique().scalar_one()
@@ -1087,6 +1207,7 @@ async def void_sales_record(
             description="作废销售记录及关联记录",
             details={
                 "record_id": record_id,
+                "sales_record_id": record_id,
                 "order_number": final_record.order_number,
                 "action": "void",
                 "previous_voided_status": False,
@@ -1122,14 +1243,7 @@ async def unvoid_sales_record(
     # 获取销售记录
     result = await db.execute(
         select(SalesRecord)
-        .options(
-            joinedload(SalesRecord.user),
-            joinedload(SalesRecord.logistics_approved_by),
-            joinedload(SalesRecord.final_approved_by),
-            joinedload(SalesRecord.attachments),
-            joinedload(SalesRecord.shipping_fees),
-            joinedload(SalesRecord.procurement)
-        )
+        .options(*SALES_RECORD_LOAD_OPTIONS)
         .where(SalesRecord.id == record_id)
     )
     record = result.unique().scalar_one_or_none()
@@ -1165,20 +1279,17 @@ async def unvoid_sales_record(
             procurement.is_voided = False
             procurement.updated_at = datetime.now(UTC)
     
+    # 恢复后重新计入销售日汇总
+    await db.flush()
+    await SalesRollupService.add_record(db, record.id)
     await db.commit()
+    await StatsService.invalidate_dashboard_stats()
     await db.refresh(record)
     
     # 重新查询以获取完整的关联数据
     result = await db.execute(
         select(SalesRecord)
-        .options(
-            joinedload(SalesRecord.user),
-            joinedload(SalesRecord.logistics_approved_by),
-            joinedload(SalesRecord.final_approved_by),
-            joinedload(SalesRecord.attachments),
-            joinedload(SalesRecord.shipping_fees),
-            joinedload(SalesRecord.procurement)
-        )
+        .options(*SALES_RECORD_LOAD_OPTIONS)
         .where(SalesRecord.id == record_id)
     )
     final_record = result.unique().scalar_one()
@@ -1198,6 +1309,7 @@ async def unvoid_sales_record(
             description="取消作废销售记录及关联记录",
             details={
                 "record_id": record_id,
+                "sales_record_id": record_id,
                 "order_number": final_record.order_number,
                 "action": "unvoid",
                 "previous_voided_status": True,
@@ -1,15 +1,29 @@
-from typing import Annotated
-from fastapi import APIRouter, Depends
-from sqlalchemy import select, func
-from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import datetime, timedelta, timezone
+from typing import Annotated, Optional
+from datetime import date, datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 
-from app.core.dependencies import AsyncSessionDep, get_current_user
-from app.models.user import User, UserRole
-from app.models.sales_record import SalesRecord, OrderStage, OrderSource
-from app.models.fees import ShippingFees
-from app.models.procurement import Procurement
-from app.schemas.stats import DashboardStats
+from app.core.dependencies import AsyncSessionDep, get_current_active_superuser, get_current_user, user_cache
+from app.core.security import password_hash_pool
+from app.models.user import User
+from app.schemas.stats import (
+    AuditWriterStats,
+    CacheStats,
+    DashboardStats,
+    PasswordHashPoolStats,
+    PreviewStats,
+    RuntimeStats,
+    TimeSeriesStats,
+)
+from app.services.audit_writer import audit_log_writer
+from app.services.preview_service import preview_generator
+from app.services.stats_service import (
+    MAX_TIMESERIES_BUCKETS,
+    TIMESERIES_BUCKETS,
+    TIMESERIES_GROUP_BY,
+    StatsService,
+    count_buckets,
+    dashboard_stats_cache,
+)
 
 router = APIRouter(prefix="/stats", tags=["统计数据"])
 
@@ -28,71 +42,75 @@ async def get_dashboard_stats(
         - 订单来源统计
         - 审核统计
     """
-    # 获取当前月份的第一天
-    now = datetime.now(timezone.utc)
-    first_day = datetime(now.year, now.month, 1, tzinfo=timezone.utc)
-    
-    # 计算下个月的第一天
-    if now.month == 12:
-        next_month = datetime(now.year + 1, 1, 1, tzinfo=timezone.utc)
-    else:
-        next_month = datetime(now.year, now.month + 1, 1, tzinfo=timezone.utc)
+    # 各阶段/来源订单数、总订单数和本月销售额在一条聚合查询中完成，结果按用户范围缓存
+    return await StatsService.get_dashboard_stats_cached(db, current_user)
+
+@router.get("/timeseries", response_model=TimeSeriesStats)
+async def get_timeseries_stats(
+    db: AsyncSessionDep,
+    current_user: Annotated[User, Depends(get_current_user)],
+    start_date: Optional[date] = Query(None, description="起始日期（含，UTC），默认为结束日期往前12个月的月初"),
+    end_date: Optional[date] = Query(None, description="结束日期（含，UTC），默认为今天"),
+    bucket: str = Query("month", description="时间桶：day/week/month"),
+    group_by: Optional[str] = Query(None, description="分组维度：salesperson/order_source/order_type")
+) -> TimeSeriesStats:
+    """
+    获取销售时间序列统计（排除作废记录）
     
-    # 基础查询条件（排除作废记录）
-    base_query = select(func.count(SalesRecord.id)).where(SalesRecord.is_voided == False)
+    返回:
+        - points: 每个时间桶（及分组）的订单数量、美元合计、人民币合计
+        - order_types: 区间内按订单类型的数量和金额
+        - stages: 区间内按阶段的数量和占比
     
-    # 1. 获取各阶段订单数量
-    stage_counts = {}
-    for stage in OrderStage:
-        stage_query = base_query.where(SalesRecord.stage == stage.value)
-        result = await db.execute(stage_query)
-        stage_counts[stage.value] = result.scalar() or 0
+    非超级用户只统计自己创建的订单。
+    """
+    if bucket not in TIMESERIES_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"无效的时间桶: {bucket}"
+        )
+    if group_by is not None and group_by not in TIMESERIES_GROUP_BY:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"无效的分组维度: {group_by}"
+        )
     
-    # 2. 获取订单来源统计
-    source_counts = {}
-    for source in OrderSource:
-        source_query = base_query.where(SalesRecord.order_source == source.value)
-        result = await db.execute(source_query)
-        source_counts[source.value] = result.scalar() or 0
+    end_date = end_date or datetime.now(timezone.utc).date()
+    if start_date is None:
+        month_index = end_date.year * 12 + end_date.month - 1 - 11
+        start_date = date(month_index // 12, month_index % 12 + 1, 1)
+    if start_date > end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="起始日期不能晚于结束日期"
+        )
+    if count_buckets(bucket, start_date, end_date) > MAX_TIMESERIES_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"时间范围过大，最多返回 {MAX_TIMESERIES_BUCKETS} 个时间桶，请缩小范围或使用更大的时间桶"
+        )
     
-    # 3. 历史总订单数量
-    total_orders_result = await db.execute(base_query)
-    total_orders = total_orders_result.scalar() or 0
+    return await StatsService.get_timeseries(db, current_user, start_date, end_date, bucket, group_by)
+
+@router.get("/runtime", response_model=RuntimeStats)
+async def get_runtime_stats(
+    current_user: Annotated[User, Depends(get_current_active_superuser)]
+) -> RuntimeStats:
+    """
+    获取当前工作进程的运行时指标（仅超级管理员）
     
-    # 4. 计算本月销售总额（仅最终阶段订单，排除作废记录）
-    monthly_sales_query = select(
-        func.sum(SalesRecord.total_price).label("total_sales")
-    ).where(
-        SalesRecord.created_at >= first_day,
-        SalesRecord.created_at < next_month,
-        SalesRecord.stage == OrderStage.STAGE_5.value,
-        SalesRecord.is_voided == False
+    返回:
+        - password_hash_pool: 密码哈希线程池的排队深度、执行数和平均排队时间
+        - audit_writer: 审计日志批量写入的队列长度和写入/失败数量
+        - preview: 附件预览图生成的队列长度和生成/失败/跳过数量
+        - caches: 进程内缓存的命中/未命中次数
+    """
+    return RuntimeStats(
+        password_hash_pool=PasswordHashPoolStats(**password_hash_pool.stats()),
+        audit_writer=AuditWriterStats(**audit_log_writer.stats()),
+        preview=PreviewStats(**preview_generator.stats()),
+        caches=[
+            CacheStats(name=cache.name, ttl_seconds=cache.ttl, hits=cache.hits, misses=cache.misses)
+            for cache in (user_cache, dashboard_stats_cache)
+        ]
     )
-    
-    if not current_user.is_superuser:
-        monthly_sales_query = monthly_sales_query.where(SalesRecord.user_id == current_user.id)
-    
-    monthly_sales_result = await db.execute(monthly_sales_query)
-    total_sales = monthly_sales_result.scalar() or 0.0
-    
-    # 5. 审核统计
-    pending_logistics_review = stage_counts.get(OrderStage.STAGE_2.value, 0)
-    pending_final_review = stage_counts.get(OrderStage.STAGE_4.value, 0)
-    completed_orders = stage_counts.get(OrderStage.STAGE_5.value, 0)
-    
-    # 构建返回结果
-    return DashboardStats(
-        total_sales=float(total_sales),
-        total_orders=total_orders,
-        stage_1_orders=stage_counts.get(OrderStage.STAGE_1.value, 0),
-        stage_2_orders=stage_counts.get(OrderStage.STAGE_2.value, 0),
-        stage_3_orders=stage_counts.get(OrderStage.STAGE_3.value, 0),
-        stage_4_orders=stage_counts.get(OrderStage.STAGE_4.value, 0),
-        stage_5_orders=stage_counts.get(OrderStage.STAGE_5.value, 0),
-        alibaba_orders=source_counts.get(OrderSource.ALIBABA.value, 0),
-        domestic_orders=source_counts.get(OrderSource.DOMESTIC.value, 0),
-        exhibition_orders=source_counts.get(OrderSource.EXHIBITION.value, 0),
-        pending_logistics_review=pending_logistics_review,
-        pending_final_review=pending_final_review,
-        completed_orders=completed_orders
-    )
\ No newline at end of file
@@ -0,0 +1,159 @@
+"""
+进程内缓存
+
+- CacheBackend: 存储后端接口，默认实现为 MemoryCacheBackend（带TTL的LRU），
+  需要多进程共享时可以实现基于Redis等的后端替换
+- AsyncCache: 在后端之上提供 get_or_load，同一个键的并发未命中只执行一次加载，
+  其余请求等待同一个结果；失效时递增代数，丢弃失效前开始的加载结果
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class CacheBackend:
+    """缓存存储后端接口"""
+
+    async def get(self, key: str) -> Tuple[bool, Any]:
+        """获取缓存值，返回 (是否命中, 值)"""
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        """写入缓存值，ttl为过期秒数"""
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        """删除单个键"""
+        raise NotImplementedError
+
+    async def delete_prefix(self, prefix: str) -> None:
+        """删除指定前缀的所有键"""
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """进程内TTL + LRU缓存后端
+
+    超过 max_entries 时淘汰最久未使用的键；过期的键在读取时删除。
+    所有操作都在事件循环线程中执行，不需要加锁。
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    async def get(self, key: str) -> Tuple[bool, Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return False, None
+        self._data.move_to_end(key)
+        return True, value
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    async def delete_prefix(self, prefix: str) -> None:
+        for key in [key for key in self._data if key.startswith(prefix)]:
+            del self._data[key]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class AsyncCache:
+    """带并发合并的异步缓存
+
+    Args:
+        backend: 存储后端
+        ttl: 默认过期秒数，小于等于0时不缓存（每次都调用加载函数）
+        name: 缓存名称，用于日志
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float, name: str = "cache"):
+        self.backend = backend
+        self.ttl = ttl
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._generation = 0
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        获取缓存值，未命中时调用loader加载并写入缓存
+
+        同一个键同时只有一个loader在执行，其余调用者等待它的结果；
+        loader抛出异常时所有等待者都收到该异常，不写入缓存。
+        """
+        if self.ttl <= 0:
+            return await loader()
+
+        while True:
+            hit, value = await self.backend.get(key)
+            if hit:
+                self.hits += 1
+                return value
+
+            future = self._inflight.get(key)
+            if future is None:
+                break
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # 负责加载的请求被取消：重新尝试（由当前请求负责加载）
+                if future.cancelled():
+                    continue
+                raise
+
+        self.misses += 1
+        generation = self._generation
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # 没有等待者时避免 "Future exception was never retrieved" 警告
+                future.exception()
+            raise
+        else:
+            # 加载期间发生过失效，结果可能是旧数据，只返回给本次等待者，不写入缓存
+            if generation == self._generation:
+                await self.backend.set(key, value, self.ttl)
+            future.set_result(value)
+            return value
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def invalidate(self, key: str) -> None:
+        """使单个键失效"""
+        self._generation += 1
+        self._inflight.pop(key, None)
+        await self.backend.delete(key)
+
+    async def invalidate_prefix(self, prefix: str) -> None:
+        """使指定前缀的所有键失效"""
+        self._generation += 1
+        for key in [key for key in self._inflight if key.startswith(prefix)]:
+            del self._inflight[key]
+        await self.backend.delete_prefix(prefix)
+        logger.debug(f"缓存失效 - {self.name}: {prefix}*")
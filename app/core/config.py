@@ -34,6 +34,52 @@ class Settings(BaseSettings):
     MAIL_TLS: bool
     MAIL_SSL: bool = False
     
+    # 密码哈希配置
+    PASSWORD_HASH_WORKERS: int = 2  # 密码哈希线程数，0表示在事件循环中同步执行
+    
+    # 审计日志批量写入配置
+    AUDIT_BATCH_SIZE: int = 200  # 单批最多写入的审计事件数
+    AUDIT_FLUSH_INTERVAL_SECONDS: float = 1.0  # 审计事件最多等待多久写入
+    AUDIT_QUEUE_MAX_SIZE: int = 10000  # 审计队列上限，写满时请求等待
+    AUDIT_WRITE_RETRIES: int = 3  # 批次写入遇到连接等临时错误时的重试次数
+    AUDIT_RETRY_BACKOFF_SECONDS: float = 0.5  # 首次重试前等待的秒数，之后每次翻倍
+    
+    # 审计日志分区配置
+    AUDIT_PARTITION_PREMAKE_MONTHS: int = 3  # 预先创建之后几个月的分区
+    AUDIT_PARTITION_MAINTENANCE_INTERVAL_SECONDS: int = 21600  # 分区维护间隔秒数
+    AUDIT_RETENTION_MONTHS: int = 0  # 审计日志保留月数（不含当前月），0表示不清理
+    AUDIT_RETENTION_DROP: bool = False  # 过期分区直接删除，False时只从父表分离
+    AUDIT_COUNT_CAP: int = 10000  # 估算总数模式下精确计数的上限
+    AUDIT_EXPORT_BATCH_SIZE: int = 1000  # 导出时服务端游标每批读取的行数
+    
+    # 缓存配置
+    STATS_CACHE_TTL_SECONDS: int = 30  # 仪表盘统计缓存秒数，0表示不缓存
+    USER_CACHE_TTL_SECONDS: int = 60  # 当前用户缓存秒数，0表示不缓存
+    USER_CACHE_MAX_ENTRIES: int = 1024  # 当前用户缓存最多保存的用户数
+    
+    # 附件下载配置
+    ATTACHMENT_CACHE_MAX_AGE: int = 31536000  # 附件在浏览器中的缓存秒数（附件内容按MD5存储，不会变化）
+    ATTACHMENT_ACCEL_REDIRECT_PREFIX: str = ""  # nginx内部location前缀（如 /protected-files/），设置后文件由nginx发送
+    
+    # 附件预览配置
+    PREVIEW_WORKERS: int = 2  # 生成预览图的进程数，0表示不预生成（请求时在线程中生成）
+    PREVIEW_QUEUE_MAX_SIZE: int = 100  # 上传后待生成预览的队列上限，满时跳过（首次请求时再生成）
+    PREVIEW_MAX_SIZE: int = 320  # 预览图最长边像素
+
+    # 附件存储配置
+    STORAGE_BACKEND: str = "local"  # local: 本机 files/ 目录；s3: S3兼容的对象存储（多个应用节点共用）
+    S3_ENDPOINT_URL: str = ""  # 对象存储地址，如 http://minio:9000；S3_BUCKET 为空时填写存储桶的虚拟主机地址
+    S3_PUBLIC_ENDPOINT_URL: str = ""  # 浏览器访问对象存储的地址（用于预签名URL），为空时与 S3_ENDPOINT_URL 相同
+    S3_REGION: str = "us-east-1"
+    S3_BUCKET: str = ""
+    S3_ACCESS_KEY_ID: str = ""
+    S3_SECRET_ACCESS_KEY: str = ""
+    S3_KEY_PREFIX: str = "attachments/"  # 对象键前缀，对象键为 {前缀}{stored_filename}
+    S3_MAX_CONNECTIONS: int = 32  # 连接池上限
+    S3_TIMEOUT_SECONDS: float = 30.0
+    S3_PRESIGNED_DOWNLOAD: bool = True  # 下载时重定向到预签名URL，False时由应用转发文件内容
+    S3_PRESIGN_EXPIRES_SECONDS: int = 300  # 预签名URL有效秒数
+
     # 超级管理员配置
     FIRST_SUPERUSER_EMAIL: str = "admin@example.com"
     FIRST_SUPERUSER_PHONE: str = "13800138000"
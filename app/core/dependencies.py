@@ -5,8 +5,10 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.orm import make_transient_to_detached
 
 from app.db.session import get_session
+from app.core.cache import AsyncCache, MemoryCacheBackend
 from app.core.config import settings
 from app.core.security import verify_password
 from app.models.user import User, UserRole
@@ -19,6 +21,49 @@ oauth2_scheme = OAuth2PasswordBearer(
 AsyncSessionDep = Annotated[AsyncSession, Depends(get_session)]
 TokenDep = Annotated[str, Depends(oauth2_scheme)]
 
+# 当前用户缓存：保存用户的列值（不含密码哈希），命中时不再查询数据库。
+# 用户信息修改后通过 invalidate_user_cache 立即失效，禁用用户马上生效
+USER_CACHE_COLUMNS = [
+    column for column in User.__table__.columns if column.key != "password_hash"
+]
+user_cache = AsyncCache(
+    MemoryCacheBackend(max_entries=settings.USER_CACHE_MAX_ENTRIES),
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+    name="current_user"
+)
+
+
+def user_cache_key(user_id: int) -> str:
+    """当前用户缓存键"""
+    return f"user:{user_id}"
+
+
+async def invalidate_user_cache(user_id: int) -> None:
+    """使指定用户的缓存失效（用户信息修改提交后调用）"""
+    await user_cache.invalidate(user_cache_key(user_id))
+
+
+def build_cached_user(values: dict) -> User:
+    """
+    根据缓存的列值构造用户对象
+
+    对象处于脱离会话（detached）状态，可以读取缓存的字段和调用权限判断方法；
+    未缓存的 password_hash 和关系属性不能访问，需要时应重新从数据库查询用户。
+    """
+    user = User(**values)
+    make_transient_to_detached(user)
+    return user
+
+
+async def _load_user_values(db: AsyncSession, user_id: int) -> Optional[dict]:
+    """从数据库查询用户的缓存字段，用户不存在时返回None"""
+    result = await db.execute(
+        select(*USER_CACHE_COLUMNS).where(User.id == user_id)
+    )
+    row = result.mappings().one_or_none()
+    return dict(row) if row is not None else None
+
+
 async def get_current_user(
     db: AsyncSessionDep,
     token: TokenDep,
@@ -69,15 +114,16 @@ async def get_current_user(
         # 将JWT中的字符串ID转换为整数
         user_id_int = int(user_id)
         
-        # 从数据库获取用户信息
-        result = await db.execute(
-            select(User).where(User.id == user_id_int)
+        # 获取用户信息（优先读取缓存）
+        values = await user_cache.get_or_load(
+            user_cache_key(user_id_int),
+            lambda: _load_user_values(db, user_id_int)
         )
-        user = result.scalar_one_or_none()
         
-        if user is None:
+        if values is None:
             raise credentials_exception
             
+        user = build_cached_user(values)
         if not user.is_active:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -1,7 +1,7 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.models.user import User, UserRole, UserFunction
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash_async
 from app.core.config import settings
 
 async def init_superuser(db: AsyncSession) -> None:
@@ -19,7 +19,7 @@ async def init_superuser(db: AsyncSession) -> None:
         superuser = User(
             phone=settings.FIRST_SUPERUSER_PHONE,
             email=settings.FIRST_SUPERUSER_EMAIL,
-            password_hash=get_password_hash(settings.FIRST_SUPERUSER_PASSWORD),
+            password_hash=await get_password_hash_async(settings.FIRST_SUPERUSER_PASSWORD),
             full_name=settings.FIRST_SUPERUSER_FULL_NAME,
             role=UserRole.ADMIN,
             function=UserFunction.SALES_LOGISTICS,  # 管理员默认设置为所职能（虽然有所有权限）
@@ -1,11 +1,100 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any, Union
+from typing import Any, Callable, Dict, Optional, Union
 from jose import jwt
 from passlib.context import CryptContext
 from .config import settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+
+class PasswordHashPool:
+    """
+    密码哈希专用线程池
+
+    bcrypt 每次计算耗时几十到几百毫秒，直接在异步处理函数中调用会阻塞事件循环，
+    拖慢同一进程内的所有请求。这里把计算放到固定大小的线程池中执行（bcrypt 计算时释放GIL），
+    同时最多 max_workers 个计算并行，其余排队等待，并记录排队深度等指标。
+
+    Args:
+        max_workers: 线程数，小于等于0时直接在调用线程中同步执行
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.queued = 0         # 已提交、尚未开始执行的任务数
+        self.running = 0        # 正在执行的任务数
+        self.peak_queued = 0    # 启动以来的最大排队深度
+        self.completed = 0      # 已完成的任务数
+        self.total_wait = 0.0   # 累计排队时间（秒）
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="password-hash"
+            )
+        return self._executor
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """在线程池中执行 func(*args) 并等待结果"""
+        if self.max_workers <= 0:
+            return func(*args)
+
+        submitted_at = time.perf_counter()
+
+        def job() -> Any:
+            with self._lock:
+                self.queued -= 1
+                self.running += 1
+                self.total_wait += time.perf_counter() - submitted_at
+            try:
+                return func(*args)
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+
+        def on_done(future: Future) -> None:
+            # 请求在排队期间被取消时任务不会执行，需要在这里扣减排队数
+            if future.cancelled():
+                with self._lock:
+                    self.queued -= 1
+
+        with self._lock:
+            self.queued += 1
+            self.peak_queued = max(self.peak_queued, self.queued)
+        future = self._get_executor().submit(job)
+        future.add_done_callback(on_done)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取线程池运行指标"""
+        with self._lock:
+            started = self.completed + self.running
+            return {
+                "workers": self.max_workers,
+                "queued": self.queued,
+                "running": self.running,
+                "peak_queued": self.peak_queued,
+                "completed": self.completed,
+                "avg_wait_ms": round(self.total_wait * 1000 / started, 2) if started else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        """关闭线程池（应用关闭时调用）"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+password_hash_pool = PasswordHashPool(settings.PASSWORD_HASH_WORKERS)
+
 def create_access_token(
     subject: Union[str, Any], expires_delta: timedelta = None
 ) -> str:
@@ -40,4 +129,12 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     """获取密码哈希值"""
-    return pwd_context.hash(password) 
\ No newline at end of file
+    return pwd_context.hash(password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """在密码哈希线程池中验证密码（异步处理函数中使用，避免阻塞事件循环）"""
+    return await password_hash_pool.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """在密码哈希线程池中计算密码哈希值（异步处理函数中使用，避免阻塞事件循环）"""
+    return await password_hash_pool.run(get_password_hash, password)
@@ -1,6 +1,8 @@
 """
 此文件用于创建数据库会话，并提供一个全局单例实例
 """
+import functools
+import json
 import logging
 from typing import AsyncGenerator
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
@@ -35,7 +37,8 @@ class AsyncDatabaseSession:
                     # 添加日期时间处理器
                     "command_timeout": 60
                 },
-                json_serializer=lambda obj: obj,  # 防止JSON序列化错误
+                # JSON/JSONB列的序列化：保留中文，日期、Decimal等转成字符串
+                json_serializer=functools.partial(json.dumps, ensure_ascii=False, default=str),
             )
             self._session = async_sessionmaker(
                 self._engine,
@@ -7,6 +7,11 @@ import os
 
 from app.core.config import settings
 from app.core.init_db import init_superuser
+from app.core.security import password_hash_pool
+from app.services.audit_partition_service import audit_partition_maintainer
+from app.services.audit_writer import audit_log_writer
+from app.services.preview_service import preview_generator
+from app.storage import storage
 from app.db.session import db
 from app.api.v1 import api_router
 from app.utils.logger import init_logger, get_logger
@@ -37,6 +42,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # 游标分页的下一页游标
 )
 
 # 挂载静态文件目录
@@ -63,6 +69,10 @@ async def startup_event():
         finally:
             await session.close()
     
+    await storage.start()
+    audit_partition_maintainer.start()
+    audit_log_writer.start()
+    preview_generator.start()
     logger.info("应用初始化完成")
 
 @app.on_event("shutdown")
@@ -71,6 +81,12 @@ async def shutdown_event():
     应用关闭时执行的操作
     """
     logger.info("应用正在关闭...")
+    # 先写入队列中剩余的审计日志，再关闭其他资源
+    await audit_log_writer.stop()
+    await audit_partition_maintainer.stop()
+    await preview_generator.stop()
+    await storage.close()
+    password_hash_pool.shutdown()
 
 # 添加API路由
 app.include_router(api_router, prefix=settings.API_V1_PREFIX)
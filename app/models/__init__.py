@@ -1,9 +1,11 @@
 from .user import User, UserRole, UserFunction
 from .sales_record import SalesRecord, OrderSource, OrderStage
 from .attachment import Attachment, AttachmentType
+from .blob import Blob
 from .fees import ShippingFees, LogisticsType
 from .procurement import Procurement
 from .audit_log import AuditLog, AuditAction, AuditResourceType
+from .sales_rollup import SalesDailyRollup
 
 __all__ = [
     "User",
@@ -14,10 +16,12 @@ __all__ = [
     "OrderStage",
     "Attachment",
     "AttachmentType",
+    "Blob",
     "ShippingFees",
     "LogisticsType",
     "Procurement",
     "AuditLog",
     "AuditAction",
-    "AuditResourceType"
+    "AuditResourceType",
+    "SalesDailyRollup"
 ]
\ No newline at end of file
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import String, Integer, ForeignKey, DateTime
+from sqlalchemy import String, Integer, ForeignKey, DateTime, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base_class import Base
 import enum
@@ -14,10 +14,15 @@ class AttachmentType(str, enum.Enum):
 class Attachment(Base):
     """文件附件模型"""
     
+    __table_args__ = (
+        # 按存储文件名查找引用，以及存储一致性检查按文件名字节序分批扫描（见 StorageGCService）
+        Index("ix_attachment_stored_filename_c", text('stored_filename COLLATE "C"')),
+    )
+    
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     
     # 外键关联销售记录
-    sales_record_id: Mapped[int] = mapped_column(ForeignKey("salesrecord.id"), nullable=False)
+    sales_record_id: Mapped[int] = mapped_column(ForeignKey("salesrecord.id"), nullable=False, index=True)
     sales_record: Mapped["SalesRecord"] = relationship(
         "SalesRecord", 
         back_populates="attachments"
@@ -1,9 +1,10 @@
 from app.db.base_class import Base
-from sqlalchemy import Integer, String, Text, ForeignKey, DateTime
+from sqlalchemy import DDL, Column, Integer, Index, String, Text, ForeignKey, DateTime, event
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from enum import Enum
-from typing import Optional
-from datetime import datetime
+from typing import Any, Optional
+from datetime import datetime, timezone
 
 
 class AuditAction(str, Enum):
@@ -30,22 +31,45 @@ class AuditResourceType(str, Enum):
 
 
 class AuditLog(Base):
-    """审计日志模型"""
+    """
+    审计日志模型
+
+    PostgreSQL 按 created_at 按月范围分区（分区名 auditlog_pYYYYMM，另有默认分区
+    auditlog_default 兜底），带 created_at 范围条件的查询只扫描相关分区。
+    分区的创建和过期清理见 AuditPartitionService。
+    """
+    __table_args__ = (
+        # 列表按 (created_at, id) 倒序游标分页，统计按时间范围扫描
+        Index("ix_auditlog_created_at_id", "created_at", "id"),
+        # 常用过滤条件 + 时间排序：按用户、按操作类型、按资源查看操作记录
+        Index("ix_auditlog_user_id_created_at", "user_id", "created_at", "id"),
+        Index("ix_auditlog_action_created_at", "action", "created_at", "id"),
+        Index("ix_auditlog_resource_created_at", "resource_type", "resource_id", "created_at", "id"),
+        # 按详细信息包含关系（@>）过滤，例如 {"sales_record_id": 123}
+        Index(
+            "ix_auditlog_details",
+            "details",
+            postgresql_using="gin",
+            postgresql_ops={"details": "jsonb_path_ops"},
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
     
-    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    # 分区表的主键必须包含分区键，主键索引以id开头，按id查询仍可使用
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     
     # 操作用户
-    user_id: Mapped[Optional[int]] = mapped_column(ForeignKey("user.id"), nullable=True, index=True)
+    user_id: Mapped[Optional[int]] = mapped_column(ForeignKey("user.id"), nullable=True)
     user: Mapped[Optional["User"]] = relationship("User", back_populates="audit_logs")
     
     # 操作信息
-    action: Mapped[str] = mapped_column(String(20), nullable=False, index=True)
-    resource_type: Mapped[str] = mapped_column(String(50), nullable=False, index=True)
+    action: Mapped[str] = mapped_column(String(20), nullable=False)
+    resource_type: Mapped[str] = mapped_column(String(50), nullable=False)
     resource_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, index=True)
     
     # 操作详情
     description: Mapped[str] = mapped_column(String(500), nullable=False)
-    details: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # JSON格式的详细信息
+    details: Mapped[Optional[Any]] = mapped_column(JSONB, nullable=True)  # 详细信息（JSONB）
     
     # 请求信息
     ip_address: Mapped[Optional[str]] = mapped_column(String(45), nullable=True)  # 支持IPv6
@@ -55,5 +79,21 @@ class AuditLog(Base):
     success: Mapped[bool] = mapped_column(default=True, nullable=False)
     error_message: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     
+    # 分区键，必须非空
+    created_at = Column(
+        DateTime(timezone=True),
+        primary_key=True,
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc)
+    )
+    
     def __repr__(self):
-        return f"<AuditLog(id={self.id}, user_id={self.user_id}, action={self.action}, resource_type={self.resource_type})>"
\ No newline at end of file
+        return f"<AuditLog(id={self.id}, user_id={self.user_id}, action={self.action}, resource_type={self.resource_type})>"
+
+
+# 通过 create_all 建表时（测试、基准测试）同时创建默认分区，保证没有月分区时也能写入
+event.listen(
+    AuditLog.__table__,
+    "after_create",
+    DDL("CREATE TABLE auditlog_default PARTITION OF auditlog DEFAULT").execute_if(dialect="postgresql")
+)
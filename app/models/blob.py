@@ -0,0 +1,22 @@
+from sqlalchemy import Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base_class import Base
+
+
+"""
+blob 附件物理文件表
+
+每个按内容存储的物理文件（{md5}{ext}）一行，ref_count 为引用它的附件记录数，
+由 BlobService 在附件增删的同一事务中维护。ref_count 降为0后由 BlobService 删除文件和此行。
+"""
+class Blob(Base):
+    # 存储文件名（MD5.ext格式），与 Attachment.stored_filename 对应
+    stored_filename: Mapped[str] = mapped_column(String(255), primary_key=True)
+    file_md5: Mapped[str] = mapped_column(String(32), nullable=False, index=True)  # 文件MD5值
+    file_size: Mapped[int] = mapped_column(Integer, nullable=False)             # 文件大小（字节）
+    content_type: Mapped[str] = mapped_column(String(100), nullable=False)      # 首次上传时的MIME类型
+    # 引用此文件的附件数量
+    ref_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+
+    def __repr__(self) -> str:
+        return f"<Blob {self.stored_filename} refs={self.ref_count}>"
@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import Optional, List
-from sqlalchemy import String, Integer, Float, ForeignKey, DateTime, Boolean
+from sqlalchemy import String, Integer, Float, ForeignKey, DateTime, Boolean, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base_class import Base
 import enum
@@ -27,6 +27,24 @@ class OrderStage(str, enum.Enum):
 class SalesRecord(Base):
     """销售记录模型 - 美金订单"""
     
+    __table_args__ = (
+        # 按创建时间范围统计（时间序列）
+        Index("ix_salesrecord_created_at", "created_at"),
+        # pg_trgm三元组索引，支持订单编号/产品名称的子串搜索和相似度搜索
+        Index(
+            "ix_salesrecord_order_number_trgm",
+            "order_number",
+            postgresql_using="gin",
+            postgresql_ops={"order_number": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_salesrecord_product_name_trgm",
+            "product_name",
+            postgresql_using="gin",
+            postgresql_ops={"product_name": "gin_trgm_ops"},
+        ),
+    )
+    
     # 订单号（系统内部主键）
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     # 订单编号（业务编号）
@@ -0,0 +1,36 @@
+from datetime import date
+from decimal import Decimal
+from app.db.base_class import Base
+from sqlalchemy import Date, Integer, Numeric, String, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+"""
+sales_daily_rollup 销售日汇总表
+
+按 (日期, 阶段, 订单来源, 订单类型, 创建人) 汇总未作废销售记录的数量和金额，
+由 SalesRollupService 在销售记录变更的同一事务中增量维护，统计接口直接读取此表。
+日期为 created_at 的UTC日期；金额按行四舍五入到分后累加，避免浮点误差累积。
+"""
+class SalesDailyRollup(Base):
+    __tablename__ = "sales_daily_rollup"
+
+    # 汇总维度（联合主键）
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    stage: Mapped[str] = mapped_column(String(20), primary_key=True)
+    order_source: Mapped[str] = mapped_column(String(20), primary_key=True)
+    order_type: Mapped[str] = mapped_column(String(20), primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("user.id"), primary_key=True)
+
+    # 订单数量
+    order_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    # 总价合计（美元）
+    total_price: Mapped[Decimal] = mapped_column(Numeric(18, 2), nullable=False, default=0, server_default="0")
+    # 出厂价格合计（人民币）
+    factory_price: Mapped[Decimal] = mapped_column(Numeric(18, 2), nullable=False, default=0, server_default="0")
+    # 退款金额合计（人民币）
+    refund_amount: Mapped[Decimal] = mapped_column(Numeric(18, 2), nullable=False, default=0, server_default="0")
+    # 退税金额合计（人民币）
+    tax_refund: Mapped[Decimal] = mapped_column(Numeric(18, 2), nullable=False, default=0, server_default="0")
+    # 利润合计（人民币）
+    profit: Mapped[Decimal] = mapped_column(Numeric(18, 2), nullable=False, default=0, server_default="0")
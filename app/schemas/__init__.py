@@ -9,6 +9,7 @@ from .sales_record import (
     SalesRecordUpdate,
     SalesRecordInDB,
     SalesRecordResponse,
+    SalesRecordSummary,
 )
 from .attachment import (
     AttachmentCreate,
@@ -20,6 +21,13 @@ from .stats import (
     UserStats,
     OrderTypeStats,
     StageStats,
+    TimeSeriesPoint,
+    TimeSeriesStats,
+    PasswordHashPoolStats,
+    CacheStats,
+    AuditWriterStats,
+    PreviewStats,
+    RuntimeStats,
 )
 from .fees import (
     ShippingFeesCreate,
@@ -49,6 +57,7 @@ __all__ = [
     "SalesRecordUpdate",
     "SalesRecordInDB",
     "SalesRecordResponse",
+    "SalesRecordSummary",
     # Attachment schemas
     "AttachmentCreate",
     "AttachmentInDB",
@@ -58,6 +67,13 @@ __all__ = [
     "UserStats",
     "OrderTypeStats",
     "StageStats",
+    "TimeSeriesPoint",
+    "TimeSeriesStats",
+    "PasswordHashPoolStats",
+    "CacheStats",
+    "AuditWriterStats",
+    "PreviewStats",
+    "RuntimeStats",
     # Shipping fees schemas
     "ShippingFeesCreate",
     "ShippingFeesUpdate",
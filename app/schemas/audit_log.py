@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, Optional
 from pydantic import Field
 from app.schemas.base import BaseSchema, TimestampSchema
 from app.models.audit_log import AuditAction, AuditResourceType
@@ -86,7 +86,10 @@ class AuditLogQuery(BaseSchema):
     resource_type: Optional[str] = Field(None, description="资源类型")
     resource_id: Optional[int] = Field(None, description="资源ID")
     success: Optional[bool] = Field(None, description="操作是否成功")
+    details: Optional[Dict[str, Any]] = Field(None, description="详细信息包含的键值")
     start_date: Optional[datetime] = Field(None, description="开始时间")
     end_date: Optional[datetime] = Field(None, description="结束时间")
     page: int = Field(default=1, ge=1, description="页码")
-    size: int = Field(default=20, ge=1, le=100, description="每页数量")
\ No newline at end of file
+    size: int = Field(default=20, ge=1, le=100, description="每页数量")
+    cursor: Optional[str] = Field(None, description="分页游标，传入后忽略页码")
+    total_mode: str = Field(default="exact", description="总数计算方式：exact/estimated/none")
\ No newline at end of file
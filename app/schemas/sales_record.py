@@ -119,7 +119,35 @@ class SalesRecordResponse(SalesRecordInDBBase):
     procurement: List["ProcurementResponse"] = []
 
     class Config:
-        from_attributes = True 
+        from_attributes = True
+
+class SalesRecordSummary(BaseSchema):
+    """销售记录摘要Schema（列表页使用，不含嵌套用户/附件/费用明细）"""
+    id: int
+    order_number: str
+    user_id: int
+    creator_name: Optional[str] = Field(None, description="创建人姓名")
+    order_type: str
+    order_source: str
+    product_name: str
+    quantity: int
+    unit_price: float = Field(..., description="单价（美元）")
+    total_price: float = Field(..., description="总价（美元）")
+    exchange_rate: float = Field(..., description="汇率（美元-人民币）")
+    factory_price: float = Field(..., description="出厂价格（人民币）")
+    refund_amount: float = Field(..., description="退款金额（人民币）")
+    tax_refund: float = Field(..., description="退税金额（人民币）")
+    profit: float = Field(..., description="利润（人民币）")
+    stage: str
+    is_voided: bool
+    attachments_count: int = Field(0, description="附件数量")
+    shipping_fees_count: int = Field(0, description="运费记录数量")
+    shipping_fees_total: float = Field(0.0, description="运费合计（人民币）")
+    procurement_count: int = Field(0, description="采购记录数量")
+    procurement_total: float = Field(0.0, description="采购合计（人民币）")
+    total_amount: float = Field(..., description="总金额，计算方式同SalesRecord.total_amount")
+    created_at: datetime
+    updated_at: datetime
 
 # 解决前向引用问题
 def rebuild_models():
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
+from datetime import date
 
 class DashboardStats(BaseModel):
     """仪表盘统计数据模式"""
@@ -49,4 +50,63 @@ class StageStats(BaseModel):
     """阶段统计模式"""
     stage: str
     count: int
-    percentage: float 
\ No newline at end of file
+    percentage: float 
+
+class TimeSeriesPoint(BaseModel):
+    """时间序列数据点"""
+    bucket_start: date             # 时间桶起始日期（UTC）
+    group: Optional[str] = None    # 分组键（销售人员ID/订单来源/订单类型），不分组时为空
+    group_label: Optional[str] = None  # 分组显示名称（销售人员为姓名）
+    count: int                     # 订单数量
+    total_usd: float               # 总价合计（美元）
+    total_cny: float               # 总价按汇率折算合计（人民币）
+
+class TimeSeriesStats(BaseModel):
+    """时间序列统计数据模式"""
+    bucket: str                    # 时间桶：day/week/month
+    group_by: Optional[str] = None # 分组维度：salesperson/order_source/order_type
+    start_date: date               # 起始日期（含）
+    end_date: date                 # 结束日期（含）
+    points: List[TimeSeriesPoint]
+    order_types: List[OrderTypeStats]  # 区间内按订单类型汇总
+    stages: List[StageStats]           # 区间内按阶段汇总
+
+class PasswordHashPoolStats(BaseModel):
+    """密码哈希线程池指标"""
+    workers: int          # 线程数，0表示同步执行
+    queued: int           # 当前排队的任务数
+    running: int          # 当前执行中的任务数
+    peak_queued: int      # 启动以来最大排队深度
+    completed: int        # 已完成的任务数
+    avg_wait_ms: float    # 平均排队时间（毫秒）
+
+class CacheStats(BaseModel):
+    """进程内缓存指标"""
+    name: str
+    ttl_seconds: float
+    hits: int
+    misses: int
+
+class AuditWriterStats(BaseModel):
+    """审计日志批量写入指标"""
+    running: bool         # 后台写入任务是否运行
+    queued: int           # 队列中等待写入的事件数
+    written: int          # 已写入的事件数
+    failed: int           # 写入失败而丢弃的事件数
+    batches: int          # 已执行的批次数
+
+class PreviewStats(BaseModel):
+    """附件预览图生成指标"""
+    running: bool         # 进程池是否运行
+    workers: int          # 渲染进程数
+    queued: int           # 等待预生成的任务数
+    generated: int        # 已生成的预览图数
+    failed: int           # 生成失败次数
+    dropped: int          # 队列已满而跳过的预生成任务数
+
+class RuntimeStats(BaseModel):
+    """运行时指标（当前工作进程）"""
+    password_hash_pool: PasswordHashPoolStats
+    audit_writer: AuditWriterStats
+    preview: PreviewStats
+    caches: List[CacheStats]
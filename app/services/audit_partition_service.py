@@ -0,0 +1,242 @@
+"""
+审计日志分区维护
+
+auditlog 按 created_at 按月范围分区：
+- 月分区命名为 auditlog_pYYYYMM，范围为该月UTC月初到下月月初（左闭右开）
+- 默认分区 auditlog_default 接收没有对应月分区的数据，避免写入失败
+- ensure_partitions 预先创建当前月及之后若干个月的分区；默认分区中已有该月数据时锁住默认分区，
+  先搬入新分区再挂载
+- apply_retention 分离（或删除）超过保留期的月分区，分离后的表可以单独归档
+"""
+import asyncio
+import re
+from datetime import date, datetime, timezone
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import db
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+PARENT_TABLE = "auditlog"
+DEFAULT_PARTITION = "auditlog_default"
+PARTITION_PREFIX = "auditlog_p"
+_PARTITION_NAME_RE = re.compile(rf"^{PARTITION_PREFIX}(\d{{4}})(\d{{2}})$")
+
+# 分区维护的事务级咨询锁，避免多个进程同时创建/分离分区
+_MAINTENANCE_LOCK_KEY = "auditlog_partition_maintenance"
+
+
+def add_months(month: date, months: int) -> date:
+    """月份加减，返回目标月的1号"""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_of(moment: datetime) -> date:
+    """获取时间所在月份的1号（UTC）"""
+    moment = moment.astimezone(timezone.utc) if moment.tzinfo else moment
+    return date(moment.year, moment.month, 1)
+
+
+def partition_name(month: date) -> str:
+    """月分区表名"""
+    return f"{PARTITION_PREFIX}{month.year:04d}{month.month:02d}"
+
+
+def parse_partition_name(name: str) -> Optional[date]:
+    """从月分区表名解析月份，不是月分区时返回None"""
+    match = _PARTITION_NAME_RE.match(name)
+    if match is None:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+def partition_bounds(month: date) -> Tuple[datetime, datetime]:
+    """月分区的范围（UTC，左闭右开）"""
+    start = datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+    end_month = add_months(month, 1)
+    return start, datetime(end_month.year, end_month.month, 1, tzinfo=timezone.utc)
+
+
+class AuditPartitionService:
+    """审计日志分区服务类"""
+
+    @staticmethod
+    async def _lock(db: AsyncSession) -> None:
+        await db.execute(
+            text("SELECT pg_advisory_xact_lock(hashtext(:key))"),
+            {"key": _MAINTENANCE_LOCK_KEY}
+        )
+
+    @staticmethod
+    async def list_partitions(db: AsyncSession) -> List[date]:
+        """获取已挂载的月分区（按月份升序）"""
+        result = await db.execute(
+            text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = to_regclass(:parent)"
+            ),
+            {"parent": PARENT_TABLE}
+        )
+        months = [parse_partition_name(name) for name in result.scalars()]
+        return sorted(month for month in months if month is not None)
+
+    @staticmethod
+    async def create_partition(db: AsyncSession, month: date) -> None:
+        """
+        创建并挂载指定月份的分区
+
+        先建独立表，把默认分区中落在该月范围内的数据搬过去，再 ATTACH 到父表。
+
+        ATTACH 需要父表的 SHARE UPDATE EXCLUSIVE 锁，并以 ACCESS EXCLUSIVE 锁住默认分区、
+        校验其中没有属于新分区范围的数据。搬移数据之前就按同样的顺序加好这两个锁，
+        否则搬移和 ATTACH 之间写入默认分区的该月数据会让校验失败。持锁直到维护事务提交，
+        期间写入默认分区和无法按 created_at 裁剪分区的查询会等待；分区通常提前几个月预建，
+        此时默认分区中没有该月数据，锁只持有很短时间。
+        """
+        name = partition_name(month)
+        start, end = partition_bounds(month)
+        params = {"start": start, "end": end}
+
+        await db.execute(text(
+            f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        ))
+        await db.execute(text(f"LOCK TABLE ONLY {PARENT_TABLE} IN SHARE UPDATE EXCLUSIVE MODE"))
+        await db.execute(text(f"LOCK TABLE {DEFAULT_PARTITION} IN ACCESS EXCLUSIVE MODE"))
+        moved = await db.execute(
+            text(
+                f"WITH moved AS ("
+                f"DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end RETURNING *"
+                f") INSERT INTO {name} SELECT * FROM moved"
+            ),
+            params
+        )
+        await db.execute(text(
+            f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        ))
+        logger.info(f"创建审计日志分区 {name}，从默认分区迁入 {moved.rowcount} 条")
+
+    @staticmethod
+    async def ensure_partitions(
+        db: AsyncSession,
+        now: datetime = None,
+        months_ahead: int = None
+    ) -> List[str]:
+        """
+        确保当前月及之后 months_ahead 个月的分区存在
+
+        Returns:
+            新创建的分区名列表
+        """
+        now = now or datetime.now(timezone.utc)
+        months_ahead = settings.AUDIT_PARTITION_PREMAKE_MONTHS if months_ahead is None else months_ahead
+
+        await AuditPartitionService._lock(db)
+        existing = set(await AuditPartitionService.list_partitions(db))
+        current = month_of(now)
+        created = []
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if month not in existing:
+                await AuditPartitionService.create_partition(db, month)
+                created.append(partition_name(month))
+        return created
+
+    @staticmethod
+    async def apply_retention(
+        db: AsyncSession,
+        retention_months: int,
+        drop: bool = False,
+        now: datetime = None
+    ) -> List[str]:
+        """
+        处理超过保留期的月分区
+
+        保留当前月及之前 retention_months 个月，更早的月分区从父表分离；
+        drop=True 时分离后直接删除，否则保留为独立表，可归档后再手动删除。
+
+        Returns:
+            被分离（或删除）的分区名列表
+        """
+        if retention_months <= 0:
+            return []
+        now = now or datetime.now(timezone.utc)
+        cutoff = add_months(month_of(now), -retention_months)
+
+        await AuditPartitionService._lock(db)
+        expired = []
+        for month in await AuditPartitionService.list_partitions(db):
+            if month >= cutoff:
+                break
+            name = partition_name(month)
+            await db.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+            if drop:
+                await db.execute(text(f"DROP TABLE {name}"))
+            expired.append(name)
+            logger.info(f"审计日志分区已{'删除' if drop else '分离'}: {name}")
+        return expired
+
+
+class AuditPartitionMaintainer:
+    """
+    定期执行分区维护的后台任务
+
+    启动时立即执行一次，之后每隔 interval 秒执行：预建分区，
+    并在配置了保留期（AUDIT_RETENTION_MONTHS > 0）时处理过期分区。
+    """
+
+    def __init__(self, session_factory: Callable[[], AsyncSession], interval: float):
+        self.session_factory = session_factory
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> None:
+        """执行一次分区维护"""
+        async with self.session_factory() as session:
+            async with session.begin():
+                created = await AuditPartitionService.ensure_partitions(session)
+                expired = await AuditPartitionService.apply_retention(
+                    session,
+                    settings.AUDIT_RETENTION_MONTHS,
+                    drop=settings.AUDIT_RETENTION_DROP
+                )
+        if created or expired:
+            logger.info(f"审计日志分区维护完成 - 新建: {created}, 过期: {expired}")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                # 维护失败不影响写入（默认分区兜底），下个周期重试
+                logger.error(f"审计日志分区维护失败: {e}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """启动后台任务（应用启动时调用）"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="audit-partition-maintainer")
+
+    async def stop(self) -> None:
+        """停止后台任务（应用关闭时调用）"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# 全局分区维护任务，在应用启动/关闭事件中启动和停止
+audit_partition_maintainer = AuditPartitionMaintainer(
+    lambda: db.session(),
+    interval=settings.AUDIT_PARTITION_MAINTENANCE_INTERVAL_SECONDS
+)
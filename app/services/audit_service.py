@@ -1,22 +1,156 @@
+import csv
+import io
 import json
-from typing import Optional, Dict, Any, List
-from datetime import datetime
+import zlib
+from typing import Optional, Dict, Any, AsyncIterator, Iterable, List, Tuple
+from datetime import date, datetime, timedelta, timezone
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import and_, or_, desc, select, func
+from sqlalchemy import Date, cast, desc, literal_column, select, func, tuple_
 from sqlalchemy.orm import selectinload
 from fastapi import Request
 
+from app.core.config import settings
+from app.db.session import db as database
 from app.models.audit_log import AuditLog, AuditAction, AuditResourceType
 from app.models.user import User
 from app.schemas.audit_log import AuditLogCreate, AuditLogQuery, AuditLogResponse
+from app.services.audit_writer import audit_log_writer
 from app.utils.logger import get_logger
+from app.utils.pagination import decode_cursor, encode_cursor
 
 logger = get_logger(__name__)
 
+# 导出格式
+EXPORT_FORMATS = ("jsonl", "csv")
+
+# 导出的列（顺序即CSV表头顺序）
+EXPORT_COLUMNS = (
+    "id", "created_at", "user_id", "user_name", "action", "resource_type", "resource_id",
+    "description", "details", "success", "error_message", "ip_address", "user_agent"
+)
+
+
+def details_to_text(details: Any) -> Optional[str]:
+    """将JSONB详细信息转换为JSON字符串（接口和前端按字符串处理详细信息）"""
+    if details is None:
+        return None
+    return json.dumps(details, ensure_ascii=False)
+
+
+def encode_export_rows(rows: Iterable[Dict[str, Any]], format: str, header: bool = False) -> bytes:
+    """
+    将一批导出记录编码为 JSONL 或 CSV 文本（UTF-8）
+
+    JSONL 中详细信息保留为JSON对象，CSV 中为JSON字符串；时间为ISO格式。
+    """
+    if format == "jsonl":
+        lines = [
+            json.dumps({column: row[column] for column in EXPORT_COLUMNS}, ensure_ascii=False, default=str)
+            for row in rows
+        ]
+        return "".join(line + "\n" for line in lines).encode("utf-8")
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        writer.writerow([
+            details_to_text(row["details"]) if column == "details"
+            else row[column].isoformat() if column == "created_at" and row[column] is not None
+            else row[column]
+            for column in EXPORT_COLUMNS
+        ])
+    return buffer.getvalue().encode("utf-8")
+
+
+def parse_detail_filters(items: List[str]) -> Dict[str, Any]:
+    """
+    解析详细信息过滤条件
+
+    每项格式为 key=value，value 能按JSON解析时使用解析结果（数字、布尔、数组等），
+    否则作为字符串，例如 ["sales_record_id=123", "stored_filename=abc.pdf"]
+    解析为 {"sales_record_id": 123, "stored_filename": "abc.pdf"}。
+
+    Raises:
+        ValueError: 格式不正确
+    """
+    filters = {}
+    for item in items:
+        key, separator, raw_value = item.partition("=")
+        key = key.strip()
+        if not separator or not key:
+            raise ValueError(f"无效的详细信息过滤条件: {item}")
+        try:
+            value = json.loads(raw_value)
+        except ValueError:
+            value = raw_value
+        filters[key] = value
+    return filters
+
 
 class AuditService:
     """审计服务类"""
     
+    @staticmethod
+    def build_audit_values(
+        user_id: Optional[int],
+        action: AuditAction,
+        resource_type: AuditResourceType,
+        description: str,
+        resource_id: Optional[int] = None,
+        details: Optional[Dict[str, Any]] = None,
+        request: Optional[Request] = None,
+        success: bool = True,
+        error_message: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        构建审计日志的列值
+        
+        请求信息（IP、User-Agent）在这里立即提取，事件时间取调用时刻，
+        批量写入时不依赖请求对象，也不会因为排队而推迟记录时间。
+        """
+        # 从请求中提取IP和User-Agent
+        ip_address = None
+        user_agent = None
+        if request:
+            # 获取真实IP地址（考虑代理）
+            ip_address = (
+                request.headers.get("X-Forwarded-For", "")
+                or request.headers.get("X-Real-IP", "")
+                or request.client.host if request.client else None
+            )
+            if ip_address and "," in ip_address:
+                ip_address = ip_address.split(",")[0].strip()
+            
+            user_agent = request.headers.get("User-Agent")
+        
+        # 详细信息写入JSONB列：先序列化再解析，日期、Decimal等值统一转成字符串，
+        # 与数据库中保存的内容一致
+        details_json = None
+        if details:
+            try:
+                details_json = json.loads(json.dumps(details, ensure_ascii=False, default=str))
+            except Exception as e:
+                logger.warning(f"Failed to serialize audit details: {e}")
+                details_json = {"raw": str(details)}
+        
+        now = datetime.now(timezone.utc)
+        return {
+            "user_id": user_id,
+            "action": action.value,
+            "resource_type": resource_type.value,
+            "resource_id": resource_id,
+            "description": description,
+            "details": details_json,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "success": success,
+            "error_message": error_message,
+            "created_at": now,
+            "updated_at": now,
+        }
+    
     @staticmethod
     async def log_action(
         db: AsyncSession,
@@ -28,11 +162,15 @@ class AuditService:
         details: Optional[Dict[str, Any]] = None,
         request: Optional[Request] = None,
         success: bool = True,
-        error_message: Optional[str] = None
-    ) -> AuditLog:
+        error_message: Optional[str] = None,
+        sync: bool = False
+    ) -> Optional[AuditLog]:
         """
         记录审计日志
         
+        默认放入批量写入队列后立即返回（见 audit_writer），不占用调用方的会话和事务；
+        sync=True 或批量写入器未启动时，在调用方会话中写入并提交，返回后已持久化。
+        
         Args:
             db: 数据库会话
             user_id: 操作用户ID
@@ -44,48 +182,30 @@ class AuditService:
             request: FastAPI请求对象
             success: 操作是否成功
             error_message: 错误信息
+            sync: 是否同步写入（必须在响应前落库的事件使用）
             
         Returns:
-            创建的审计日志对象
+            同步写入时返回创建的审计日志对象，放入队列时返回None
         """
+        values = AuditService.build_audit_values(
+            user_id=user_id,
+            action=action,
+            resource_type=resource_type,
+            description=description,
+            resource_id=resource_id,
+            details=details,
+            request=request,
+            success=success,
+            error_message=error_message
+        )
+        
+        if not sync and audit_log_writer.running:
+            await audit_log_writer.enqueue(values)
+            return None
+        
         try:
-            # 从请求中提取IP和User-Agent
-            ip_address = None
-            user_agent = None
-            if request:
-                # 获取真实IP地址（考虑代理）
-                ip_address = (
-                    request.headers.get("X-Forwarded-For", "")
-                    or request.headers.get("X-Real-IP", "")
-                    or request.client.host if request.client else None
-                )
-                if ip_address and "," in ip_address:
-                    ip_address = ip_address.split(",")[0].strip()
-                
-                user_agent = request.headers.get("User-Agent")
-            
-            # 将详细信息转换为JSON字符串
-            details_json = None
-            if details:
-                try:
-                    details_json = json.dumps(details, ensure_ascii=False, default=str)
-                except Exception as e:
-                    logger.warning(f"Failed to serialize audit details: {e}")
-                    details_json = str(details)
-            
             # 创建审计日志
-            audit_log = AuditLog(
-                user_id=user_id,
-                action=action.value,
-                resource_type=resource_type.value,
-                resource_id=resource_id,
-                description=description,
-                details=details_json,
-                ip_address=ip_address,
-                user_agent=user_agent,
-                success=success,
-                error_message=error_message
-            )
+            audit_log = AuditLog(**values)
             
             db.add(audit_log)
             await db.commit()
@@ -105,21 +225,8 @@ class AuditService:
             raise
     
     @staticmethod
-    async def get_audit_logs(
-        db: AsyncSession,
-        query: AuditLogQuery
-    ) -> tuple[List[AuditLogResponse], int]:
-        """
-        查询审计日志
-        
-        Args:
-            db: 数据库会话
-            query: 查询参数
-            
-        Returns:
-            (审计日志列表, 总数)
-        """
-        # 构建查询条件
+    def build_conditions(query: AuditLogQuery) -> list:
+        """根据查询参数构建过滤条件"""
         conditions = []
         
         if query.user_id is not None:
@@ -137,36 +244,118 @@ class AuditService:
         if query.success is not None:
             conditions.append(AuditLog.success == query.success)
         
+        if query.details:
+            # JSONB包含查询，可以使用 details 上的GIN索引
+            conditions.append(AuditLog.details.contains(query.details))
+        
         if query.start_date:
             conditions.append(AuditLog.created_at >= query.start_date)
         
         if query.end_date:
             conditions.append(AuditLog.created_at <= query.end_date)
         
-        # 构建基础查询
-        base_query = select(AuditLog).options(selectinload(AuditLog.user))
+        return conditions
+    
+    @staticmethod
+    async def count_audit_logs(
+        db: AsyncSession,
+        conditions: list,
+        total_mode: str = "exact"
+    ) -> Tuple[Optional[int], bool]:
+        """
+        统计符合条件的审计日志数量
         
-        if conditions:
-            base_query = base_query.filter(and_(*conditions))
+        Args:
+            db: 数据库会话
+            conditions: 过滤条件
+            total_mode: exact 精确计数；estimated 最多数到 AUDIT_COUNT_CAP 条，
+                超过时改用查询计划的估算行数；none 不计数
+            
+        Returns:
+            (总数, 是否为估算值)，total_mode 为 none 时总数为None
+        """
+        if total_mode == "none":
+            return None, False
+        
+        if total_mode == "exact":
+            count_query = select(func.count()).select_from(AuditLog).where(*conditions)
+            return (await db.execute(count_query)).scalar(), False
         
-        # 获取总数
-        count_query = select(func.count(AuditLog.id))
-        if conditions:
-            count_query = count_query.filter(and_(*conditions))
+        # 有上限的计数：只读取 cap+1 行，数量不超过上限时就是精确值
+        cap = settings.AUDIT_COUNT_CAP
+        capped = select(literal_column("1")).select_from(AuditLog).where(*conditions).limit(cap + 1).subquery()
+        total = (await db.execute(select(func.count()).select_from(capped))).scalar()
+        if total <= cap:
+            return total, False
+        
+        # 超过上限时使用查询计划的估算行数（来自表统计信息，不扫描数据）
+        estimate_query = select(literal_column("1")).select_from(AuditLog).where(*conditions)
+        compiled = estimate_query.compile(dialect=db.bind.dialect)
+        parameters = tuple(compiled.params[name] for name in compiled.positiontup or ())
+        connection = await db.connection()
+        result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled.string}", parameters)
+        plan = result.scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        estimated = int(plan[0]["Plan"]["Plan Rows"])
+        return max(estimated, cap + 1), True
+    
+    @staticmethod
+    async def get_audit_logs(
+        db: AsyncSession,
+        query: AuditLogQuery
+    ) -> Dict[str, Any]:
+        """
+        查询审计日志
         
-        total_result = await db.execute(count_query)
-        total = total_result.scalar()
+        按 (created_at, id) 倒序排列。传入 cursor 时使用游标分页，从上一页最后一条
+        之后继续读取，耗时与翻到第几页无关；否则使用 page/size 偏移分页。
+        
+        Args:
+            db: 数据库会话
+            query: 查询参数
+            
+        Returns:
+            items: 审计日志列表
+            total: 总数（total_mode 为 none 时为None）
+            total_is_estimate: 总数是否为估算值
+            next_cursor: 下一页游标，没有更多数据时为None
+            
+        Raises:
+            ValueError: 游标格式不正确
+        """
+        conditions = AuditService.build_conditions(query)
+        
+        total, total_is_estimate = await AuditService.count_audit_logs(db, conditions, query.total_mode)
         
-        # 分页查询
         paginated_query = (
-            base_query
-            .order_by(desc(AuditLog.created_at))
-            .offset((query.page - 1) * query.size)
-            .limit(query.size)
+            select(AuditLog)
+            .options(selectinload(AuditLog.user))
+            .where(*conditions)
+            .order_by(desc(AuditLog.created_at), desc(AuditLog.id))
+            .limit(query.size + 1)
         )
+        if query.cursor:
+            values = decode_cursor(query.cursor)
+            try:
+                last_created_at = datetime.fromisoformat(values["created_at"])
+                last_id = int(values["id"])
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"无效的游标: {query.cursor}") from e
+            paginated_query = paginated_query.where(
+                tuple_(AuditLog.created_at, AuditLog.id) < tuple_(last_created_at, last_id)
+            )
+        else:
+            paginated_query = paginated_query.offset((query.page - 1) * query.size)
         
         result = await db.execute(paginated_query)
-        audit_logs = result.scalars().all()
+        audit_logs = list(result.scalars().all())
+        
+        next_cursor = None
+        if len(audit_logs) > query.size:
+            audit_logs = audit_logs[:query.size]
+            last = audit_logs[-1]
+            next_cursor = encode_cursor({"created_at": last.created_at.isoformat(), "id": last.id})
         
         # 转换为响应格式
         responses = []
@@ -179,7 +368,7 @@ class AuditService:
                 "resource_type": log.resource_type,
                 "resource_id": log.resource_id,
                 "description": log.description,
-                "details": log.details,
+                "details": details_to_text(log.details),
                 "ip_address": log.ip_address,
                 "user_agent": log.user_agent,
                 "success": log.success,
@@ -189,7 +378,179 @@ class AuditService:
             }
             responses.append(AuditLogResponse(**response_data))
         
-        return responses, total
+        return {
+            "items": responses,
+            "total": total,
+            "total_is_estimate": total_is_estimate,
+            "next_cursor": next_cursor
+        }
+    
+    @staticmethod
+    def build_export_query(query: AuditLogQuery):
+        """构建导出查询：与列表相同的过滤条件，按时间正序，只取导出需要的列"""
+        return (
+            select(
+                AuditLog.id,
+                AuditLog.created_at,
+                AuditLog.user_id,
+                User.full_name.label("user_name"),
+                AuditLog.action,
+                AuditLog.resource_type,
+                AuditLog.resource_id,
+                AuditLog.description,
+                AuditLog.details,
+                AuditLog.success,
+                AuditLog.error_message,
+                AuditLog.ip_address,
+                AuditLog.user_agent,
+            )
+            .outerjoin(User, User.id == AuditLog.user_id)
+            .where(*AuditService.build_conditions(query))
+            .order_by(AuditLog.created_at, AuditLog.id)
+        )
+
+    @staticmethod
+    async def export_audit_logs(
+        query: AuditLogQuery,
+        format: str,
+        session_factory=None
+    ) -> AsyncIterator[bytes]:
+        """
+        流式导出审计日志，逐块产出gzip压缩数据
+
+        使用服务端游标每次读取 AUDIT_EXPORT_BATCH_SIZE 行，编码后立即压缩输出，
+        内存占用只与批大小有关。响应开始发送时请求依赖中的会话已经关闭，
+        所以这里使用独立的会话，游标在生成器结束（或客户端断开）时关闭。
+
+        Args:
+            query: 查询参数（分页参数不使用）
+            format: 导出格式，jsonl 或 csv
+            session_factory: 创建数据库会话的函数，默认使用应用的会话
+        """
+        session_factory = session_factory or database.session
+        # wbits=31 输出带gzip头和校验的数据
+        compressor = zlib.compressobj(level=6, wbits=31)
+        batch_size = settings.AUDIT_EXPORT_BATCH_SIZE
+        exported = 0
+
+        async with session_factory() as session:
+            result = await session.stream(
+                AuditService.build_export_query(query).execution_options(yield_per=batch_size)
+            )
+            try:
+                header = format == "csv"
+                async for rows in result.mappings().partitions():
+                    chunk = compressor.compress(encode_export_rows(rows, format, header=header))
+                    header = False
+                    exported += len(rows)
+                    if chunk:
+                        yield chunk
+                if header:
+                    # 没有数据时CSV也输出表头
+                    chunk = compressor.compress(encode_export_rows([], format, header=True))
+                    if chunk:
+                        yield chunk
+            finally:
+                await result.close()
+
+        yield compressor.flush()
+        logger.info(f"审计日志导出完成 - format: {format}, rows: {exported}")
+
+    @staticmethod
+    def build_audit_stats_query(start_at: datetime, end_at: datetime):
+        """
+        构建审计统计查询
+
+        一次扫描时间窗口内的审计日志，用 GROUPING SETS 同时得到：
+        - ()：总数、成功数、活跃用户数
+        - (action)、(resource_type)：按操作类型、资源类型的数量
+        - (day)：按UTC日期的数量和成功数（每日趋势）
+        created_at 范围条件同时用于分区裁剪。
+        """
+        day_expr = cast(
+            func.date_trunc(literal_column("'day'"), func.timezone(literal_column("'UTC'"), AuditLog.created_at)),
+            Date
+        ).label("day")
+        return (
+            select(
+                AuditLog.action,
+                AuditLog.resource_type,
+                day_expr,
+                func.grouping(AuditLog.action).label("g_action"),
+                func.grouping(AuditLog.resource_type).label("g_resource_type"),
+                func.grouping(day_expr).label("g_day"),
+                func.count().label("total"),
+                func.count().filter(AuditLog.success == True).label("successful"),
+                func.count(AuditLog.user_id.distinct()).label("active_users"),
+            )
+            .where(AuditLog.created_at >= start_at, AuditLog.created_at <= end_at)
+            .group_by(func.grouping_sets(
+                tuple_(),
+                tuple_(AuditLog.action),
+                tuple_(AuditLog.resource_type),
+                tuple_(day_expr),
+            ))
+        )
+
+    @staticmethod
+    async def get_audit_stats(db: AsyncSession, start_at: datetime, end_at: datetime) -> Dict[str, Any]:
+        """
+        获取审计统计信息（单次扫描）
+
+        Args:
+            db: 数据库会话
+            start_at: 起始时间（含）
+            end_at: 结束时间（含）
+
+        Returns:
+            汇总、按操作类型、按资源类型统计和每日趋势（没有操作的日期补0）
+        """
+        rows = (await db.execute(AuditService.build_audit_stats_query(start_at, end_at))).mappings().all()
+
+        summary_row = None
+        action_stats = {}
+        resource_stats = {}
+        daily_rows = {}
+        for row in rows:
+            if row["g_action"] == 0:
+                action_stats[row["action"]] = row["total"]
+            elif row["g_resource_type"] == 0:
+                resource_stats[row["resource_type"]] = row["total"]
+            elif row["g_day"] == 0:
+                daily_rows[row["day"]] = row
+            else:
+                summary_row = row
+
+        total_operations = summary_row["total"] if summary_row else 0
+        successful_operations = summary_row["successful"] if summary_row else 0
+
+        daily = []
+        day = start_at.astimezone(timezone.utc).date()
+        last_day = end_at.astimezone(timezone.utc).date()
+        while day <= last_day:
+            row = daily_rows.get(day)
+            total = row["total"] if row else 0
+            successful = row["successful"] if row else 0
+            daily.append({
+                "date": day.isoformat(),
+                "total": total,
+                "successful": successful,
+                "failed": total - successful
+            })
+            day += timedelta(days=1)
+
+        return {
+            "summary": {
+                "total_operations": total_operations,
+                "successful_operations": successful_operations,
+                "failed_operations": total_operations - successful_operations,
+                "success_rate": round(successful_operations / total_operations * 100, 2) if total_operations > 0 else 0,
+                "active_users": summary_row["active_users"] if summary_row else 0
+            },
+            "action_stats": action_stats,
+            "resource_stats": resource_stats,
+            "daily": daily
+        }
     
     @staticmethod
     async def get_audit_log_by_id(
@@ -226,7 +587,7 @@ class AuditService:
             "resource_type": log.resource_type,
             "resource_id": log.resource_id,
             "description": log.description,
-            "details": log.details,
+            "details": details_to_text(log.details),
             "ip_address": log.ip_address,
             "user_agent": log.user_agent,
             "success": log.success,
@@ -275,7 +636,7 @@ class AuditService:
                 "resource_type": log.resource_type,
                 "resource_id": log.resource_id,
                 "description": log.description,
-                "details": log.details,
+                "details": details_to_text(log.details),
                 "ip_address": log.ip_address,
                 "user_agent": log.user_agent,
                 "success": log.success,
@@ -297,7 +658,7 @@ async def log_create_action(
     description: str,
     details: Optional[Dict[str, Any]] = None,
     request: Optional[Request] = None
-) -> AuditLog:
+) -> Optional[AuditLog]:
     """记录创建操作"""
     return await AuditService.log_action(
         db=db,
@@ -319,7 +680,7 @@ async def log_update_action(
     description: str,
     details: Optional[Dict[str, Any]] = None,
     request: Optional[Request] = None
-) -> AuditLog:
+) -> Optional[AuditLog]:
     """记录更新操作"""
     return await AuditService.log_action(
         db=db,
@@ -341,7 +702,7 @@ async def log_delete_action(
     description: str,
     details: Optional[Dict[str, Any]] = None,
     request: Optional[Request] = None
-) -> AuditLog:
+) -> Optional[AuditLog]:
     """记录删除操作"""
     return await AuditService.log_action(
         db=db,
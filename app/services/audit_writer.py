@@ -0,0 +1,201 @@
+"""
+审计日志批量写入
+
+AuditService.log_action 默认把审计事件放入内存队列，由后台任务按数量或时间阈值
+用一条多行 INSERT 批量写入，请求本身不再为审计日志额外提交一次事务。
+
+- 队列有上限（AUDIT_QUEUE_MAX_SIZE），写满时 enqueue 会等待，形成背压
+- 应用关闭时 stop() 会把队列中剩余的事件全部写入
+- 连接中断等临时错误按指数退避重试；数据错误时把批次对半拆分重写，只丢弃出错的事件
+- 最终写入失败的事件会记录到错误日志（包含事件摘要），不会影响业务请求
+"""
+import asyncio
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import db
+from app.models.audit_log import AuditLog
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 关闭信号
+_STOP = object()
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """是否为重试可能成功的临时错误（连接中断、连接池超时等），数据错误返回False"""
+    if isinstance(error, DBAPIError) and error.connection_invalidated:
+        return True
+    return isinstance(error, (OperationalError, InterfaceError, PoolTimeoutError, OSError, asyncio.TimeoutError))
+
+
+class AuditLogWriter:
+    """
+    审计日志批量写入器
+
+    Args:
+        session_factory: 创建数据库会话的函数，每个批次使用独立的会话和事务
+        batch_size: 单批最多写入的事件数（多行INSERT参数个数不能超过32767）
+        flush_interval: 收到第一条事件后最多等待的秒数
+        max_queue_size: 队列上限，写满时入队方等待
+        max_retries: 临时错误的重试次数
+        retry_backoff: 首次重试前等待的秒数，之后每次翻倍
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        batch_size: int = 200,
+        flush_interval: float = 1.0,
+        max_queue_size: int = 10000,
+        max_retries: int = 3,
+        retry_backoff: float = 0.5
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0    # 已写入的事件数
+        self.failed = 0     # 写入失败而丢弃的事件数
+        self.batches = 0    # 已执行的批次数
+        self.retries = 0    # 临时错误的重试次数
+
+    @property
+    def running(self) -> bool:
+        """后台写入任务是否在运行"""
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """启动后台写入任务（应用启动时调用）"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._task = asyncio.create_task(self._run(), name="audit-log-writer")
+        logger.info(
+            f"审计日志批量写入已启动 - batch_size: {self.batch_size}, "
+            f"flush_interval: {self.flush_interval}s, max_queue_size: {self.max_queue_size}"
+        )
+
+    async def stop(self) -> None:
+        """写入队列中剩余的事件并停止后台任务（应用关闭时调用）"""
+        if not self.running:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+        logger.info(f"审计日志批量写入已停止 - written: {self.written}, failed: {self.failed}")
+
+    async def enqueue(self, values: Dict[str, Any]) -> None:
+        """放入一条审计事件（AuditLog列值字典），队列已满时等待"""
+        await self._queue.put(values)
+
+    async def flush(self) -> None:
+        """等待当前队列中的事件全部写入"""
+        if self.running:
+            await self._queue.join()
+
+    def stats(self) -> Dict[str, Any]:
+        """获取写入指标"""
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "written": self.written,
+            "failed": self.failed,
+            "batches": self.batches,
+            "retries": self.retries,
+        }
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                break
+
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    # 先取走已经排队的事件，队列为空时再等到时间阈值
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if item is _STOP:
+                    self._queue.task_done()
+                    stopping = True
+                    break
+                batch.append(item)
+
+            try:
+                await self._write_batch(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            await self._insert_with_retry(batch)
+        except Exception as e:
+            if len(batch) > 1 and not is_transient_error(e):
+                # 数据错误：对半拆分后分别写入，最终只丢弃出错的事件
+                middle = len(batch) // 2
+                logger.warning(f"批量写入审计日志失败，拆分为 {middle} + {len(batch) - middle} 条重试: {e}")
+                await self._write_batch(batch[:middle])
+                await self._write_batch(batch[middle:])
+                return
+            self.failed += len(batch)
+            summary = "; ".join(
+                f"user_id={values['user_id']} {values['action']} {values['resource_type']}:{values['resource_id']}"
+                for values in batch
+            )
+            logger.error(f"批量写入审计日志失败，丢弃 {len(batch)} 条: {e} | {summary}")
+            return
+        self.written += len(batch)
+        self.batches += 1
+        logger.debug(f"批量写入审计日志 {len(batch)} 条")
+
+    async def _insert_with_retry(self, batch: List[Dict[str, Any]]) -> None:
+        """写入一个批次，临时错误按指数退避重试，重试用尽或其他错误时抛出"""
+        attempt = 0
+        while True:
+            try:
+                async with self.session_factory() as session:
+                    await session.execute(insert(AuditLog).values(batch))
+                    await session.commit()
+                return
+            except Exception as e:
+                if attempt >= self.max_retries or not is_transient_error(e):
+                    raise
+                delay = self.retry_backoff * 2 ** attempt
+                attempt += 1
+                self.retries += 1
+                logger.warning(f"写入审计日志遇到临时错误，{delay:.1f}秒后第 {attempt} 次重试: {e}")
+                await asyncio.sleep(delay)
+
+# 全局写入器，在应用启动/关闭事件中启动和停止；未启动时 log_action 直接写入
+audit_log_writer = AuditLogWriter(
+    lambda: db.session(),
+    batch_size=settings.AUDIT_BATCH_SIZE,
+    flush_interval=settings.AUDIT_FLUSH_INTERVAL_SECONDS,
+    max_queue_size=settings.AUDIT_QUEUE_MAX_SIZE,
+    max_retries=settings.AUDIT_WRITE_RETRIES,
+    retry_backoff=settings.AUDIT_RETRY_BACKOFF_SECONDS
+)
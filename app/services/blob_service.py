@@ -0,0 +1,175 @@
+"""
+附件物理文件引用计数
+
+附件按内容去重存储，多个附件记录可能引用同一个物理文件。blob 表按存储文件名记录
+每个物理文件被引用的次数，上传和删除附件时在同一事务中增减，
+判断文件能否删除只需按主键读一行，不再按 stored_filename 扫描附件表。
+
+并发约定（按存储文件名的事务级咨询锁串行化）：
+- 上传：add_reference 加锁并增加计数后再把文件放到存储位置，锁持有到事务提交
+- 删除：release_reference 在删除附件的事务中减少计数；提交后调用 purge_if_unreferenced，
+  加锁后确认计数仍为0再删除文件和 blob 行，不会删掉并发上传刚登记的文件
+- 修复：recount 和 purge_if_orphaned 以附件表为准（存储一致性检查使用），同样先加锁，
+  上传事务提交之前不会读到中间状态
+"""
+from typing import Optional
+
+from sqlalchemy import delete, exists, func, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.attachment import Attachment
+from app.models.blob import Blob
+from app.storage import storage
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 按 C 排序规则比较存储文件名，使用 ix_attachment_stored_filename_c 索引
+ATTACHMENT_STORED_FILENAME = Attachment.stored_filename.collate("C")
+
+
+class BlobService:
+    """附件物理文件服务类"""
+
+    @staticmethod
+    async def _lock(db: AsyncSession, stored_filename: str) -> None:
+        await db.execute(
+            text("SELECT pg_advisory_xact_lock(hashtext(:key))"),
+            {"key": f"blob:{stored_filename}"}
+        )
+
+    @staticmethod
+    async def add_reference(
+        db: AsyncSession,
+        stored_filename: str,
+        file_md5: str,
+        file_size: int,
+        content_type: str
+    ) -> int:
+        """
+        登记一次文件引用（不存在时创建 blob 行）
+
+        Returns:
+            登记后的引用次数，为1表示这是文件的第一个引用
+        """
+        await BlobService._lock(db, stored_filename)
+        stmt = pg_insert(Blob).values(
+            stored_filename=stored_filename,
+            file_md5=file_md5,
+            file_size=file_size,
+            content_type=content_type,
+            ref_count=1
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Blob.stored_filename],
+            set_={"ref_count": Blob.ref_count + 1, "updated_at": stmt.excluded.updated_at}
+        ).returning(Blob.ref_count)
+        return (await db.execute(stmt)).scalar_one()
+
+    @staticmethod
+    async def release_reference(db: AsyncSession, stored_filename: str, count: int = 1) -> Optional[int]:
+        """
+        释放文件引用（与删除附件记录在同一事务中调用）
+
+        Returns:
+            剩余引用次数，没有 blob 行时返回None
+        """
+        result = await db.execute(
+            update(Blob)
+            .where(Blob.stored_filename == stored_filename)
+            .values(ref_count=Blob.ref_count - count)
+            .returning(Blob.ref_count)
+        )
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    async def purge_if_unreferenced(db: AsyncSession, stored_filename: str) -> bool:
+        """
+        文件没有引用时删除文件和 blob 行，并提交事务
+
+        在附件增删的事务提交之后调用（回滚后清理也使用此方法）。
+        没有 blob 行表示文件的引用已全部回滚或释放，同样删除文件。
+
+        Returns:
+            是否删除了文件
+        """
+        await BlobService._lock(db, stored_filename)
+        ref_count = (await db.execute(
+            select(Blob.ref_count).where(Blob.stored_filename == stored_filename)
+        )).scalar_one_or_none()
+        if ref_count is not None and ref_count > 0:
+            await db.commit()
+            return False
+
+        await db.execute(delete(Blob).where(Blob.stored_filename == stored_filename))
+        deleted = await storage.delete(stored_filename)
+        await db.commit()
+        if deleted:
+            logger.info(f"文件已无引用，已删除 - stored_filename: {stored_filename}")
+        return deleted
+
+    @staticmethod
+    async def recount(db: AsyncSession, stored_filename: str) -> int:
+        """
+        按附件表重新计算文件的引用次数，并提交事务
+
+        有附件引用但没有 blob 行时补建；没有附件引用时计数置0（文件由 purge_if_orphaned 清理）。
+
+        Returns:
+            实际引用次数
+        """
+        await BlobService._lock(db, stored_filename)
+        references = (
+            select(
+                Attachment.stored_filename,
+                func.min(Attachment.file_md5),
+                func.max(Attachment.file_size),
+                func.min(Attachment.content_type),
+                func.count()
+            )
+            .where(ATTACHMENT_STORED_FILENAME == stored_filename)
+            .group_by(Attachment.stored_filename)
+        )
+        stmt = pg_insert(Blob).from_select(
+            ["stored_filename", "file_md5", "file_size", "content_type", "ref_count"], references
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Blob.stored_filename],
+            set_={"ref_count": stmt.excluded.ref_count}
+        ).returning(Blob.ref_count)
+        ref_count = (await db.execute(stmt)).scalar_one_or_none()
+        if ref_count is None:
+            ref_count = 0
+            await db.execute(
+                update(Blob).where(Blob.stored_filename == stored_filename).values(ref_count=0)
+            )
+        await db.commit()
+        return ref_count
+
+    @staticmethod
+    async def purge_if_orphaned(db: AsyncSession, stored_filename: str) -> bool:
+        """
+        没有任何附件记录引用文件时删除文件和 blob 行，并提交事务
+
+        与 purge_if_unreferenced 不同，这里以附件表为准，不信任可能已经不准确的 ref_count。
+
+        Returns:
+            是否删除了文件（或没有文件的 blob 行）
+        """
+        await BlobService._lock(db, stored_filename)
+        referenced = (await db.execute(
+            select(exists().where(ATTACHMENT_STORED_FILENAME == stored_filename))
+        )).scalar()
+        if referenced:
+            await db.commit()
+            return False
+
+        deleted_rows = (await db.execute(
+            delete(Blob).where(Blob.stored_filename == stored_filename)
+        )).rowcount
+        deleted = await storage.delete(stored_filename)
+        await db.commit()
+        if deleted:
+            logger.info(f"删除孤立文件 - stored_filename: {stored_filename}")
+        return deleted or deleted_rows > 0
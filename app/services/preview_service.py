@@ -0,0 +1,196 @@
+"""
+附件预览图生成
+
+预览图按原文件的存储文件名缓存，和原文件放在同一个分片目录下
+（files/ab/cd/{stored_filename}.preview-{尺寸}.jpg），内容相同的附件共用一份预览图。
+
+- 上传后 schedule 把生成任务放入有界队列，由后台任务提交到进程池；队列满时直接丢弃，
+  上传请求不会等待渲染，被丢弃的预览在第一次请求时生成
+- 请求预览时 get_preview 已有缓存直接返回，否则在进程池中生成；同一文件的并发请求只生成一次
+- 渲染是CPU密集操作（图片解码缩放、PDF光栅化），放在独立进程中执行，不占用事件循环和GIL
+- 使用对象存储时原文件先下载到本机临时文件再渲染，预览图缓存在各节点本机的 files/ 目录中
+"""
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.storage import storage
+from app.utils.file_handler import file_handler
+from app.utils.logger import get_logger
+from app.utils.preview_renderer import can_preview, render_preview
+
+logger = get_logger(__name__)
+
+
+class PreviewGenerator:
+    """
+    预览图生成器
+
+    Args:
+        max_workers: 渲染进程数，小于等于0时不启动进程池和后台队列，请求时在线程中生成
+        max_queue_size: 上传后待生成预览的队列上限
+        max_size: 预览图最长边像素
+    """
+
+    def __init__(self, max_workers: int = 2, max_queue_size: int = 100, max_size: int = 320):
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.max_size = max_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.generated = 0  # 已生成的预览数
+        self.failed = 0     # 生成失败的次数
+        self.dropped = 0    # 队列已满而丢弃的预生成任务数
+
+    @property
+    def running(self) -> bool:
+        """进程池和后台任务是否在运行"""
+        return self._executor is not None
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        # 使用spawn启动子进程，不复制事件循环线程和数据库连接
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def start(self) -> None:
+        """启动进程池和后台预生成任务（应用启动时调用）"""
+        if self.running or self.max_workers <= 0:
+            return
+        self._executor = self._create_executor()
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._tasks = [
+            asyncio.create_task(self._run(), name=f"preview-generator-{index}")
+            for index in range(self.max_workers)
+        ]
+        logger.info(f"预览图生成已启动 - workers: {self.max_workers}, max_queue_size: {self.max_queue_size}")
+
+    async def stop(self) -> None:
+        """停止后台任务和进程池（应用关闭时调用），未生成的预览在下次请求时生成"""
+        if not self.running:
+            return
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        self._queue = None
+        logger.info(f"预览图生成已停止 - generated: {self.generated}, failed: {self.failed}, dropped: {self.dropped}")
+
+    def preview_path(self, stored_filename: str) -> Path:
+        """预览图缓存路径"""
+        return file_handler.get_preview_path(stored_filename, self.max_size)
+
+    def schedule(self, stored_filename: str, content_type: str) -> bool:
+        """
+        上传后预生成预览图（不等待）
+
+        Returns:
+            是否放入了队列；不支持预览、已有缓存、未启动或队列已满时返回False
+        """
+        if not self.running or not can_preview(content_type):
+            return False
+        if self.preview_path(stored_filename).exists():
+            return False
+        try:
+            self._queue.put_nowait((stored_filename, content_type))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.debug(f"预览队列已满，跳过预生成 - {stored_filename}")
+            return False
+        return True
+
+    async def get_preview(self, stored_filename: str, content_type: str) -> Optional[Path]:
+        """
+        获取预览图路径，没有缓存时生成
+
+        Returns:
+            预览图路径；原文件不存在时返回None
+
+        Raises:
+            ValueError: 不支持的文件类型
+            Exception: 渲染失败
+        """
+        target = self.preview_path(stored_filename)
+        if target.exists():
+            return target
+
+        future = self._inflight.get(target.name)
+        if future is None:
+            future = asyncio.ensure_future(self._render(stored_filename, target, content_type))
+            self._inflight[target.name] = future
+            future.add_done_callback(lambda _: self._inflight.pop(target.name, None))
+        # 请求取消时不取消生成，其他等待者和缓存仍可使用结果
+        try:
+            await asyncio.shield(future)
+        except FileNotFoundError:
+            return None
+        return target
+
+    async def _render(self, stored_filename: str, target: Path, content_type: str) -> None:
+        # 记下提交任务时的进程池，重建时只替换这一个
+        executor = self._executor
+        try:
+            async with storage.open_local(stored_filename) as source:
+                args: Tuple[Any, ...] = (str(source), str(target), content_type, self.max_size)
+                if executor is not None:
+                    loop = asyncio.get_running_loop()
+                    await loop.run_in_executor(executor, render_preview, *args)
+                else:
+                    await run_in_threadpool(render_preview, *args)
+        except FileNotFoundError:
+            # 原文件不存在，不计入失败
+            raise
+        except BrokenProcessPool:
+            # 子进程异常退出（如解析畸形文件时崩溃）后进程池不可用，重建。
+            # 同一个进程池上进行中的任务都会失败，只有第一个重建，其他任务不能关闭已经换上的新进程池
+            self.failed += 1
+            if executor is not None and self._executor is executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = self._create_executor()
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        self.generated += 1
+
+    async def _run(self) -> None:
+        while True:
+            stored_filename, content_type = await self._queue.get()
+            try:
+                await self.get_preview(stored_filename, content_type)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"预生成预览图失败 - {stored_filename}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        """获取生成指标"""
+        return {
+            "running": self.running,
+            "workers": self.max_workers,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "generated": self.generated,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
+
+
+# 全局预览图生成器，在应用启动/关闭事件中启动和停止
+preview_generator = PreviewGenerator(
+    max_workers=settings.PREVIEW_WORKERS,
+    max_queue_size=settings.PREVIEW_QUEUE_MAX_SIZE,
+    max_size=settings.PREVIEW_MAX_SIZE
+)
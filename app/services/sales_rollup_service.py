@@ -0,0 +1,171 @@
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Date, Double, Numeric, cast, delete, func, literal, literal_column, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.models.sales_record import SalesRecord
+from app.models.sales_rollup import SalesDailyRollup
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 汇总维度
+KEY_COLUMNS = ("day", "stage", "order_source", "order_type", "user_id")
+# 汇总的金额字段（与销售记录字段同名）
+AMOUNT_COLUMNS = ("total_price", "factory_price", "refund_amount", "tax_refund", "profit")
+# 汇总值字段
+VALUE_COLUMNS = ("order_count",) + AMOUNT_COLUMNS
+
+
+def _dimensions() -> list:
+    """汇总维度表达式：created_at 的UTC日期 + 阶段/来源/类型/创建人"""
+    return [
+        # 时区写成字面量，GROUP BY 和 SELECT 中的表达式才能完全一致
+        cast(func.timezone(literal_column("'UTC'"), SalesRecord.created_at), Date).label("day"),
+        SalesRecord.stage,
+        SalesRecord.order_source,
+        SalesRecord.order_type,
+        SalesRecord.user_id,
+    ]
+
+
+def _amount(column):
+    """金额按行四舍五入到分（real 先转 double，避免按6位有效数字截断）"""
+    return cast(cast(func.coalesce(column, 0), Double), Numeric(18, 2))
+
+
+def _aggregate_select():
+    """按汇总维度聚合所有未作废销售记录（重建和校验使用）"""
+    dimensions = _dimensions()
+    columns = dimensions + [func.count().label("order_count")]
+    columns += [func.sum(_amount(getattr(SalesRecord, name))).label(name) for name in AMOUNT_COLUMNS]
+    return (
+        select(*columns)
+        .where(SalesRecord.is_voided == False)
+        .group_by(*dimensions)
+    )
+
+
+class SalesRollupService:
+    """销售日汇总服务类
+
+    增量维护方式：修改销售记录前调用 remove_record 锁住记录并扣除该记录当前的贡献，
+    修改并flush后调用 add_record 加上新的贡献。两者都直接读取数据库中的行，
+    和 rebuild 使用完全相同的表达式，所以增量结果与全量重建一致。
+    作废记录不计入汇总，作废/取消作废/删除都由这两个方法自然处理。
+    """
+
+    @staticmethod
+    async def _apply_record(db: AsyncSession, record_id: int, sign: int) -> None:
+        """将一条销售记录的贡献（乘以sign）累加到汇总表"""
+        columns = _dimensions() + [literal(sign).label("order_count")]
+        columns += [(_amount(getattr(SalesRecord, name)) * sign).label(name) for name in AMOUNT_COLUMNS]
+        columns += [func.now().label("created_at"), func.now().label("updated_at")]
+        source = select(*columns).where(
+            SalesRecord.id == record_id,
+            SalesRecord.is_voided == False
+        )
+
+        stmt = pg_insert(SalesDailyRollup).from_select(
+            list(KEY_COLUMNS + VALUE_COLUMNS + ("created_at", "updated_at")),
+            source
+        )
+        update_values = {
+            name: getattr(SalesDailyRollup, name) + getattr(stmt.excluded, name)
+            for name in VALUE_COLUMNS
+        }
+        update_values["updated_at"] = stmt.excluded.updated_at
+        stmt = stmt.on_conflict_do_update(index_elements=list(KEY_COLUMNS), set_=update_values)
+        await db.execute(stmt)
+
+    @staticmethod
+    async def add_record(db: AsyncSession, record_id: int) -> None:
+        """
+        把销售记录的当前状态计入汇总（创建、修改后调用，需先flush）
+
+        Args:
+            db: 数据库会话
+            record_id: 销售记录ID
+        """
+        await SalesRollupService._apply_record(db, record_id, 1)
+
+    @staticmethod
+    async def remove_record(db: AsyncSession, record_id: int) -> None:
+        """
+        从汇总中扣除销售记录的当前状态（修改、删除前调用）
+
+        注意：会话开启了autoflush，必须在修改记录属性之前调用，
+        否则扣除的是修改后的值。
+
+        先用 SELECT ... FOR UPDATE 锁住记录行直到事务结束，再在新的语句中读取要扣除的值：
+        同一记录的并发修改（如修改和作废、两个审核人同时审核）依次执行，
+        后执行的事务扣除的是前一个事务提交后的值，不会重复扣除同一份旧值。
+
+        Args:
+            db: 数据库会话
+            record_id: 销售记录ID
+        """
+        await db.execute(select(SalesRecord.id).where(SalesRecord.id == record_id).with_for_update())
+        await SalesRollupService._apply_record(db, record_id, -1)
+
+    @staticmethod
+    async def rebuild(db: AsyncSession) -> int:
+        """
+        根据销售记录全量重建汇总表
+
+        重建期间以SHARE模式锁住销售记录表，阻止并发写入，保证重建结果与提交时的数据一致。
+
+        Returns:
+            重建后的汇总行数
+        """
+        await db.execute(text("LOCK TABLE salesrecord IN SHARE MODE"))
+        await db.execute(delete(SalesDailyRollup))
+
+        aggregate = _aggregate_select().subquery()
+        source = select(
+            *[aggregate.c[name] for name in KEY_COLUMNS + VALUE_COLUMNS],
+            func.now(),
+            func.now(),
+        )
+        await db.execute(
+            pg_insert(SalesDailyRollup).from_select(
+                list(KEY_COLUMNS + VALUE_COLUMNS + ("created_at", "updated_at")),
+                source
+            )
+        )
+        count = (await db.execute(select(func.count()).select_from(SalesDailyRollup))).scalar_one()
+        logger.info(f"销售日汇总重建完成 - {count} 行")
+        return count
+
+    @staticmethod
+    async def check(db: AsyncSession) -> List[Dict[str, Any]]:
+        """
+        校验汇总表与销售记录是否一致
+
+        数量为0的汇总行（记录被移走后留下的空行）视为不存在。
+
+        Returns:
+            不一致的汇总键列表，每项包含 key、expected、actual；一致时返回空列表
+        """
+        expected: Dict[Tuple, Tuple] = {}
+        for row in (await db.execute(_aggregate_select())).all():
+            expected[tuple(row[:len(KEY_COLUMNS)])] = tuple(row[len(KEY_COLUMNS):])
+
+        actual: Dict[Tuple, Tuple] = {}
+        rollup_columns = [getattr(SalesDailyRollup, name) for name in KEY_COLUMNS + VALUE_COLUMNS]
+        for row in (await db.execute(select(*rollup_columns).where(SalesDailyRollup.order_count != 0))).all():
+            actual[tuple(row[:len(KEY_COLUMNS)])] = tuple(row[len(KEY_COLUMNS):])
+
+        mismatches = []
+        for key in sorted(expected.keys() | actual.keys(), key=str):
+            expected_values: Optional[Tuple] = expected.get(key)
+            actual_values: Optional[Tuple] = actual.get(key)
+            if expected_values != actual_values:
+                mismatches.append({
+                    "key": dict(zip(KEY_COLUMNS, key)),
+                    "expected": dict(zip(VALUE_COLUMNS, expected_values)) if expected_values else None,
+                    "actual": dict(zip(VALUE_COLUMNS, actual_values)) if actual_values else None,
+                })
+        if mismatches:
+            logger.warning(f"销售日汇总不一致 - {len(mismatches)} 个汇总键")
+        return mismatches
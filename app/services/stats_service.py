@@ -0,0 +1,310 @@
+from typing import Optional, Tuple
+from datetime import date, datetime, time, timedelta, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Date, Double, cast, select, func, and_, literal_column, tuple_
+
+from app.core.cache import AsyncCache, MemoryCacheBackend
+from app.core.config import settings
+from app.models.user import User
+from app.models.sales_record import SalesRecord, OrderStage, OrderSource
+from app.models.sales_rollup import SalesDailyRollup
+from app.schemas.stats import (
+    DashboardStats,
+    OrderTypeStats,
+    StageStats,
+    TimeSeriesPoint,
+    TimeSeriesStats,
+)
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 时间序列支持的时间桶和分组维度
+TIMESERIES_BUCKETS = ("day", "week", "month")
+TIMESERIES_GROUP_BY = ("salesperson", "order_source", "order_type")
+# 单次查询最多返回的时间桶数量
+MAX_TIMESERIES_BUCKETS = 400
+
+# 仪表盘统计缓存：订单数量全局相同，本月销售额对非超级用户只统计本人，
+# 所以超级用户共用一个键，普通用户每人一个键
+DASHBOARD_STATS_CACHE_PREFIX = "dashboard_stats:"
+dashboard_stats_cache = AsyncCache(
+    MemoryCacheBackend(max_entries=1024),
+    ttl=settings.STATS_CACHE_TTL_SECONDS,
+    name="dashboard_stats"
+)
+
+
+def current_month_range(now: datetime = None) -> Tuple[datetime, datetime]:
+    """获取当前月份的起止时间（UTC，左闭右开）"""
+    now = now or datetime.now(timezone.utc)
+    first_day = datetime(now.year, now.month, 1, tzinfo=timezone.utc)
+    if now.month == 12:
+        next_month = datetime(now.year + 1, 1, 1, tzinfo=timezone.utc)
+    else:
+        next_month = datetime(now.year, now.month + 1, 1, tzinfo=timezone.utc)
+    return first_day, next_month
+
+
+def count_buckets(bucket: str, start_date: date, end_date: date) -> int:
+    """计算日期区间（含两端）覆盖的时间桶数量"""
+    if bucket == "day":
+        return (end_date - start_date).days + 1
+    if bucket == "week":
+        start_week = start_date - timedelta(days=start_date.weekday())
+        end_week = end_date - timedelta(days=end_date.weekday())
+        return (end_week - start_week).days // 7 + 1
+    return (end_date.year - start_date.year) * 12 + end_date.month - start_date.month + 1
+
+
+class StatsService:
+    """统计服务类"""
+
+    @staticmethod
+    def build_dashboard_stats_query(user: User, now: datetime = None):
+        """
+        构建仪表盘统计查询
+
+        读取销售日汇总表（已排除作废记录），所有计数和本月销售额用 FILTER 一次聚合完成，
+        耗时只与汇总行数有关，与历史订单总量无关：
+        - 订单数量统计所有人的订单
+        - 本月销售额只统计第五阶段订单，非超级用户只统计自己的订单
+        """
+        first_day, next_month = current_month_range(now)
+        order_count = SalesDailyRollup.order_count
+
+        columns = [func.coalesce(func.sum(order_count), 0).label("total_orders")]
+        for stage in OrderStage:
+            columns.append(
+                func.coalesce(
+                    func.sum(order_count).filter(SalesDailyRollup.stage == stage.value), 0
+                ).label(stage.value)
+            )
+        for source in OrderSource:
+            columns.append(
+                func.coalesce(
+                    func.sum(order_count).filter(SalesDailyRollup.order_source == source.value), 0
+                ).label(source.value)
+            )
+
+        monthly_condition = and_(
+            SalesDailyRollup.day >= first_day.date(),
+            SalesDailyRollup.day < next_month.date(),
+            SalesDailyRollup.stage == OrderStage.STAGE_5.value,
+        )
+        if not user.is_superuser:
+            monthly_condition = and_(monthly_condition, SalesDailyRollup.user_id == user.id)
+        columns.append(
+            func.coalesce(func.sum(SalesDailyRollup.total_price).filter(monthly_condition), 0).label("total_sales")
+        )
+
+        return select(*columns)
+
+    @staticmethod
+    def dashboard_stats_cache_key(user: User) -> str:
+        """仪表盘统计的缓存键（按用户可见范围区分）"""
+        if user.is_superuser:
+            return f"{DASHBOARD_STATS_CACHE_PREFIX}global"
+        return f"{DASHBOARD_STATS_CACHE_PREFIX}user:{user.id}"
+
+    @staticmethod
+    async def get_dashboard_stats_cached(db: AsyncSession, user: User) -> DashboardStats:
+        """
+        获取仪表盘统计数据（带缓存）
+
+        缓存在 STATS_CACHE_TTL_SECONDS 后过期，销售记录变更时通过
+        invalidate_dashboard_stats 立即失效；同一个键的并发未命中只查询一次。
+        """
+        return await dashboard_stats_cache.get_or_load(
+            StatsService.dashboard_stats_cache_key(user),
+            lambda: StatsService.get_dashboard_stats(db, user)
+        )
+
+    @staticmethod
+    async def invalidate_dashboard_stats() -> None:
+        """使所有仪表盘统计缓存失效（销售记录变更提交后调用）"""
+        await dashboard_stats_cache.invalidate_prefix(DASHBOARD_STATS_CACHE_PREFIX)
+
+    @staticmethod
+    async def get_dashboard_stats(db: AsyncSession, user: User) -> DashboardStats:
+        """
+        获取仪表盘统计数据（单条聚合查询，读取销售日汇总表）
+
+        Args:
+            db: 数据库会话
+            user: 当前用户
+
+        Returns:
+            仪表盘统计数据
+        """
+        result = await db.execute(StatsService.build_dashboard_stats_query(user))
+        row = result.mappings().one()
+        logger.debug(f"仪表盘统计 - user_id: {user.id}, total_orders: {row['total_orders']}")
+
+        return DashboardStats(
+            total_sales=float(row["total_sales"]),
+            total_orders=row["total_orders"],
+            stage_1_orders=row[OrderStage.STAGE_1.value],
+            stage_2_orders=row[OrderStage.STAGE_2.value],
+            stage_3_orders=row[OrderStage.STAGE_3.value],
+            stage_4_orders=row[OrderStage.STAGE_4.value],
+            stage_5_orders=row[OrderStage.STAGE_5.value],
+            alibaba_orders=row[OrderSource.ALIBABA.value],
+            domestic_orders=row[OrderSource.DOMESTIC.value],
+            exhibition_orders=row[OrderSource.EXHIBITION.value],
+            pending_logistics_review=row[OrderStage.STAGE_2.value],
+            pending_final_review=row[OrderStage.STAGE_4.value],
+            completed_orders=row[OrderStage.STAGE_5.value]
+        )
+
+    @staticmethod
+    def build_timeseries_query(
+        user: User,
+        start_date: date,
+        end_date: date,
+        bucket: str,
+        group_by: Optional[str] = None
+    ):
+        """
+        构建时间序列统计查询
+
+        在一条 GROUPING SETS 查询中同时得到：
+        - (时间桶, 分组) 的订单数和美元/人民币合计
+        - 区间内按订单类型、按阶段的汇总
+        created_at 按左闭右开的UTC时间范围过滤，可以使用 created_at 索引做范围扫描。
+        非超级用户只统计自己的订单。
+        """
+        # 时间桶单位已校验，写成字面量保证 SELECT 与 GROUP BY 表达式一致
+        bucket_expr = cast(
+            func.date_trunc(literal_column(f"'{bucket}'"), func.timezone(literal_column("'UTC'"), SalesRecord.created_at)),
+            Date
+        ).label("bucket_start")
+
+        if group_by == "salesperson":
+            group_expr = SalesRecord.user_id
+            label_expr = User.full_name
+        elif group_by == "order_source":
+            group_expr = label_expr = SalesRecord.order_source
+        elif group_by == "order_type":
+            group_expr = label_expr = SalesRecord.order_type
+        else:
+            group_expr = label_expr = None
+
+        total_usd = func.sum(cast(SalesRecord.total_price, Double))
+        total_cny = func.sum(cast(SalesRecord.total_price, Double) * cast(SalesRecord.exchange_rate, Double))
+
+        columns = [
+            bucket_expr,
+            group_expr.label("group") if group_expr is not None else literal_column("NULL").label("group"),
+            label_expr.label("group_label") if label_expr is not None else literal_column("NULL").label("group_label"),
+            SalesRecord.order_type,
+            SalesRecord.stage,
+            func.grouping(bucket_expr).label("g_bucket"),
+            func.grouping(SalesRecord.order_type).label("g_order_type"),
+            func.count().label("count"),
+            total_usd.label("total_usd"),
+            total_cny.label("total_cny"),
+        ]
+
+        series_set = [bucket_expr]
+        if group_expr is not None:
+            series_set.append(group_expr)
+            if label_expr is not group_expr:
+                series_set.append(label_expr)
+
+        start_at = datetime.combine(start_date, time.min, tzinfo=timezone.utc)
+        end_at = datetime.combine(end_date + timedelta(days=1), time.min, tzinfo=timezone.utc)
+
+        query = (
+            select(*columns)
+            .where(
+                SalesRecord.created_at >= start_at,
+                SalesRecord.created_at < end_at,
+                SalesRecord.is_voided == False
+            )
+            .group_by(func.grouping_sets(
+                tuple_(*series_set),
+                tuple_(SalesRecord.order_type),
+                tuple_(SalesRecord.stage),
+            ))
+        )
+        if group_by == "salesperson":
+            query = query.join(User, User.id == SalesRecord.user_id)
+        if not user.is_superuser:
+            query = query.where(SalesRecord.user_id == user.id)
+        return query
+
+    @staticmethod
+    async def get_timeseries(
+        db: AsyncSession,
+        user: User,
+        start_date: date,
+        end_date: date,
+        bucket: str = "month",
+        group_by: Optional[str] = None
+    ) -> TimeSeriesStats:
+        """
+        获取时间序列统计数据
+
+        Args:
+            db: 数据库会话
+            user: 当前用户
+            start_date: 起始日期（含）
+            end_date: 结束日期（含）
+            bucket: 时间桶 day/week/month
+            group_by: 分组维度 salesperson/order_source/order_type，为空时不分组
+
+        Returns:
+            时间序列统计数据
+        """
+        query = StatsService.build_timeseries_query(user, start_date, end_date, bucket, group_by)
+        rows = (await db.execute(query)).mappings().all()
+
+        points = []
+        order_types = []
+        stage_rows = []
+        for row in rows:
+            if row["g_bucket"] == 0:
+                points.append(TimeSeriesPoint(
+                    bucket_start=row["bucket_start"],
+                    group=str(row["group"]) if row["group"] is not None else None,
+                    group_label=row["group_label"],
+                    count=row["count"],
+                    total_usd=round(row["total_usd"] or 0.0, 2),
+                    total_cny=round(row["total_cny"] or 0.0, 2)
+                ))
+            elif row["g_order_type"] == 0:
+                total = row["total_usd"] or 0.0
+                order_types.append(OrderTypeStats(
+                    order_type=row["order_type"],
+                    count=row["count"],
+                    total_amount=round(total, 2),
+                    avg_amount=round(total / row["count"], 2) if row["count"] else 0.0
+                ))
+            else:
+                stage_rows.append(row)
+
+        total_count = sum(row["count"] for row in stage_rows)
+        stages = [
+            StageStats(
+                stage=row["stage"],
+                count=row["count"],
+                percentage=round(row["count"] * 100.0 / total_count, 2) if total_count else 0.0
+            )
+            for row in stage_rows
+        ]
+
+        points.sort(key=lambda p: (p.bucket_start, p.group or ""))
+        order_types.sort(key=lambda s: s.order_type)
+        stages.sort(key=lambda s: s.stage)
+        logger.debug(f"时间序列统计 - user_id: {user.id}, bucket: {bucket}, group_by: {group_by}, points: {len(points)}")
+
+        return TimeSeriesStats(
+            bucket=bucket,
+            group_by=group_by,
+            start_date=start_date,
+            end_date=end_date,
+            points=points,
+            order_types=order_types,
+            stages=stages
+        )
@@ -0,0 +1,309 @@
+"""
+附件存储垃圾回收和一致性检查
+
+上传失败、事务回滚或删除时吞掉的异常会留下没有附件记录的文件，也可能出现附件记录指向的文件不存在、
+blob 引用计数与附件表不一致。这里的检查在百万级文件上也只占用固定内存：
+
+- 存储中的对象和附件表中的存储文件名都按字节序分批读取（目录逐个列出 / ListObjectsV2 分页，
+  附件表按 ix_attachment_stored_filename_c 索引键集分页），归并比较两个有序序列
+- 孤立文件超过宽限期才删除，删除前按文件名加锁并重新确认没有附件引用（BlobService.purge_if_orphaned），
+  与并发上传互斥
+- blob 表按主键分批比对附件数，不一致时加锁重新计数（BlobService.recount）
+- 本机的预览图缓存、分片目录和 files/.tmp 中残留的临时文件按修改时间清理
+
+由 scripts/storage_gc.py 调用，可以在服务运行时执行（例如每天由定时任务运行一次）。
+"""
+import os
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from starlette.concurrency import run_in_threadpool
+
+from app.db.session import db as database
+from app.models.blob import Blob
+from app.services.blob_service import ATTACHMENT_STORED_FILENAME, BlobService
+from app.storage import StorageBackend
+from app.storage.base import StoredObject
+from app.utils.file_handler import PREVIEW_MARKER, FileHandler
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 报告中最多列出的缺失文件数
+MISSING_SAMPLE_LIMIT = 20
+
+
+class StorageGCService:
+    """附件存储垃圾回收服务类"""
+
+    @staticmethod
+    async def iter_referenced_filenames(
+        batch_size: int = 1000,
+        session_factory: Optional[Callable] = None
+    ) -> AsyncIterator[str]:
+        """按字节序分批读取附件表中引用的存储文件名（去重），每批使用一个短事务"""
+        session_factory = session_factory or database.session
+        last: Optional[str] = None
+        while True:
+            query = select(ATTACHMENT_STORED_FILENAME).distinct().order_by(ATTACHMENT_STORED_FILENAME).limit(batch_size)
+            if last is not None:
+                query = query.where(ATTACHMENT_STORED_FILENAME > last)
+            async with session_factory() as session:
+                names = (await session.execute(query)).scalars().all()
+            for name in names:
+                yield name
+            if len(names) < batch_size:
+                return
+            last = names[-1]
+
+    @staticmethod
+    async def merge(
+        objects: AsyncIterator[StoredObject],
+        referenced: AsyncIterator[str]
+    ) -> AsyncIterator[Tuple[str, Optional[StoredObject], bool]]:
+        """
+        归并两个按字节序排列的序列
+
+        Yields:
+            (存储文件名, 存储中的对象或None, 是否被附件引用)
+        """
+        stored_object = await anext(objects, None)
+        name = await anext(referenced, None)
+        while stored_object is not None or name is not None:
+            if name is None or (stored_object is not None and stored_object.key < name):
+                yield stored_object.key, stored_object, False
+                stored_object = await anext(objects, None)
+            elif stored_object is None or name < stored_object.key:
+                yield name, None, True
+                name = await anext(referenced, None)
+            else:
+                yield name, stored_object, True
+                stored_object = await anext(objects, None)
+                name = await anext(referenced, None)
+
+    @staticmethod
+    async def check_files(
+        storage: StorageBackend,
+        delete: bool = False,
+        grace_seconds: float = 86400,
+        batch_size: int = 1000,
+        session_factory: Optional[Callable] = None
+    ) -> Dict[str, Any]:
+        """
+        比对存储中的文件和附件表
+
+        Args:
+            storage: 存储后端
+            delete: 是否删除超过宽限期的孤立文件
+            grace_seconds: 宽限期秒数，最近修改的文件可能属于尚未提交的上传，不删除
+            batch_size: 每批读取的文件名数
+
+        Returns:
+            统计结果
+        """
+        session_factory = session_factory or database.session
+        report: Dict[str, Any] = {
+            "files": 0,
+            "bytes": 0,
+            "referenced": 0,
+            "orphans": 0,
+            "orphan_bytes": 0,
+            "orphans_in_grace": 0,
+            "orphans_deleted": 0,
+            "missing": 0,
+            "missing_samples": [],
+        }
+        deadline = time.time() - grace_seconds
+        pairs = StorageGCService.merge(
+            storage.iter_objects(batch_size),
+            StorageGCService.iter_referenced_filenames(batch_size, session_factory)
+        )
+        async for name, stored_object, referenced in pairs:
+            if stored_object is not None:
+                report["files"] += 1
+                report["bytes"] += stored_object.size
+            if referenced:
+                report["referenced"] += 1
+
+            if stored_object is None:
+                # 列表之后才上传的文件或旧的平铺布局中的文件，再单独确认一次
+                if not await storage.exists(name):
+                    report["missing"] += 1
+                    if len(report["missing_samples"]) < MISSING_SAMPLE_LIMIT:
+                        report["missing_samples"].append(name)
+                continue
+            if referenced:
+                continue
+
+            report["orphans"] += 1
+            report["orphan_bytes"] += stored_object.size
+            if stored_object.modified_at > deadline:
+                report["orphans_in_grace"] += 1
+            elif delete:
+                async with session_factory() as session:
+                    if await BlobService.purge_if_orphaned(session, name):
+                        report["orphans_deleted"] += 1
+        return report
+
+    @staticmethod
+    async def check_blob_counts(
+        storage: StorageBackend,
+        repair: bool = False,
+        batch_size: int = 1000,
+        session_factory: Optional[Callable] = None
+    ) -> Dict[str, Any]:
+        """
+        比对 blob 引用计数和附件表（包括有附件但没有 blob 行的文件）
+
+        修正后没有引用、文件也已不存在的 blob 行直接删除；文件仍在的由 check_files 按宽限期清理。
+
+        Returns:
+            统计结果
+        """
+        session_factory = session_factory or database.session
+        report: Dict[str, Any] = {"blobs": 0, "mismatched": 0, "untracked": 0, "repaired": 0}
+
+        actual = (
+            select(func.count())
+            .where(ATTACHMENT_STORED_FILENAME == Blob.stored_filename.collate("C"))
+            .scalar_subquery()
+        )
+        last: Optional[str] = None
+        while True:
+            query = select(Blob.stored_filename, Blob.ref_count, actual).order_by(Blob.stored_filename).limit(batch_size)
+            if last is not None:
+                query = query.where(Blob.stored_filename > last)
+            async with session_factory() as session:
+                rows = (await session.execute(query)).all()
+            report["blobs"] += len(rows)
+            mismatched = [name for name, ref_count, count in rows if ref_count != count]
+            report["mismatched"] += len(mismatched)
+            if repair and mismatched:
+                report["repaired"] += await StorageGCService._recount(storage, mismatched, session_factory)
+            if len(rows) < batch_size:
+                break
+            last = rows[-1][0]
+
+        # 有附件引用但没有 blob 行（按附件文件名分批反连接）
+        last = None
+        while True:
+            names = select(ATTACHMENT_STORED_FILENAME.label("stored_filename")).distinct().order_by(ATTACHMENT_STORED_FILENAME).limit(batch_size)
+            if last is not None:
+                names = names.where(ATTACHMENT_STORED_FILENAME > last)
+            names = names.subquery()
+            query = select(
+                names.c.stored_filename,
+                select(Blob.stored_filename).where(Blob.stored_filename == names.c.stored_filename).exists()
+            ).order_by(names.c.stored_filename)
+            async with session_factory() as session:
+                rows = (await session.execute(query)).all()
+            untracked = [name for name, tracked in rows if not tracked]
+            report["untracked"] += len(untracked)
+            if repair and untracked:
+                report["repaired"] += await StorageGCService._recount(storage, untracked, session_factory)
+            if len(rows) < batch_size:
+                break
+            last = rows[-1][0]
+        return report
+
+    @staticmethod
+    async def _recount(storage: StorageBackend, names: List[str], session_factory: Callable) -> int:
+        async with session_factory() as session:
+            for name in names:
+                if await BlobService.recount(session, name) == 0 and not await storage.exists(name):
+                    await BlobService.purge_if_orphaned(session, name)
+        logger.info(f"已修正 {len(names)} 个文件的引用计数")
+        return len(names)
+
+    @staticmethod
+    async def check_previews(
+        handler: FileHandler,
+        preview_size: int,
+        delete: bool = False,
+        grace_seconds: float = 86400,
+        batch_size: int = 1000,
+        session_factory: Optional[Callable] = None
+    ) -> Dict[str, Any]:
+        """
+        清理本机的预览图缓存：原文件已没有附件引用，或尺寸不是当前配置（PREVIEW_MAX_SIZE）的预览图，
+        以及分片目录中不属于分片布局的残留文件（如早期渲染中断留下的 tmpXXXX.part）
+
+        Returns:
+            统计结果
+        """
+        session_factory = session_factory or database.session
+        report: Dict[str, Any] = {"previews": 0, "stale": 0, "stale_deleted": 0, "strays": 0, "strays_deleted": 0}
+        deadline = time.time() - grace_seconds
+        current_suffix = f"{PREVIEW_MARKER}{preview_size}.jpg"
+
+        async def flush(batch: List[os.DirEntry]) -> None:
+            names = {entry.name.split(PREVIEW_MARKER, 1)[0] for entry in batch}
+            async with session_factory() as session:
+                referenced = set((await session.execute(
+                    select(ATTACHMENT_STORED_FILENAME).distinct().where(ATTACHMENT_STORED_FILENAME.in_(sorted(names)))
+                )).scalars())
+            for entry in batch:
+                if entry.name.split(PREVIEW_MARKER, 1)[0] in referenced and entry.name.endswith(current_suffix):
+                    continue
+                report["stale"] += 1
+                if delete and entry.stat().st_mtime <= deadline:
+                    await run_in_threadpool(os.unlink, entry.path)
+                    report["stale_deleted"] += 1
+
+        previews = (entry for entry in handler.iter_sharded_files() if PREVIEW_MARKER in entry.name)
+        while batch := await run_in_threadpool(StorageGCService._take, previews, batch_size):
+            report["previews"] += len(batch)
+            await flush(batch)
+
+        strays = handler.iter_stray_files()
+        while batch := await run_in_threadpool(StorageGCService._take, strays, batch_size):
+            report["strays"] += len(batch)
+            for entry in batch:
+                if delete and entry.stat().st_mtime <= deadline:
+                    await run_in_threadpool(Path(entry.path).unlink, missing_ok=True)
+                    report["strays_deleted"] += 1
+        return report
+
+    @staticmethod
+    def _take(entries, count: int) -> List[os.DirEntry]:
+        # 在线程中执行，stat 结果由 DirEntry 缓存
+        batch = []
+        for entry in entries:
+            try:
+                entry.stat()
+            except FileNotFoundError:
+                continue
+            batch.append(entry)
+            if len(batch) >= count:
+                break
+        return batch
+
+    @staticmethod
+    def clean_tmp_files(handler: FileHandler, delete: bool = False, grace_seconds: float = 86400) -> Dict[str, Any]:
+        """清理 files/.tmp 中超过宽限期的临时文件（中断的上传、预览图渲染等留下的）"""
+        report: Dict[str, Any] = {"tmp_files": 0, "tmp_bytes": 0, "tmp_deleted": 0}
+        deadline = time.time() - grace_seconds
+        with os.scandir(handler.tmp_dir) as entries:
+            for entry in entries:
+                try:
+                    stat = entry.stat(follow_symlinks=False)
+                except FileNotFoundError:
+                    continue
+                if not entry.is_file(follow_symlinks=False) or stat.st_mtime > deadline:
+                    continue
+                report["tmp_files"] += 1
+                report["tmp_bytes"] += stat.st_size
+                if delete:
+                    try:
+                        os.unlink(entry.path)
+                    except FileNotFoundError:
+                        continue
+                    report["tmp_deleted"] += 1
+        return report
+
+    @staticmethod
+    def count_legacy_files(handler: FileHandler) -> int:
+        """平铺布局中尚未迁移的文件数（不参与孤立文件检查）"""
+        return sum(1 for _ in handler.iter_legacy_files())
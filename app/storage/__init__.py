@@ -0,0 +1,48 @@
+"""
+附件存储后端
+
+STORAGE_BACKEND=local 时附件保存在本机 files/ 目录；=s3 时保存在S3兼容的对象存储中，
+多个应用节点可以共用同一份附件。
+"""
+from app.core.config import settings
+from app.utils.file_handler import file_handler
+
+from .base import StorageBackend
+from .local import LocalStorage
+from .s3 import S3Error, S3Storage, SigV4Signer
+
+
+def create_storage() -> StorageBackend:
+    """按配置创建存储后端"""
+    if settings.STORAGE_BACKEND == "local":
+        return LocalStorage(file_handler)
+    if settings.STORAGE_BACKEND == "s3":
+        return S3Storage(
+            file_handler,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            bucket=settings.S3_BUCKET,
+            access_key_id=settings.S3_ACCESS_KEY_ID,
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+            region=settings.S3_REGION,
+            key_prefix=settings.S3_KEY_PREFIX,
+            public_endpoint_url=settings.S3_PUBLIC_ENDPOINT_URL,
+            max_connections=settings.S3_MAX_CONNECTIONS,
+            timeout=settings.S3_TIMEOUT_SECONDS,
+            presigned_download=settings.S3_PRESIGNED_DOWNLOAD,
+            presign_expires=settings.S3_PRESIGN_EXPIRES_SECONDS
+        )
+    raise ValueError(f"不支持的存储后端: {settings.STORAGE_BACKEND}")
+
+
+# 全局存储后端，在应用启动/关闭事件中初始化和释放连接
+storage = create_storage()
+
+__all__ = [
+    "LocalStorage",
+    "S3Error",
+    "S3Storage",
+    "SigV4Signer",
+    "StorageBackend",
+    "create_storage",
+    "storage",
+]
@@ -0,0 +1,122 @@
+"""
+附件存储后端接口
+
+对象按存储文件名（{md5}{ext}）寻址。上传时文件先写入本机的临时文件（见 FileHandler.stage_file），
+由 put_file 放入存储后再登记引用（不在持有文件锁时上传）；读取都是流式的，不会把整个文件读进内存。
+"""
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, NamedTuple, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.utils.file_handler import CHUNK_SIZE, FileHandler
+
+
+class StoredObject(NamedTuple):
+    """存储中的一个对象"""
+    key: str            # 存储文件名
+    size: int           # 字节数
+    modified_at: float  # 最后修改时间（Unix时间戳）
+
+
+class StorageBackend(ABC):
+    """
+    存储后端基类
+
+    Args:
+        handler: 本机文件处理器，上传暂存、open_local 下载的临时副本和预览图缓存使用它的目录
+    """
+
+    name: str = ""
+
+    def __init__(self, handler: FileHandler):
+        self.handler = handler
+
+    async def start(self) -> None:
+        """初始化连接等资源（应用启动时调用）"""
+
+    async def close(self) -> None:
+        """释放连接等资源（应用关闭时调用）"""
+
+    @abstractmethod
+    async def put_file(self, source: Path, key: str, content_type: str, file_md5: Optional[str] = None) -> bool:
+        """
+        把暂存的本机文件放入存储，完成后删除 source
+
+        内容按MD5命名，对象已存在时不重复写入。
+
+        Returns:
+            是否写入了新对象
+        """
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        """对象是否存在"""
+
+    @abstractmethod
+    async def delete(self, key: str) -> bool:
+        """
+        删除对象（以及本机缓存的预览图）
+
+        Returns:
+            是否删除了对象
+        """
+
+    @abstractmethod
+    def iter_chunks(self, key: str, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """
+        流式读取对象内容
+
+        Raises:
+            FileNotFoundError: 对象不存在
+        """
+
+    @abstractmethod
+    def iter_objects(self, page_size: int = 1000) -> AsyncIterator[StoredObject]:
+        """
+        按存储文件名顺序（字节序）列出所有对象，不包括预览图等派生文件
+
+        分页读取，内存占用与对象总数无关。
+        """
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """对象在本机文件系统中的路径，不在本机（或不存在）时返回None"""
+        return None
+
+    async def presigned_url(
+        self,
+        key: str,
+        filename: Optional[str] = None,
+        content_type: Optional[str] = None
+    ) -> Optional[str]:
+        """客户端可直接下载对象的临时URL，不支持时返回None"""
+        return None
+
+    @asynccontextmanager
+    async def open_local(self, key: str) -> AsyncIterator[Path]:
+        """
+        获取对象的本机文件路径（用于只能处理本地文件的操作，如生成预览图）
+
+        对象不在本机时下载到临时文件，退出时删除。
+
+        Raises:
+            FileNotFoundError: 对象不存在
+        """
+        path = self.local_path(key)
+        if path is not None:
+            yield path
+            return
+
+        fd, tmp_name = tempfile.mkstemp(dir=self.handler.tmp_dir, suffix=Path(key).suffix)
+        tmp_path = Path(tmp_name)
+        try:
+            with os.fdopen(fd, "wb") as output:
+                async for chunk in self.iter_chunks(key):
+                    await run_in_threadpool(output.write, chunk)
+            yield tmp_path
+        finally:
+            tmp_path.unlink(missing_ok=True)
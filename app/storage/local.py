@@ -0,0 +1,59 @@
+"""
+本机文件系统存储（files/ 目录，分片布局见 FileHandler）
+"""
+from itertools import islice
+from pathlib import Path
+from typing import AsyncIterator, Iterator, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.storage.base import StorageBackend, StoredObject
+from app.utils.file_handler import CHUNK_SIZE, PREVIEW_MARKER
+
+
+class LocalStorage(StorageBackend):
+    """本机文件系统存储，所有应用进程需要能访问同一个目录"""
+
+    name = "local"
+
+    async def put_file(self, source: Path, key: str, content_type: str, file_md5: Optional[str] = None) -> bool:
+        # 同一文件系统内重命名，不需要放到线程中
+        return self.handler.place_staged_file(source, key)
+
+    async def exists(self, key: str) -> bool:
+        return self.handler.file_exists(key)
+
+    async def delete(self, key: str) -> bool:
+        return self.handler.delete_file(key)
+
+    async def iter_chunks(self, key: str, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        path = self.handler.locate_file(key)
+        if path is None:
+            raise FileNotFoundError(key)
+        source = await run_in_threadpool(open, path, "rb")
+        try:
+            while chunk := await run_in_threadpool(source.read, chunk_size):
+                yield chunk
+        finally:
+            source.close()
+
+    def _stored_objects(self) -> Iterator[StoredObject]:
+        for entry in self.handler.iter_sharded_files():
+            if PREVIEW_MARKER in entry.name:
+                continue
+            try:
+                stat = entry.stat(follow_symlinks=False)
+            except FileNotFoundError:
+                # 遍历期间被删除
+                continue
+            yield StoredObject(entry.name, stat.st_size, stat.st_mtime)
+
+    async def iter_objects(self, page_size: int = 1000) -> AsyncIterator[StoredObject]:
+        # 只列出分片布局；平铺布局中的文件需要先用 scripts/migrate_file_layout.py 迁移
+        objects = self._stored_objects()
+        while page := await run_in_threadpool(lambda: list(islice(objects, page_size))):
+            for stored_object in page:
+                yield stored_object
+
+    def local_path(self, key: str) -> Optional[Path]:
+        return self.handler.locate_file(key)
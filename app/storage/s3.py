@@ -0,0 +1,329 @@
+"""
+S3兼容对象存储（AWS S3、MinIO 等）
+
+使用 httpx 直接调用 S3 REST 接口，请求按 AWS Signature Version 4 签名，不依赖 boto3：
+- 所有请求共用一个 AsyncClient，连接池上限为 S3_MAX_CONNECTIONS
+- 上传和下载都是流式的，请求体不签名（UNSIGNED-PAYLOAD），上传时带 Content-MD5 由服务端校验内容
+- 对象键为 {S3_KEY_PREFIX}{stored_filename}，按路径形式访问（{endpoint}/{bucket}/{key}），
+  S3_BUCKET 为空时 endpoint 本身就是存储桶地址（虚拟主机形式）
+- 预览图等派生文件仍缓存在本机 files/ 目录中
+"""
+import base64
+import hashlib
+import hmac
+import xml.etree.ElementTree as ElementTree
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import AsyncIterator, Dict, Mapping, Optional
+from urllib.parse import quote
+
+import httpx
+from starlette.concurrency import run_in_threadpool
+
+from app.storage.base import StorageBackend, StoredObject
+from app.utils.file_handler import CHUNK_SIZE, FileHandler
+
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+EMPTY_PAYLOAD_SHA256 = hashlib.sha256(b"").hexdigest()
+S3_XML_NAMESPACE = "{http://s3.amazonaws.com/doc/2006-03-01/}"
+
+
+class S3Error(Exception):
+    """对象存储返回了错误响应"""
+
+    def __init__(self, status_code: int, message: str):
+        self.status_code = status_code
+        super().__init__(f"对象存储请求失败 ({status_code}): {message}")
+
+
+def _quote(value: str, safe: str = "-_.~") -> str:
+    return quote(value, safe=safe)
+
+
+def _hmac_sha256(key: bytes, message: str) -> bytes:
+    return hmac.new(key, message.encode("utf-8"), hashlib.sha256).digest()
+
+
+class SigV4Signer:
+    """AWS Signature Version 4 签名"""
+
+    def __init__(self, access_key_id: str, secret_access_key: str, region: str, service: str = "s3"):
+        self.access_key_id = access_key_id
+        self.secret_access_key = secret_access_key
+        self.region = region
+        self.service = service
+
+    def _scope(self, date_stamp: str) -> str:
+        return f"{date_stamp}/{self.region}/{self.service}/aws4_request"
+
+    def _signature(self, now: datetime, canonical_request: str) -> str:
+        date_stamp = now.strftime("%Y%m%d")
+        string_to_sign = "\n".join([
+            "AWS4-HMAC-SHA256",
+            now.strftime("%Y%m%dT%H%M%SZ"),
+            self._scope(date_stamp),
+            hashlib.sha256(canonical_request.encode("utf-8")).hexdigest(),
+        ])
+        key = _hmac_sha256(f"AWS4{self.secret_access_key}".encode("utf-8"), date_stamp)
+        for part in (self.region, self.service, "aws4_request"):
+            key = _hmac_sha256(key, part)
+        return hmac.new(key, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+
+    @staticmethod
+    def _canonical_query(params: Mapping[str, str]) -> str:
+        return "&".join(f"{_quote(k)}={_quote(v)}" for k, v in sorted(params.items()))
+
+    def sign_headers(
+        self,
+        method: str,
+        url: httpx.URL,
+        headers: Mapping[str, str],
+        payload_hash: str = UNSIGNED_PAYLOAD,
+        now: Optional[datetime] = None
+    ) -> Dict[str, str]:
+        """
+        签名请求，返回需要发送的请求头（包含 Authorization）
+
+        url 的路径需要已经按 S3 规则编码；headers 中的请求头都参与签名（Content-Length 除外）。
+        """
+        now = now or datetime.now(timezone.utc)
+        signed = {key.lower(): str(value).strip() for key, value in headers.items() if key.lower() != "content-length"}
+        signed["host"] = url.netloc.decode("ascii")
+        signed["x-amz-date"] = now.strftime("%Y%m%dT%H%M%SZ")
+        signed["x-amz-content-sha256"] = payload_hash
+
+        names = sorted(signed)
+        canonical_request = "\n".join([
+            method,
+            url.raw_path.decode("ascii").split("?", 1)[0],
+            self._canonical_query(dict(url.params)),
+            "".join(f"{name}:{signed[name]}\n" for name in names),
+            ";".join(names),
+            payload_hash,
+        ])
+        signature = self._signature(now, canonical_request)
+        credential = f"{self.access_key_id}/{self._scope(now.strftime('%Y%m%d'))}"
+
+        result = dict(headers)
+        result["x-amz-date"] = signed["x-amz-date"]
+        result["x-amz-content-sha256"] = payload_hash
+        result["Authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={credential}, SignedHeaders={';'.join(names)}, Signature={signature}"
+        )
+        return result
+
+    def presign(
+        self,
+        method: str,
+        url: httpx.URL,
+        expires: int,
+        params: Optional[Mapping[str, str]] = None,
+        now: Optional[datetime] = None
+    ) -> str:
+        """生成预签名URL（签名放在查询参数中，只签名 host 请求头）"""
+        now = now or datetime.now(timezone.utc)
+        query = dict(params or {})
+        query.update({
+            "X-Amz-Algorithm": "AWS4-HMAC-SHA256",
+            "X-Amz-Credential": f"{self.access_key_id}/{self._scope(now.strftime('%Y%m%d'))}",
+            "X-Amz-Date": now.strftime("%Y%m%dT%H%M%SZ"),
+            "X-Amz-Expires": str(expires),
+            "X-Amz-SignedHeaders": "host",
+        })
+        path = url.raw_path.decode("ascii").split("?", 1)[0]
+        canonical_query = self._canonical_query(query)
+        canonical_request = "\n".join([
+            method,
+            path,
+            canonical_query,
+            f"host:{url.netloc.decode('ascii')}\n",
+            "host",
+            UNSIGNED_PAYLOAD,
+        ])
+        signature = self._signature(now, canonical_request)
+        return f"{url.scheme}://{url.netloc.decode('ascii')}{path}?{canonical_query}&X-Amz-Signature={signature}"
+
+
+class S3Storage(StorageBackend):
+    """
+    S3兼容对象存储
+
+    Args:
+        handler: 本机文件处理器（上传暂存和预览图缓存）
+        endpoint_url: 对象存储地址
+        bucket: 存储桶，为空时 endpoint_url 为存储桶的虚拟主机地址
+        public_endpoint_url: 生成预签名URL使用的地址，为空时与 endpoint_url 相同
+        presigned_download: 是否提供预签名下载URL
+        transport: 自定义 httpx 传输层（测试时替换为内存实现）
+    """
+
+    name = "s3"
+
+    def __init__(
+        self,
+        handler: FileHandler,
+        endpoint_url: str,
+        bucket: str,
+        access_key_id: str,
+        secret_access_key: str,
+        region: str = "us-east-1",
+        key_prefix: str = "",
+        public_endpoint_url: str = "",
+        max_connections: int = 32,
+        timeout: float = 30.0,
+        presigned_download: bool = True,
+        presign_expires: int = 300,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        super().__init__(handler)
+        self.endpoint_url = endpoint_url.rstrip("/")
+        self.public_endpoint_url = (public_endpoint_url or endpoint_url).rstrip("/")
+        self.bucket = bucket
+        self.key_prefix = key_prefix
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.presigned_download = presigned_download
+        self.presign_expires = presign_expires
+        self.signer = SigV4Signer(access_key_id, secret_access_key, region)
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def start(self) -> None:
+        self._get_client()
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # 命令行脚本不调用 start，第一次请求时创建
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                transport=self._transport,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+        return self._client
+
+    def object_url(self, key: str, endpoint_url: Optional[str] = None) -> httpx.URL:
+        """对象的访问地址（路径按 S3 规则编码）"""
+        path = f"/{self.bucket}/" if self.bucket else "/"
+        path += _quote(self.key_prefix + key, safe="/-_.~")
+        return httpx.URL((endpoint_url or self.endpoint_url) + path)
+
+    def bucket_url(self, params: Mapping[str, str]) -> httpx.URL:
+        """存储桶的访问地址（列出对象等操作）"""
+        path = f"/{self.bucket}/" if self.bucket else "/"
+        return httpx.URL(self.endpoint_url + path, params=params)
+
+    async def _send(
+        self,
+        method: str,
+        key: str,
+        headers: Optional[Mapping[str, str]] = None,
+        content=None,
+        stream: bool = False,
+        url: Optional[httpx.URL] = None
+    ) -> httpx.Response:
+        url = url or self.object_url(key)
+        client = self._get_client()
+        request = client.build_request(
+            method, url, headers=self.signer.sign_headers(method, url, headers or {}), content=content
+        )
+        return await client.send(request, stream=stream)
+
+    @staticmethod
+    async def _raise_for_status(response: httpx.Response, key: str) -> None:
+        if response.status_code == 404:
+            raise FileNotFoundError(key)
+        if response.status_code >= 300:
+            await response.aread()
+            raise S3Error(response.status_code, response.text[:500])
+
+    async def exists(self, key: str) -> bool:
+        response = await self._send("HEAD", key)
+        if response.status_code == 404:
+            return False
+        await self._raise_for_status(response, key)
+        return True
+
+    async def put_file(self, source: Path, key: str, content_type: str, file_md5: Optional[str] = None) -> bool:
+        if await self.exists(key):
+            source.unlink(missing_ok=True)
+            return False
+
+        headers = {
+            "Content-Type": content_type,
+            "Content-Length": str(source.stat().st_size),
+        }
+        if file_md5:
+            headers["Content-MD5"] = base64.b64encode(bytes.fromhex(file_md5)).decode("ascii")
+        response = await self._send("PUT", key, headers=headers, content=self._read_file(source))
+        await self._raise_for_status(response, key)
+        source.unlink(missing_ok=True)
+        return True
+
+    @staticmethod
+    async def _read_file(path: Path) -> AsyncIterator[bytes]:
+        source = await run_in_threadpool(open, path, "rb")
+        try:
+            while chunk := await run_in_threadpool(source.read, CHUNK_SIZE):
+                yield chunk
+        finally:
+            source.close()
+
+    async def delete(self, key: str) -> bool:
+        existed = await self.exists(key)
+        if existed:
+            response = await self._send("DELETE", key)
+            await self._raise_for_status(response, key)
+        # 本机缓存的预览图
+        self.handler.delete_file(key)
+        return existed
+
+    async def iter_chunks(self, key: str, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        response = await self._send("GET", key, stream=True)
+        try:
+            await self._raise_for_status(response, key)
+            async for chunk in response.aiter_bytes(chunk_size):
+                yield chunk
+        finally:
+            await response.aclose()
+
+    async def iter_objects(self, page_size: int = 1000) -> AsyncIterator[StoredObject]:
+        # ListObjectsV2 按键的UTF-8字节序返回
+        params = {"list-type": "2", "prefix": self.key_prefix, "max-keys": str(page_size)}
+        while True:
+            response = await self._send("GET", "", url=self.bucket_url(params))
+            await self._raise_for_status(response, self.key_prefix)
+            root = ElementTree.fromstring(response.content)
+            for item in root.iter(f"{S3_XML_NAMESPACE}Contents"):
+                key = item.findtext(f"{S3_XML_NAMESPACE}Key")[len(self.key_prefix):]
+                if not key or "/" in key:
+                    continue
+                modified_at = datetime.fromisoformat(item.findtext(f"{S3_XML_NAMESPACE}LastModified"))
+                yield StoredObject(key, int(item.findtext(f"{S3_XML_NAMESPACE}Size")), modified_at.timestamp())
+            token = root.findtext(f"{S3_XML_NAMESPACE}NextContinuationToken")
+            if root.findtext(f"{S3_XML_NAMESPACE}IsTruncated") != "true" or not token:
+                return
+            params["continuation-token"] = token
+
+    async def presigned_url(
+        self,
+        key: str,
+        filename: Optional[str] = None,
+        content_type: Optional[str] = None
+    ) -> Optional[str]:
+        if not self.presigned_download:
+            return None
+        params = {}
+        if filename:
+            params["response-content-disposition"] = f"attachment; filename*=utf-8''{quote(filename)}"
+        if content_type:
+            params["response-content-type"] = content_type
+        url = self.object_url(key, self.public_endpoint_url)
+        return self.signer.presign("GET", url, self.presign_expires, params)
@@ -1,16 +1,115 @@
+"""
+审计操作装饰器
+
+装饰时一次性解析被装饰函数的签名，确定数据库会话、当前用户和请求对象所在的参数
+（按类型注解，其次按参数名 db / current_user / request），调用时按参数名或位置直接取值，
+不再每次调用都反射签名、绑定参数并逐个判断类型。
+
+审计事件默认延迟写入：放入批量写入队列（见 app.services.audit_writer），
+不占用被装饰函数的会话和事务；deferred=False 时在函数的会话中同步写入并提交。
+"""
+import asyncio
 import functools
 import inspect
-from typing import Optional, Dict, Any, Callable
+import types
+import typing
+from typing import Optional, Dict, Any, Callable, List, NamedTuple, Tuple
 from fastapi import Request
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.audit_log import AuditAction, AuditResourceType
 from app.models.user import User
 from app.services.audit_service import AuditService
+from app.services.audit_writer import audit_log_writer
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+_NO_DEFAULT = inspect.Parameter.empty
+_POSITIONAL_KINDS = (inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD)
+
+
+class _ParamSlot(NamedTuple):
+    """参数的位置信息：参数名、位置下标（只能按关键字传入时为None）、默认值"""
+    name: str
+    position: Optional[int]
+    default: Any
+
+    def get(self, args: tuple, kwargs: Dict[str, Any]) -> Any:
+        if self.name in kwargs:
+            return kwargs[self.name]
+        if self.position is not None and self.position < len(args):
+            return args[self.position]
+        return None if self.default is _NO_DEFAULT else self.default
+
+
+def _annotation_classes(annotation: Any) -> Tuple[type, ...]:
+    """从类型注解中取出类（展开 Annotated[X, ...]、Optional[X]、X | None）"""
+    origin = typing.get_origin(annotation)
+    if origin is typing.Annotated:
+        return _annotation_classes(typing.get_args(annotation)[0])
+    if origin is typing.Union or origin is types.UnionType:
+        return tuple(cls for arg in typing.get_args(annotation) for cls in _annotation_classes(arg))
+    return (annotation,) if isinstance(annotation, type) else ()
+
+
+class _AuditParams:
+    """
+    被装饰函数的参数解析结果（装饰时创建一次）
+
+    db 只匹配 AsyncSession：接口函数拿到的都是异步会话，审计写入也只支持异步会话。
+    """
+
+    def __init__(self, func: Callable):
+        signature = inspect.signature(func)
+        try:
+            hints = typing.get_type_hints(func, include_extras=True)
+        except Exception:
+            # 前向引用等无法解析时退回原始注解
+            hints = {}
+
+        self.names: List[str] = []
+        self.positional_names: List[str] = []
+        self.defaults: Dict[str, Any] = {}
+        slots: Dict[str, _ParamSlot] = {}
+        by_name: Dict[str, _ParamSlot] = {}
+        for index, (name, param) in enumerate(signature.parameters.items()):
+            if param.kind in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD):
+                continue
+            position = index if param.kind in _POSITIONAL_KINDS else None
+            slot = _ParamSlot(name, position, param.default)
+            self.names.append(name)
+            if position is not None:
+                self.positional_names.append(name)
+            if param.default is not _NO_DEFAULT:
+                self.defaults[name] = param.default
+            by_name[name] = slot
+
+            classes = _annotation_classes(hints.get(name, param.annotation))
+            for role, expected in (("db", AsyncSession), ("current_user", User), ("request", Request)):
+                if role not in slots and any(issubclass(cls, expected) for cls in classes):
+                    slots[role] = slot
+
+        # 没有类型注解时按常用参数名匹配
+        self.db: Optional[_ParamSlot] = slots.get("db") or by_name.get("db")
+        self.current_user: Optional[_ParamSlot] = slots.get("current_user") or by_name.get("current_user")
+        self.request: Optional[_ParamSlot] = slots.get("request") or by_name.get("request")
+
+    def resolve(self, args: tuple, kwargs: Dict[str, Any]) -> Tuple[Any, Any, Any]:
+        """取出 (db, current_user, request)，没有对应参数时为None"""
+        return (
+            self.db.get(args, kwargs) if self.db else None,
+            self.current_user.get(args, kwargs) if self.current_user else None,
+            self.request.get(args, kwargs) if self.request else None,
+        )
+
+    def arguments(self, args: tuple, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """参数名到参数值的映射（含默认值），供 get_details 使用"""
+        arguments = dict(self.defaults)
+        arguments.update(zip(self.positional_names, args))
+        arguments.update(kwargs)
+        return arguments
+
 
 def audit_action(
     action: AuditAction,
@@ -19,7 +118,8 @@ def audit_action(
     get_resource_id: Optional[Callable] = None,
     get_details: Optional[Callable] = None,
     success_message: Optional[str] = None,
-    error_message: Optional[str] = None
+    error_message: Optional[str] = None,
+    deferred: bool = True
 ):
     """
     审计操作装饰器
@@ -32,37 +132,53 @@ def audit_action(
         get_details: 获取详细信息的函数，接收函数参数和返回值
         success_message: 成功时的描述信息
         error_message: 失败时的描述信息
+        deferred: 是否延迟写入（放入批量写入队列）；False 时在函数的会话中同步写入
     """
     def decorator(func):
+        params = _AuditParams(func)
+
+        def collect(args, kwargs, result):
+            """获取资源ID和详细信息"""
+            resource_id = None
+            details = None
+            if get_resource_id and result is not None:
+                try:
+                    resource_id = get_resource_id(result)
+                except Exception as e:
+                    logger.warning(f"Failed to get resource_id: {e}")
+            if get_details:
+                try:
+                    details = get_details(params.arguments(args, kwargs), result)
+                except Exception as e:
+                    logger.warning(f"Failed to get audit details: {e}")
+            return resource_id, details
+
+        def emit(db, current_user, request, success, error_msg, resource_id, details):
+            """返回写入审计日志的协程，缺少用户或无处写入时返回None"""
+            if current_user is None:
+                return None
+            if db is None and not (deferred and audit_log_writer.running):
+                return None
+            final_description = success_message if success and success_message else description
+            if not success and error_message:
+                final_description = error_message
+            return AuditService.log_action(
+                db=db,
+                user_id=current_user.id,
+                action=action,
+                resource_type=resource_type,
+                description=final_description,
+                resource_id=resource_id,
+                details=details,
+                request=request,
+                success=success,
+                error_message=error_msg,
+                sync=not deferred
+            )
+
         @functools.wraps(func)
         async def async_wrapper(*args, **kwargs):
-            # 提取参数
-            db = None
-            current_user = None
-            request = None
-            
-            # 从函数签名中提取参数
-            sig = inspect.signature(func)
-            bound_args = sig.bind(*args, **kwargs)
-            bound_args.apply_defaults()
-            
-            # 查找常见的参数
-            for param_name, param_value in bound_args.arguments.items():
-                if isinstance(param_value, Session):
-                    db = param_value
-                elif isinstance(param_value, User):
-                    current_user = param_value
-                elif isinstance(param_value, Request):
-                    request = param_value
-            
-            # 如果没有找到必要参数，尝试从kwargs中获取
-            if db is None:
-                db = kwargs.get('db')
-            if current_user is None:
-                current_user = kwargs.get('current_user')
-            if request is None:
-                request = kwargs.get('request')
-            
+            db, current_user, request = params.resolve(args, kwargs)
             success = True
             error_msg = None
             result = None
@@ -71,24 +187,8 @@ def audit_action(
             
             try:
                 # 执行原函数
-                if inspect.iscoroutinefunction(func):
-                    result = await func(*args, **kwargs)
-                else:
-                    result = func(*args, **kwargs)
-                
-                # 获取资源ID
-                if get_resource_id and result is not None:
-                    try:
-                        resource_id = get_resource_id(result)
-                    except Exception as e:
-                        logger.warning(f"Failed to get resource_id: {e}")
-                
-                # 获取详细信息
-                if get_details:
-                    try:
-                        details = get_details(bound_args.arguments, result)
-                    except Exception as e:
-                        logger.warning(f"Failed to get audit details: {e}")
+                result = await func(*args, **kwargs)
+                resource_id, details = collect(args, kwargs, result)
                 
             except Exception as e:
                 success = False
@@ -98,59 +198,18 @@ def audit_action(
             
             finally:
                 # 记录审计日志
-                if db and current_user:
-                    try:
-                        final_description = success_message if success and success_message else description
-                        if not success and error_message:
-                            final_description = error_message
-                        
-                        await AuditService.log_action(
-                            db=db,
-                            user_id=current_user.id,
-                            action=action,
-                            resource_type=resource_type,
-                            description=final_description,
-                            resource_id=resource_id,
-                            details=details,
-                            request=request,
-                            success=success,
-                            error_message=error_msg
-                        )
-                    except Exception as audit_error:
-                        logger.error(f"Failed to log audit action: {audit_error}")
+                try:
+                    coroutine = emit(db, current_user, request, success, error_msg, resource_id, details)
+                    if coroutine is not None:
+                        await coroutine
+                except Exception as audit_error:
+                    logger.error(f"Failed to log audit action: {audit_error}")
             
             return result
         
         @functools.wraps(func)
         def sync_wrapper(*args, **kwargs):
-            # 对于同步函数的处理
-            # 提取参数
-            db = None
-            current_user = None
-            request = None
-            
-            # 从函数签名中提取参数
-            sig = inspect.signature(func)
-            bound_args = sig.bind(*args, **kwargs)
-            bound_args.apply_defaults()
-            
-            # 查找常见的参数
-            for param_name, param_value in bound_args.arguments.items():
-                if isinstance(param_value, Session):
-                    db = param_value
-                elif isinstance(param_value, User):
-                    current_user = param_value
-                elif isinstance(param_value, Request):
-                    request = param_value
-            
-            # 如果没有找到必要参数，尝试从kwargs中获取
-            if db is None:
-                db = kwargs.get('db')
-            if current_user is None:
-                current_user = kwargs.get('current_user')
-            if request is None:
-                request = kwargs.get('request')
-            
+            db, current_user, request = params.resolve(args, kwargs)
             success = True
             error_msg = None
             result = None
@@ -160,20 +219,7 @@ def audit_action(
             try:
                 # 执行原函数
                 result = func(*args, **kwargs)
-                
-                # 获取资源ID
-                if get_resource_id and result is not None:
-                    try:
-                        resource_id = get_resource_id(result)
-                    except Exception as e:
-                        logger.warning(f"Failed to get resource_id: {e}")
-                
-                # 获取详细信息
-                if get_details:
-                    try:
-                        details = get_details(bound_args.arguments, result)
-                    except Exception as e:
-                        logger.warning(f"Failed to get audit details: {e}")
+                resource_id, details = collect(args, kwargs, result)
                 
             except Exception as e:
                 success = False
@@ -182,54 +228,17 @@ def audit_action(
                 raise
             
             finally:
-                # 记录审计日志（同步版本，需要在异步上下文中调用）
-                if db and current_user:
-                    try:
-                        import asyncio
-                        final_description = success_message if success and success_message else description
-                        if not success and error_message:
-                            final_description = error_message
-                        
-                        # 创建异步任务来记录审计日志
-                        loop = None
+                # 记录审计日志（同步函数中无法等待，在事件循环中创建任务）
+                try:
+                    coroutine = emit(db, current_user, request, success, error_msg, resource_id, details)
+                    if coroutine is not None:
                         try:
-                            loop = asyncio.get_event_loop()
+                            asyncio.get_running_loop().create_task(coroutine)
                         except RuntimeError:
-                            pass
-                        
-                        if loop and loop.is_running():
-                            # 如果在异步上下文中，创建任务
-                            asyncio.create_task(AuditService.log_action(
-                                db=db,
-                                user_id=current_user.id,
-                                action=action,
-                                resource_type=resource_type,
-                                description=final_description,
-                                resource_id=resource_id,
-                                details=details,
-                                request=request,
-                                success=success,
-                                error_message=error_msg
-                            ))
-                        else:
-                            # 如果不在异步上下文中，使用run_until_complete
-                            try:
-                                asyncio.run(AuditService.log_action(
-                                    db=db,
-                                    user_id=current_user.id,
-                                    action=action,
-                                    resource_type=resource_type,
-                                    description=final_description,
-                                    resource_id=resource_id,
-                                    details=details,
-                                    request=request,
-                                    success=success,
-                                    error_message=error_msg
-                                ))
-                            except Exception as run_error:
-                                logger.warning(f"Failed to run audit logging: {run_error}")
-                    except Exception as audit_error:
-                        logger.error(f"Failed to log audit action: {audit_error}")
+                            # 不在事件循环中时直接运行
+                            asyncio.run(coroutine)
+                except Exception as audit_error:
+                    logger.error(f"Failed to log audit action: {audit_error}")
             
             return result
         
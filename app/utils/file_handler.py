@@ -1,13 +1,39 @@
+import glob
 import hashlib
 import os
-import shutil
+import tempfile
 from pathlib import Path
-from typing import BinaryIO, Tuple
+from typing import BinaryIO, Iterator, List, Optional, Tuple
 from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+# 上传文件每次读取的块大小
+CHUNK_SIZE = 1024 * 1024
+
+# 分片目录层数和每层名称长度：abcd...pdf 存放在 ab/cd/abcd...pdf
+SHARD_LEVELS = 2
+SHARD_WIDTH = 2
+
+# 预览图文件名：{stored_filename}.preview-{尺寸}.jpg，与原文件在同一目录
+PREVIEW_MARKER = ".preview-"
+
+
+class FileSizeExceededError(Exception):
+    """上传文件超过大小限制"""
+    
+    def __init__(self, filename: str, max_size: int):
+        self.filename = filename
+        self.max_size = max_size
+        super().__init__(f"文件 {filename} 超过大小限制 {max_size} 字节")
 
 
 class FileHandler:
-    """文件处理工具类"""
+    """文件处理工具类
+    
+    文件按内容MD5命名（stored_filename 为 {md5}{ext}），按文件名前缀分片存放：
+    files/ab/cd/abcd....pdf。早期的文件平铺在 files/ 下，迁移期间两种布局同时可读，
+    可用 scripts/migrate_file_layout.py 在线迁移。数据库中的 stored_filename 不变。
+    """
     
     def __init__(self, upload_dir: str = "files"):
         """初始化文件处理器
@@ -17,6 +43,9 @@ class FileHandler:
         """
         self.upload_dir = Path(upload_dir)
         self.upload_dir.mkdir(exist_ok=True)
+        # 写入中的临时文件放在上传目录下，保证与最终文件在同一文件系统，重命名是原子的
+        self.tmp_dir = self.upload_dir / ".tmp"
+        self.tmp_dir.mkdir(exist_ok=True)
     
     def calculate_md5(self, file_obj: BinaryIO) -> str:
         """计算文件MD5值
@@ -64,37 +93,111 @@ class FileHandler:
         extension = self.get_file_extension(original_filename)
         return f"{file_md5}{extension}"
     
-    async def save_upload_file(self, upload_file: UploadFile) -> Tuple[str, str, int]:
-        """保存上传的文件
+    def stage_file(
+        self,
+        file_obj: BinaryIO,
+        filename: str,
+        max_size: Optional[int] = None
+    ) -> Tuple[str, Path, int]:
+        """边读边计算MD5并写入临时文件（单次读取，阻塞调用，应在线程中执行）
         
         Args:
-            upload_file: FastAPI上传文件对象
+            file_obj: 文件对象
+            filename: 原始文件名（用于错误信息）
+            max_size: 最大字节数，超过时立即停止读取
             
         Returns:
-            (file_md5, stored_filename, file_size)
+            (file_md5, 临时文件路径, file_size)
+            
+        Raises:
+            FileSizeExceededError: 文件超过大小限制（临时文件已删除）
         """
-        # 计算文件MD5
-        file_md5 = self.calculate_md5(upload_file.file)
+        md5_hash = hashlib.md5()
+        file_size = 0
+        file_obj.seek(0)
+        
+        fd, tmp_name = tempfile.mkstemp(dir=self.tmp_dir, suffix=".part")
+        tmp_path = Path(tmp_name)
+        try:
+            with os.fdopen(fd, "wb") as buffer:
+                for chunk in iter(lambda: file_obj.read(CHUNK_SIZE), b""):
+                    file_size += len(chunk)
+                    if max_size is not None and file_size > max_size:
+                        raise FileSizeExceededError(filename, max_size)
+                    md5_hash.update(chunk)
+                    buffer.write(chunk)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
         
-        # 生成存储文件名
-        stored_filename = self.generate_stored_filename(upload_file.filename, file_md5)
+        return md5_hash.hexdigest(), tmp_path, file_size
+    
+    def place_staged_file(self, tmp_path: Path, stored_filename: str) -> bool:
+        """把临时文件重命名到存储位置
         
-        # 构建完整的文件路径
-        file_path = self.upload_dir / stored_filename
+        文件已存在（任一布局）时丢弃临时文件（避免重复存储相同文件）。
         
-        # 如果文件已存在，直接返回（避免重复存储相同文件）
-        if file_path.exists():
-            file_size = file_path.stat().st_size
-            return file_md5, stored_filename, file_size
+        Returns:
+            是否写入了新文件
+        """
+        if self.locate_file(stored_filename) is not None:
+            tmp_path.unlink(missing_ok=True)
+            return False
+        file_path = self.get_sharded_path(stored_filename)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_path, file_path)
+        return True
+    
+    async def stage_upload_file(self, upload_file: UploadFile, max_size: Optional[int] = None) -> Tuple[str, Path, int]:
+        """在线程池中把上传文件写入临时文件并计算MD5（见 stage_file）
         
-        # 保存文件
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(upload_file.file, buffer)
+        用于先暂存、再由存储后端放入存储并登记文件引用的场景（见 BlobService），
+        之后调用 place_staged_file 或 discard_staged_file。
+        """
+        return await run_in_threadpool(self.stage_file, upload_file.file, upload_file.filename, max_size)
+    
+    def discard_staged_file(self, tmp_path: Path) -> None:
+        """删除临时文件"""
+        tmp_path.unlink(missing_ok=True)
+    
+    def get_sharded_path(self, stored_filename: str) -> Path:
+        """获取文件在分片布局中的路径
         
-        # 获取文件大小
-        file_size = file_path.stat().st_size
+        Args:
+            stored_filename: 存储文件名
+            
+        Returns:
+            files/ab/cd/{stored_filename}（文件名过短时不分片）
+        """
+        if len(stored_filename) < SHARD_LEVELS * SHARD_WIDTH:
+            return self.upload_dir / stored_filename
+        shards = [stored_filename[i * SHARD_WIDTH:(i + 1) * SHARD_WIDTH] for i in range(SHARD_LEVELS)]
+        return self.upload_dir.joinpath(*shards, stored_filename)
+    
+    def get_preview_path(self, stored_filename: str, size: int) -> Path:
+        """获取文件预览图的路径（与分片布局中的原文件在同一目录）"""
+        sharded_path = self.get_sharded_path(stored_filename)
+        return sharded_path.with_name(f"{stored_filename}{PREVIEW_MARKER}{size}.jpg")
+    
+    def get_legacy_path(self, stored_filename: str) -> Path:
+        """获取文件在旧的平铺布局中的路径"""
+        return self.upload_dir / stored_filename
+    
+    def locate_file(self, stored_filename: str) -> Optional[Path]:
+        """查找文件实际所在路径，两种布局都没有时返回None
         
-        return file_md5, stored_filename, file_size
+        先查分片布局再查平铺布局；平铺布局也没有时再查一次分片布局，
+        避免两次检查之间文件恰好被迁移工具移走而误判为不存在。
+        """
+        sharded_path = self.get_sharded_path(stored_filename)
+        if sharded_path.exists():
+            return sharded_path
+        legacy_path = self.get_legacy_path(stored_filename)
+        if legacy_path.exists():
+            return legacy_path
+        if sharded_path.exists():
+            return sharded_path
+        return None
     
     def get_file_path(self, stored_filename: str) -> Path:
         """获取文件完整路径
@@ -103,9 +206,9 @@ class FileHandler:
             stored_filename: 存储文件名
             
         Returns:
-            文件完整路径
+            文件完整路径（文件不存在时为分片布局中的路径）
         """
-        return self.upload_dir / stored_filename
+        return self.locate_file(stored_filename) or self.get_sharded_path(stored_filename)
     
     def file_exists(self, stored_filename: str) -> bool:
         """检查文件是否存在
@@ -116,10 +219,10 @@ class FileHandler:
         Returns:
             文件是否存在
         """
-        return self.get_file_path(stored_filename).exists()
+        return self.locate_file(stored_filename) is not None
     
     def delete_file(self, stored_filename: str) -> bool:
-        """删除文件
+        """删除文件（两种布局中的副本和预览图都删除）
         
         Args:
             stored_filename: 存储文件名
@@ -127,14 +230,94 @@ class FileHandler:
         Returns:
             是否删除成功
         """
-        file_path = self.get_file_path(stored_filename)
+        deleted = False
         try:
-            if file_path.exists():
-                file_path.unlink()
-                return True
-            return False
+            # 与迁移工具移动文件的方向一致，先删平铺布局再删分片布局：
+            # 检查两个位置之间文件被移走时，仍能在分片布局中找到并删除
+            for file_path in (self.get_legacy_path(stored_filename), self.get_sharded_path(stored_filename)):
+                try:
+                    file_path.unlink()
+                    deleted = True
+                except FileNotFoundError:
+                    continue
+            # 同时删除预览图
+            sharded_dir = self.get_sharded_path(stored_filename).parent
+            if sharded_dir.is_dir():
+                for preview_path in sharded_dir.glob(f"{glob.escape(stored_filename)}{PREVIEW_MARKER}*"):
+                    preview_path.unlink(missing_ok=True)
+            return deleted
         except Exception:
             return False
+    
+    def iter_legacy_files(self) -> Iterator[str]:
+        """遍历平铺布局中的文件（返回存储文件名）"""
+        with os.scandir(self.upload_dir) as entries:
+            for entry in entries:
+                if entry.is_file(follow_symlinks=False):
+                    yield entry.name
+    
+    def _iter_shard_dirs(self) -> Iterator[Tuple[str, Path]]:
+        """按名称顺序遍历最底层的分片目录，返回 (文件名前缀, 目录路径)"""
+        def subdirs(path: Path) -> List[str]:
+            with os.scandir(path) as entries:
+                return sorted(
+                    entry.name for entry in entries
+                    if len(entry.name) == SHARD_WIDTH and entry.is_dir(follow_symlinks=False)
+                )
+
+        def walk(path: Path, prefix: str, level: int) -> Iterator[Tuple[str, Path]]:
+            if level == SHARD_LEVELS:
+                yield prefix, path
+                return
+            for name in subdirs(path):
+                yield from walk(path / name, prefix + name, level + 1)
+
+        yield from walk(self.upload_dir, "", 0)
+
+    def iter_sharded_files(self) -> Iterator[os.DirEntry]:
+        """按文件名顺序遍历分片布局中的文件（包括预览图）
+
+        分片目录名是文件名的前缀，按目录名、再按目录内文件名排序即为全部文件名的顺序。
+        只返回文件名以所在目录前缀开头的文件，目录中的其他文件（如渲染中断留下的临时文件）
+        会打乱这个顺序，见 iter_stray_files。每次只列出一个目录，内存占用与文件总数无关。
+        """
+        for prefix, path in self._iter_shard_dirs():
+            with os.scandir(path) as entries:
+                files = [
+                    entry for entry in entries
+                    if entry.name.startswith(prefix) and entry.is_file(follow_symlinks=False)
+                ]
+            yield from sorted(files, key=lambda entry: entry.name)
+
+    def iter_stray_files(self) -> Iterator[os.DirEntry]:
+        """遍历分片目录中文件名不以目录前缀开头的文件（不属于分片布局，如残留的临时文件）"""
+        for prefix, path in self._iter_shard_dirs():
+            with os.scandir(path) as entries:
+                files = [
+                    entry for entry in entries
+                    if not entry.name.startswith(prefix) and entry.is_file(follow_symlinks=False)
+                ]
+            yield from files
+
+    def move_to_sharded(self, stored_filename: str) -> bool:
+        """把平铺布局中的文件移动到分片布局
+        
+        同一文件系统内的重命名是原子的，下载过程中文件始终可以在其中一个位置找到。
+        分片布局中已有相同文件（内容按MD5命名，必然相同）时直接删除平铺副本。
+        
+        Returns:
+            是否移动（False 表示分片布局中已存在，只删除了平铺副本）
+        """
+        legacy_path = self.get_legacy_path(stored_filename)
+        sharded_path = self.get_sharded_path(stored_filename)
+        if sharded_path == legacy_path:
+            return False
+        if sharded_path.exists():
+            legacy_path.unlink(missing_ok=True)
+            return False
+        sharded_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(legacy_path, sharded_path)
+        return True
 
 
 # 全局文件处理器实例
@@ -0,0 +1,45 @@
+"""
+游标（keyset）分页工具
+
+游标对客户端是不透明的字符串，内部为 base64url 编码的 JSON 对象，
+保存上一页最后一条记录的排序键（例如 {"id": 123}）。
+"""
+import base64
+import json
+from typing import Any, Dict
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    """将排序键编码为不透明游标
+
+    Args:
+        values: 排序键字典，值必须可以被JSON序列化（datetime请先转成ISO字符串）
+
+    Returns:
+        base64url编码的游标字符串（去掉末尾的"="）
+    """
+    raw = json.dumps(values, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """解码游标
+
+    Args:
+        cursor: encode_cursor生成的游标字符串
+
+    Returns:
+        排序键字典
+
+    Raises:
+        ValueError: 游标格式不正确
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"无效的游标: {cursor}") from e
+
+    if not isinstance(values, dict):
+        raise ValueError(f"无效的游标: {cursor}")
+    return values
@@ -0,0 +1,98 @@
+"""
+附件预览图渲染
+
+图片生成缩略图，PDF渲染第一页，统一输出为JPEG。渲染在进程池的子进程中执行，
+这个模块只依赖标准库和可选依赖（Pillow、PyMuPDF，见 pyproject 中的 preview 扩展），
+子进程导入它时不会加载应用配置和数据库。
+"""
+import importlib.util
+import io
+import os
+import tempfile
+
+IMAGE_CONTENT_TYPES = {"image/jpeg", "image/png", "image/gif", "image/webp"}
+PDF_CONTENT_TYPE = "application/pdf"
+PREVIEW_MEDIA_TYPE = "image/jpeg"
+
+PILLOW_AVAILABLE = importlib.util.find_spec("PIL") is not None
+PYMUPDF_AVAILABLE = importlib.util.find_spec("pymupdf") is not None
+
+
+def can_preview(content_type: str) -> bool:
+    """该类型的文件能否生成预览（需要安装对应的可选依赖）"""
+    if content_type in IMAGE_CONTENT_TYPES:
+        return PILLOW_AVAILABLE
+    if content_type == PDF_CONTENT_TYPE:
+        return PYMUPDF_AVAILABLE
+    return False
+
+
+def _render_image(source_path: str, max_size: int, quality: int) -> bytes:
+    from PIL import Image, ImageOps
+
+    with Image.open(source_path) as image:
+        # JPEG 解码时直接按比例降采样，大图不用完整解码
+        image.draft("RGB", (max_size, max_size))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_size, max_size))
+        if image.mode in ("RGBA", "LA", "P"):
+            # 透明背景铺白色
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        elif image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=quality, optimize=True)
+        return buffer.getvalue()
+
+
+def _render_pdf(source_path: str, max_size: int, quality: int) -> bytes:
+    import pymupdf
+
+    with pymupdf.open(source_path) as document:
+        page = document.load_page(0)
+        zoom = max_size / max(page.rect.width, page.rect.height)
+        pixmap = page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), alpha=False)
+        return pixmap.tobytes(output="jpeg", jpg_quality=quality)
+
+
+def render_preview(source_path: str, target_path: str, content_type: str, max_size: int, quality: int = 80) -> int:
+    """
+    生成预览图并原子写入 target_path
+
+    Args:
+        source_path: 原文件路径
+        target_path: 预览图路径
+        content_type: 原文件MIME类型
+        max_size: 预览图最长边像素
+        quality: JPEG质量
+
+    Returns:
+        预览图字节数
+
+    Raises:
+        ValueError: 不支持的文件类型
+    """
+    if content_type in IMAGE_CONTENT_TYPES:
+        data = _render_image(source_path, max_size, quality)
+    elif content_type == PDF_CONTENT_TYPE:
+        data = _render_pdf(source_path, max_size, quality)
+    else:
+        raise ValueError(f"不支持预览的文件类型: {content_type}")
+
+    # 平铺布局中的文件（或只在对象存储中的文件）在本机可能还没有分片目录
+    target_dir = os.path.dirname(target_path)
+    os.makedirs(target_dir, exist_ok=True)
+    # 临时文件以预览图文件名开头，按文件名顺序遍历分片目录时位置不变，残留时按过期预览图清理
+    fd, tmp_path = tempfile.mkstemp(dir=target_dir, prefix=f"{os.path.basename(target_path)}.", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as output:
+            output.write(data)
+        os.replace(tmp_path, target_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return len(data)
@@ -0,0 +1,48 @@
+"""add_salesrecord_trigram_search_indexes
+
+Revision ID: 5a1c7e3f9b20
+Revises: d0959b727f90
+Create Date: 2026-10-17 10:05:17.284611
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a1c7e3f9b20'
+down_revision: Union[str, None] = 'd0959b727f90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 订单编号/产品名称的子串搜索（LIKE '%x%'）无法使用B-tree索引，
+    # 使用pg_trgm的GIN三元组索引支持 LIKE/ILIKE 以及相似度查询
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        'ix_salesrecord_order_number_trgm',
+        'salesrecord',
+        ['order_number'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'order_number': 'gin_trgm_ops'},
+    )
+    op.create_index(
+        'ix_salesrecord_product_name_trgm',
+        'salesrecord',
+        ['product_name'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'product_name': 'gin_trgm_ops'},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_salesrecord_product_name_trgm', table_name='salesrecord')
+    op.drop_index('ix_salesrecord_order_number_trgm', table_name='salesrecord')
+    # pg_trgm扩展可能被其他对象使用，这里不删除
@@ -0,0 +1,65 @@
+"""add_sales_daily_rollup_table
+
+Revision ID: 7c3e2b9d4f61
+Revises: 5a1c7e3f9b20
+Create Date: 2026-10-17 11:20:03.615372
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3e2b9d4f61'
+down_revision: Union[str, None] = '5a1c7e3f9b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('sales_daily_rollup',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('stage', sa.String(length=20), nullable=False),
+    sa.Column('order_source', sa.String(length=20), nullable=False),
+    sa.Column('order_type', sa.String(length=20), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('order_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('total_price', sa.Numeric(precision=18, scale=2), server_default='0', nullable=False),
+    sa.Column('factory_price', sa.Numeric(precision=18, scale=2), server_default='0', nullable=False),
+    sa.Column('refund_amount', sa.Numeric(precision=18, scale=2), server_default='0', nullable=False),
+    sa.Column('tax_refund', sa.Numeric(precision=18, scale=2), server_default='0', nullable=False),
+    sa.Column('profit', sa.Numeric(precision=18, scale=2), server_default='0', nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('day', 'stage', 'order_source', 'order_type', 'user_id')
+    )
+
+    # 用现有销售记录初始化汇总（表达式与 SalesRollupService 保持一致）
+    op.execute("""
+        INSERT INTO sales_daily_rollup (
+            day, stage, order_source, order_type, user_id, order_count,
+            total_price, factory_price, refund_amount, tax_refund, profit, created_at, updated_at
+        )
+        SELECT
+            CAST(timezone('UTC', created_at) AS DATE),
+            stage, order_source, order_type, user_id,
+            count(*),
+            sum(CAST(CAST(coalesce(total_price, 0) AS DOUBLE PRECISION) AS NUMERIC(18, 2))),
+            sum(CAST(CAST(coalesce(factory_price, 0) AS DOUBLE PRECISION) AS NUMERIC(18, 2))),
+            sum(CAST(CAST(coalesce(refund_amount, 0) AS DOUBLE PRECISION) AS NUMERIC(18, 2))),
+            sum(CAST(CAST(coalesce(tax_refund, 0) AS DOUBLE PRECISION) AS NUMERIC(18, 2))),
+            sum(CAST(CAST(coalesce(profit, 0) AS DOUBLE PRECISION) AS NUMERIC(18, 2))),
+            now(), now()
+        FROM salesrecord
+        WHERE is_voided = false
+        GROUP BY 1, 2, 3, 4, 5
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('sales_daily_rollup')
@@ -0,0 +1,29 @@
+"""add_salesrecord_created_at_index
+
+Revision ID: 9e4a6d2c8b13
+Revises: 7c3e2b9d4f61
+Create Date: 2026-10-17 12:41:56.208734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4a6d2c8b13'
+down_revision: Union[str, None] = '7c3e2b9d4f61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 时间序列统计按 created_at 范围扫描
+    op.create_index('ix_salesrecord_created_at', 'salesrecord', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_salesrecord_created_at', table_name='salesrecord')
@@ -0,0 +1,122 @@
+"""partition_auditlog_by_month
+
+Revision ID: b3f1a7c9d2e5
+Revises: 9e4a6d2c8b13
+Create Date: 2026-10-17 14:05:37.482913
+
+"""
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f1a7c9d2e5'
+down_revision: Union[str, None] = '9e4a6d2c8b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 预先创建的未来月分区数（与 AUDIT_PARTITION_PREMAKE_MONTHS 默认值一致）
+PREMAKE_MONTHS = 3
+
+COLUMNS = (
+    "id, user_id, action, resource_type, resource_id, description, details, "
+    "ip_address, user_agent, success, error_message, created_at, updated_at"
+)
+INDEXED_COLUMNS = ('action', 'resource_id', 'resource_type', 'user_id')
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _audit_columns(created_at_nullable: bool) -> list:
+    return [
+        sa.Column('id', sa.Integer(), server_default=sa.text("nextval('auditlog_id_seq'::regclass)"), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('action', sa.String(length=20), nullable=False),
+        sa.Column('resource_type', sa.String(length=50), nullable=False),
+        sa.Column('resource_id', sa.Integer(), nullable=True),
+        sa.Column('description', sa.String(length=500), nullable=False),
+        sa.Column('details', sa.Text(), nullable=True),
+        sa.Column('ip_address', sa.String(length=45), nullable=True),
+        sa.Column('user_agent', sa.String(length=500), nullable=True),
+        sa.Column('success', sa.Boolean(), nullable=False),
+        sa.Column('error_message', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=created_at_nullable),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    ]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 旧表改名保留到数据复制完成；id序列解除归属，由新表继续使用
+    op.rename_table('auditlog', 'auditlog_legacy')
+    op.execute("ALTER TABLE auditlog_legacy RENAME CONSTRAINT auditlog_pkey TO auditlog_legacy_pkey")
+    op.execute("ALTER TABLE auditlog_legacy RENAME CONSTRAINT auditlog_user_id_fkey TO auditlog_legacy_user_id_fkey")
+    op.execute("ALTER SEQUENCE auditlog_id_seq OWNED BY NONE")
+    for column in INDEXED_COLUMNS + ('id',):
+        op.drop_index(f'ix_auditlog_{column}', table_name='auditlog_legacy')
+
+    # 分区父表：分区键 created_at 非空并包含在主键中
+    op.create_table('auditlog',
+    *_audit_columns(created_at_nullable=False),
+    sa.PrimaryKeyConstraint('id', 'created_at'),
+    postgresql_partition_by='RANGE (created_at)'
+    )
+    op.execute("ALTER SEQUENCE auditlog_id_seq OWNED BY auditlog.id")
+    for column in INDEXED_COLUMNS + ('created_at',):
+        op.create_index(f'ix_auditlog_{column}', 'auditlog', [column], unique=False)
+    op.execute("CREATE TABLE auditlog_default PARTITION OF auditlog DEFAULT")
+
+    # 为已有数据所在的月份和之后 PREMAKE_MONTHS 个月建分区
+    first_at = op.get_bind().execute(sa.text(
+        "SELECT min(coalesce(created_at, updated_at)) FROM auditlog_legacy"
+    )).scalar()
+    now = datetime.now(timezone.utc)
+    month = date(now.year, now.month, 1)
+    if first_at is not None:
+        first_at = first_at.astimezone(timezone.utc)
+        month = min(month, date(first_at.year, first_at.month, 1))
+    last_month = _add_months(date(now.year, now.month, 1), PREMAKE_MONTHS)
+    while month <= last_month:
+        next_month = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE auditlog_p{month.year:04d}{month.month:02d} PARTITION OF auditlog "
+            f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{next_month.isoformat()} 00:00:00+00')"
+        )
+        month = next_month
+
+    # 复制数据（没有创建时间的旧记录使用更新时间或当前时间）
+    op.execute(f"""
+        INSERT INTO auditlog ({COLUMNS})
+        SELECT id, user_id, action, resource_type, resource_id, description, details,
+               ip_address, user_agent, success, error_message,
+               coalesce(created_at, updated_at, now()), updated_at
+        FROM auditlog_legacy
+    """)
+    op.drop_table('auditlog_legacy')
+    op.execute("ANALYZE auditlog")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER SEQUENCE auditlog_id_seq OWNED BY NONE")
+    op.create_table('auditlog_plain',
+    *_audit_columns(created_at_nullable=True),
+    sa.PrimaryKeyConstraint('id', name='auditlog_plain_pkey')
+    )
+    op.execute(f"INSERT INTO auditlog_plain ({COLUMNS}) SELECT {COLUMNS} FROM auditlog")
+    # 删除分区父表会同时删除所有已挂载的分区（已分离的归档表不受影响）
+    op.drop_table('auditlog')
+
+    op.rename_table('auditlog_plain', 'auditlog')
+    op.execute("ALTER TABLE auditlog RENAME CONSTRAINT auditlog_plain_pkey TO auditlog_pkey")
+    op.execute("ALTER TABLE auditlog RENAME CONSTRAINT auditlog_plain_user_id_fkey TO auditlog_user_id_fkey")
+    op.execute("ALTER SEQUENCE auditlog_id_seq OWNED BY auditlog.id")
+    for column in INDEXED_COLUMNS + ('id',):
+        op.create_index(f'ix_auditlog_{column}', 'auditlog', [column], unique=False)
@@ -0,0 +1,48 @@
+"""add_auditlog_keyset_indexes
+
+Revision ID: c7d2e4f8a1b6
+Revises: b3f1a7c9d2e5
+Create Date: 2026-10-17 15:22:08.913264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d2e4f8a1b6'
+down_revision: Union[str, None] = 'b3f1a7c9d2e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 分区表上建索引会在每个分区上创建（不支持CONCURRENTLY），期间审计日志写入会等待
+    # 游标分页按 (created_at, id) 倒序
+    op.drop_index('ix_auditlog_created_at', table_name='auditlog')
+    op.create_index('ix_auditlog_created_at_id', 'auditlog', ['created_at', 'id'], unique=False)
+    # 常用过滤条件 + 时间排序，取代对应的单列索引
+    op.drop_index('ix_auditlog_user_id', table_name='auditlog')
+    op.create_index('ix_auditlog_user_id_created_at', 'auditlog', ['user_id', 'created_at', 'id'], unique=False)
+    op.drop_index('ix_auditlog_action', table_name='auditlog')
+    op.create_index('ix_auditlog_action_created_at', 'auditlog', ['action', 'created_at', 'id'], unique=False)
+    op.drop_index('ix_auditlog_resource_type', table_name='auditlog')
+    op.create_index(
+        'ix_auditlog_resource_created_at', 'auditlog',
+        ['resource_type', 'resource_id', 'created_at', 'id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_auditlog_resource_created_at', table_name='auditlog')
+    op.create_index('ix_auditlog_resource_type', 'auditlog', ['resource_type'], unique=False)
+    op.drop_index('ix_auditlog_action_created_at', table_name='auditlog')
+    op.create_index('ix_auditlog_action', 'auditlog', ['action'], unique=False)
+    op.drop_index('ix_auditlog_user_id_created_at', table_name='auditlog')
+    op.create_index('ix_auditlog_user_id', 'auditlog', ['user_id'], unique=False)
+    op.drop_index('ix_auditlog_created_at_id', table_name='auditlog')
+    op.create_index('ix_auditlog_created_at', 'auditlog', ['created_at'], unique=False)
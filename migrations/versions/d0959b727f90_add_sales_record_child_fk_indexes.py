@@ -0,0 +1,33 @@
+"""add_sales_record_child_fk_indexes
+
+Revision ID: d0959b727f90
+Revises: bf783d55aca5
+Create Date: 2026-10-17 09:12:41.503218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd0959b727f90'
+down_revision: Union[str, None] = 'bf783d55aca5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 附件/运费/采购按 sales_record_id IN (...) 批量加载，需要外键索引
+    op.create_index(op.f('ix_attachment_sales_record_id'), 'attachment', ['sales_record_id'], unique=False)
+    op.create_index(op.f('ix_shippingfees_sales_record_id'), 'shippingfees', ['sales_record_id'], unique=False)
+    op.create_index(op.f('ix_procurement_sales_record_id'), 'procurement', ['sales_record_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_procurement_sales_record_id'), table_name='procurement')
+    op.drop_index(op.f('ix_shippingfees_sales_record_id'), table_name='shippingfees')
+    op.drop_index(op.f('ix_attachment_sales_record_id'), table_name='attachment')
@@ -0,0 +1,72 @@
+"""convert_auditlog_details_to_jsonb
+
+Revision ID: d4a8f2b6c9e1
+Revises: c7d2e4f8a1b6
+Create Date: 2026-10-17 16:10:44.257031
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a8f2b6c9e1'
+down_revision: Union[str, None] = 'c7d2e4f8a1b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 回填时每批处理的id范围
+BACKFILL_BATCH_SIZE = 10000
+
+# 旧数据中序列化失败时保存的是 str(details)，不是合法JSON，保存为 {"raw": 原文}
+TO_JSONB_FUNCTION = """
+CREATE OR REPLACE FUNCTION pg_temp.audit_details_to_jsonb(value text) RETURNS jsonb AS $$
+BEGIN
+    RETURN value::jsonb;
+EXCEPTION WHEN others THEN
+    RETURN jsonb_build_object('raw', value);
+END;
+$$ LANGUAGE plpgsql IMMUTABLE
+"""
+
+BACKFILL_SQL = """
+UPDATE auditlog
+SET details_jsonb = pg_temp.audit_details_to_jsonb(details)
+WHERE id >= :start AND id < :end
+  AND details IS NOT NULL AND details_jsonb IS NULL
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('auditlog', sa.Column('details_jsonb', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    op.execute(TO_JSONB_FUNCTION)
+
+    # 按id范围分批回填，每批单独提交，避免长事务和一次性锁住大量行
+    bind = op.get_bind()
+    min_id, max_id = bind.execute(sa.text("SELECT min(id), max(id) FROM auditlog")).one()
+    if min_id is not None:
+        with op.get_context().autocommit_block():
+            for start in range(min_id, max_id + 1, BACKFILL_BATCH_SIZE):
+                bind.execute(sa.text(BACKFILL_SQL), {"start": start, "end": start + BACKFILL_BATCH_SIZE})
+
+    # 补齐回填期间新写入的行后切换列
+    bind.execute(sa.text(BACKFILL_SQL), {"start": min_id or 0, "end": 2 ** 31 - 1})
+    op.drop_column('auditlog', 'details')
+    op.alter_column('auditlog', 'details_jsonb', new_column_name='details')
+    op.create_index(
+        'ix_auditlog_details', 'auditlog', ['details'], unique=False,
+        postgresql_using='gin', postgresql_ops={'details': 'jsonb_path_ops'}
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_auditlog_details', table_name='auditlog')
+    op.add_column('auditlog', sa.Column('details_text', sa.Text(), nullable=True))
+    op.execute("UPDATE auditlog SET details_text = details::text WHERE details IS NOT NULL")
+    op.drop_column('auditlog', 'details')
+    op.alter_column('auditlog', 'details_text', new_column_name='details')
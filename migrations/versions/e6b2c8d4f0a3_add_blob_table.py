@@ -0,0 +1,47 @@
+"""add_blob_table
+
+Revision ID: e6b2c8d4f0a3
+Revises: d4a8f2b6c9e1
+Create Date: 2026-10-17 17:02:18.904126
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6b2c8d4f0a3'
+down_revision: Union[str, None] = 'd4a8f2b6c9e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('blob',
+    sa.Column('stored_filename', sa.String(length=255), nullable=False),
+    sa.Column('file_md5', sa.String(length=32), nullable=False),
+    sa.Column('file_size', sa.Integer(), nullable=False),
+    sa.Column('content_type', sa.String(length=100), nullable=False),
+    sa.Column('ref_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('stored_filename')
+    )
+    op.create_index(op.f('ix_blob_file_md5'), 'blob', ['file_md5'], unique=False)
+
+    # 用现有附件初始化引用计数
+    op.execute("""
+        INSERT INTO blob (stored_filename, file_md5, file_size, content_type, ref_count, created_at, updated_at)
+        SELECT stored_filename, min(file_md5), max(file_size), min(content_type), count(*), min(created_at), now()
+        FROM attachment
+        GROUP BY stored_filename
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_blob_file_md5'), table_name='blob')
+    op.drop_table('blob')
@@ -0,0 +1,35 @@
+"""add_attachment_stored_filename_index
+
+Revision ID: f3a9c1e7b5d2
+Revises: e6b2c8d4f0a3
+Create Date: 2026-10-17 19:41:06.517302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a9c1e7b5d2'
+down_revision: Union[str, None] = 'e6b2c8d4f0a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 按 C 排序规则（字节序）建索引，与文件目录遍历和对象存储列表的顺序一致，
+    # 存储一致性检查可以按文件名分批归并比较
+    op.create_index(
+        'ix_attachment_stored_filename_c',
+        'attachment',
+        [sa.text('stored_filename COLLATE "C"')],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_attachment_stored_filename_c', table_name='attachment')
@@ -0,0 +1,83 @@
+"""
+审计日志分区维护命令
+
+    python -m scripts.audit_partitions list                      # 列出已挂载的月分区和默认分区行数
+    python -m scripts.audit_partitions ensure [--months-ahead 3] # 预建当前月及之后的月分区
+    python -m scripts.audit_partitions retention --months 12     # 分离超过保留期的月分区
+    python -m scripts.audit_partitions retention --months 12 --drop  # 直接删除过期分区
+
+应用运行时会按 AUDIT_PARTITION_MAINTENANCE_INTERVAL_SECONDS 自动预建分区，
+这里用于手动执行或由定时任务调用。
+"""
+import argparse
+import asyncio
+import sys
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.session import db
+from app.services.audit_partition_service import (
+    DEFAULT_PARTITION,
+    AuditPartitionService,
+    partition_name,
+)
+
+
+async def list_partitions() -> int:
+    async with db.session() as session:
+        months = await AuditPartitionService.list_partitions(session)
+        default_rows = (await session.execute(text(f"SELECT count(*) FROM {DEFAULT_PARTITION}"))).scalar()
+    for month in months:
+        print(f"  {partition_name(month)}  {month:%Y-%m}")
+    print(f"共 {len(months)} 个月分区，默认分区 {default_rows} 行")
+    if default_rows:
+        print("默认分区中有数据，可执行 ensure 为对应月份建分区（数据会自动迁入）")
+    return 0
+
+
+async def ensure(months_ahead: int) -> int:
+    async with db.session() as session:
+        async with session.begin():
+            created = await AuditPartitionService.ensure_partitions(session, months_ahead=months_ahead)
+    print(f"新建分区: {', '.join(created)}" if created else "分区已存在，无需创建")
+    return 0
+
+
+async def retention(months: int, drop: bool) -> int:
+    async with db.session() as session:
+        async with session.begin():
+            expired = await AuditPartitionService.apply_retention(session, months, drop=drop)
+    if not expired:
+        print("没有超过保留期的分区")
+    else:
+        print(f"已{'删除' if drop else '分离'}分区: {', '.join(expired)}")
+    return 0
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="审计日志分区维护")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list", help="列出月分区")
+    ensure_parser = subparsers.add_parser("ensure", help="预建月分区")
+    ensure_parser.add_argument("--months-ahead", type=int, default=settings.AUDIT_PARTITION_PREMAKE_MONTHS)
+    retention_parser = subparsers.add_parser("retention", help="处理过期分区")
+    retention_parser.add_argument("--months", type=int, required=True, help="保留的月数（不含当前月）")
+    retention_parser.add_argument("--drop", action="store_true", help="直接删除，默认只分离")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "list":
+            return await list_partitions()
+        if args.command == "ensure":
+            return await ensure(args.months_ahead)
+        if args.months <= 0:
+            print("--months 必须大于0")
+            return 1
+        return await retention(args.months, args.drop)
+    finally:
+        await db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
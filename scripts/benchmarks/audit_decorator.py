@@ -0,0 +1,126 @@
+"""
+审计装饰器单次调用开销
+
+对比三种情况下每次调用的额外开销（微秒）：
+- 旧实现的参数提取：每次调用 inspect.signature + bind + apply_defaults，再逐个参数判断类型
+- 新实现的参数提取：装饰时解析参数位置，调用时按参数名/位置取值
+- 完整的装饰器调用（减去未装饰函数本身的耗时），审计事件放入批量写入队列
+
+不需要数据库：队列由一个只计数、不写库的后台任务消费。
+
+示例：
+    python -m scripts.benchmarks.audit_decorator --calls 20000
+"""
+import argparse
+import asyncio
+import inspect
+import time
+from types import SimpleNamespace
+from typing import Annotated, Optional
+
+from fastapi import Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.dependencies import get_current_user, get_session
+from app.models.audit_log import AuditResourceType
+from app.models.user import User
+from app.services import audit_service
+from app.services.audit_writer import AuditLogWriter
+from app.utils import audit_decorator
+from app.utils.audit_decorator import _AuditParams, audit_update
+from scripts.benchmarks.common import print_table
+
+
+async def handler(
+    sales_id: int,
+    payload: dict,
+    db: Annotated[AsyncSession, Depends(get_session)],
+    current_user: Annotated[User, Depends(get_current_user)],
+    request: Request,
+    note: Optional[str] = None,
+):
+    return SimpleNamespace(id=sales_id)
+
+
+def legacy_extract(func, args, kwargs):
+    """旧实现的参数提取（每次调用执行）"""
+    db = None
+    current_user = None
+    request = None
+    sig = inspect.signature(func)
+    bound_args = sig.bind(*args, **kwargs)
+    bound_args.apply_defaults()
+    for param_name, param_value in bound_args.arguments.items():
+        if isinstance(param_value, Session):
+            db = param_value
+        elif isinstance(param_value, User):
+            current_user = param_value
+        elif isinstance(param_value, Request):
+            request = param_value
+    return db, current_user, request, bound_args.arguments
+
+
+def per_call_us(func, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+async def per_call_async_us(func, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        await func()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+class DiscardingWriter(AuditLogWriter):
+    """只统计批次、不写数据库的写入器"""
+
+    async def _write_batch(self, batch) -> None:
+        self.written += len(batch)
+        self.batches += 1
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="审计装饰器单次调用开销")
+    parser.add_argument("--calls", type=int, default=20000, help="每种情况的调用次数")
+    args = parser.parse_args()
+
+    user = User(id=1, phone="13800000000", full_name="基准", role="admin")
+    request = Request({"type": "http", "headers": [(b"user-agent", b"bench")], "client": ("127.0.0.1", 1)})
+    session = AsyncSession()
+    kwargs = {"sales_id": 7, "payload": {"amount": 1}, "db": session, "current_user": user, "request": request}
+
+    params = _AuditParams(handler)
+    legacy_us = per_call_us(lambda: legacy_extract(handler, (), kwargs), args.calls)
+    compiled_us = per_call_us(lambda: (params.resolve((), kwargs), params.arguments((), kwargs)), args.calls)
+
+    writer = DiscardingWriter(lambda: None, batch_size=500, flush_interval=0.05, max_queue_size=args.calls + 1)
+    # 装饰器和 AuditService.log_action 都改用这个写入器
+    audit_decorator.audit_log_writer = writer
+    audit_service.audit_log_writer = writer
+    writer.start()
+    decorated = audit_update(
+        AuditResourceType.SALES_RECORD,
+        get_resource_id=lambda result: result.id,
+        get_details=lambda arguments, result: {"sales_id": arguments["sales_id"]},
+    )(handler)
+    plain_us = await per_call_async_us(lambda: handler(**kwargs), args.calls)
+    decorated_us = await per_call_async_us(lambda: decorated(**kwargs), args.calls)
+    await writer.stop()
+
+    print_table(
+        ["case", "us_per_call"],
+        [
+            ["legacy extract (signature + bind + scan)", legacy_us],
+            ["precompiled extract", compiled_us],
+            ["decorated call overhead (deferred)", decorated_us - plain_us],
+        ],
+    )
+    print(f"audit events queued: {writer.written}, batches: {writer.batches}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,141 @@
+"""
+基准测试公共工具
+
+所有基准测试都在独立的 schema（默认 bench）中建表、造数，不会触碰业务表。
+数据库连接优先取环境变量 BENCH_DATABASE_URL，未设置时使用 settings.DATABASE_URL。
+
+运行方式（在项目根目录）：
+    python -m scripts.benchmarks.<脚本名> --help
+"""
+import os
+import statistics
+import time
+from typing import Awaitable, Callable, Dict, List
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.core.config import settings
+from app.db.base_class import Base
+import app.models  # noqa: F401  注册所有模型到 Base.metadata
+
+DEFAULT_SCHEMA = "bench"
+
+
+def bench_database_url(async_driver: bool = False) -> str:
+    """获取基准测试使用的数据库URL
+
+    Args:
+        async_driver: True返回asyncpg驱动的URL，False返回psycopg2驱动的URL
+    """
+    url = os.getenv("BENCH_DATABASE_URL", settings.DATABASE_URL)
+    url = url.replace("postgresql+asyncpg://", "postgresql://").replace("postgresql+psycopg2://", "postgresql://")
+    driver = "asyncpg" if async_driver else "psycopg2"
+    return url.replace("postgresql://", f"postgresql+{driver}://", 1)
+
+
+def create_bench_engine(schema: str = DEFAULT_SCHEMA) -> Engine:
+    """创建同步引擎，search_path 指向基准测试 schema"""
+    return create_engine(
+        bench_database_url(),
+        connect_args={"options": f"-csearch_path={schema},public"},
+    )
+
+
+def create_bench_async_engine(schema: str = DEFAULT_SCHEMA) -> AsyncEngine:
+    """创建异步引擎，search_path 指向基准测试 schema"""
+    return create_async_engine(
+        bench_database_url(async_driver=True),
+        connect_args={"server_settings": {"search_path": f"{schema},public", "timezone": "UTC"}},
+    )
+
+
+def reset_schema(engine: Engine, schema: str = DEFAULT_SCHEMA) -> None:
+    """删除并重建基准测试 schema，然后按当前模型建表"""
+    with engine.begin() as conn:
+        # 模型上的三元组索引依赖pg_trgm，扩展放在public下供所有schema使用
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA public"))
+        conn.execute(text(f'DROP SCHEMA IF EXISTS "{schema}" CASCADE'))
+        conn.execute(text(f'CREATE SCHEMA "{schema}"'))
+        Base.metadata.create_all(conn)
+
+
+def drop_schema(engine: Engine, schema: str = DEFAULT_SCHEMA) -> None:
+    """删除基准测试 schema"""
+    with engine.begin() as conn:
+        conn.execute(text(f'DROP SCHEMA IF EXISTS "{schema}" CASCADE'))
+
+
+class QueryCounter:
+    """统计引擎上执行的语句数和返回的行数"""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.statements = 0
+        self.rows = 0
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements += 1
+        if cursor.description is not None and cursor.rowcount > 0:
+            self.rows += cursor.rowcount
+
+    def reset(self) -> None:
+        self.statements = 0
+        self.rows = 0
+
+    def __enter__(self) -> "QueryCounter":
+        self.reset()
+        event.listen(self.engine, "after_cursor_execute", self._after_cursor_execute)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        event.remove(self.engine, "after_cursor_execute", self._after_cursor_execute)
+
+
+def measure(func: Callable[[], object], repeat: int = 5, warmup: int = 1) -> List[float]:
+    """重复执行函数并返回每次的耗时（秒）"""
+    for _ in range(warmup):
+        func()
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+async def measure_async(func: Callable[[], Awaitable[object]], repeat: int = 5, warmup: int = 1) -> List[float]:
+    """重复执行协程函数并返回每次的耗时（秒）"""
+    for _ in range(warmup):
+        await func()
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await func()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def summarize(durations: List[float]) -> Dict[str, float]:
+    """计算耗时统计（毫秒）"""
+    ordered = sorted(durations)
+    p99_index = max(0, int(round(len(ordered) * 0.99)) - 1)
+    return {
+        "min_ms": ordered[0] * 1000,
+        "p50_ms": statistics.median(ordered) * 1000,
+        "p99_ms": ordered[p99_index] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def print_table(headers: List[str], rows: List[List[object]]) -> None:
+    """以对齐的文本表格输出结果"""
+    cells = [[str(h) for h in headers]] + [
+        [f"{v:.2f}" if isinstance(v, float) else str(v) for v in row] for row in rows
+    ]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(headers))]
+    for index, row in enumerate(cells):
+        print("  ".join(value.rjust(widths[i]) for i, value in enumerate(row)))
+        if index == 0:
+            print("  ".join("-" * w for w in widths))
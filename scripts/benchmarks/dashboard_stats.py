@@ -0,0 +1,168 @@
+"""
+仪表盘统计基准测试
+
+对比旧实现（每个阶段/来源各一条 count 查询，共10次往返）和
+StatsService 的单条 FILTER 聚合查询（读取销售日汇总表），并校验两者结果一致。
+汇总表在造数后通过 SalesRollupService.rebuild 生成。
+
+示例：
+    python -m scripts.benchmarks.dashboard_stats --rows 200000
+"""
+import argparse
+import asyncio
+import math
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.models.sales_record import OrderSource, OrderStage, SalesRecord
+from app.schemas.stats import DashboardStats
+from app.services.sales_rollup_service import SalesRollupService
+from app.services.stats_service import StatsService, current_month_range
+from scripts.benchmarks.common import (
+    QueryCounter,
+    create_bench_async_engine,
+    create_bench_engine,
+    drop_schema,
+    measure_async,
+    print_table,
+    reset_schema,
+    summarize,
+)
+
+SEED_SQL = """
+INSERT INTO "user" (id, phone, email, password_hash, full_name, role, function, is_active, is_superuser, created_at, updated_at)
+SELECT u, '138' || lpad(u::text, 8, '0'), 'bench' || u || '@example.com', 'x', '用户' || u,
+       'normal', 'sales', true, u = 1, now(), now()
+FROM generate_series(1, 20) AS u;
+
+INSERT INTO salesrecord (
+    order_number, user_id, order_type, order_source, product_name, quantity, unit_price, total_price,
+    exchange_rate, factory_price, refund_amount, tax_refund, profit, stage, is_voided, created_at, updated_at
+)
+SELECT
+    'BENCH' || lpad(g::text, 9, '0'),
+    1 + g % 20,
+    (ARRAY['overseas', 'domestic'])[1 + g % 2],
+    (ARRAY['alibaba', 'domestic', 'exhibition'])[1 + g % 3],
+    '锻造轮毂',
+    1 + g % 8,
+    100 + g % 500,
+    (100 + g % 500) * (1 + g % 8),
+    7.1, 0, 0, 0, 0,
+    (ARRAY['stage_1', 'stage_2', 'stage_3', 'stage_4', 'stage_5'])[1 + g % 5],
+    g % 50 = 0,
+    now() - ((g % 730) || ' days')::interval,
+    now()
+FROM generate_series(1, :rows) AS g;
+"""
+
+
+async def legacy_dashboard_stats(db, current_user) -> DashboardStats:
+    """旧实现：逐个阶段/来源查询（逻辑与改造前的 get_dashboard_stats 相同）"""
+    first_day, next_month = current_month_range()
+    base_query = select(func.count(SalesRecord.id)).where(SalesRecord.is_voided == False)
+
+    stage_counts = {}
+    for stage in OrderStage:
+        result = await db.execute(base_query.where(SalesRecord.stage == stage.value))
+        stage_counts[stage.value] = result.scalar() or 0
+
+    source_counts = {}
+    for source in OrderSource:
+        result = await db.execute(base_query.where(SalesRecord.order_source == source.value))
+        source_counts[source.value] = result.scalar() or 0
+
+    total_orders = (await db.execute(base_query)).scalar() or 0
+
+    monthly_sales_query = select(func.sum(SalesRecord.total_price)).where(
+        SalesRecord.created_at >= first_day,
+        SalesRecord.created_at < next_month,
+        SalesRecord.stage == OrderStage.STAGE_5.value,
+        SalesRecord.is_voided == False
+    )
+    if not current_user.is_superuser:
+        monthly_sales_query = monthly_sales_query.where(SalesRecord.user_id == current_user.id)
+    total_sales = (await db.execute(monthly_sales_query)).scalar() or 0.0
+
+    return DashboardStats(
+        total_sales=float(total_sales),
+        total_orders=total_orders,
+        stage_1_orders=stage_counts[OrderStage.STAGE_1.value],
+        stage_2_orders=stage_counts[OrderStage.STAGE_2.value],
+        stage_3_orders=stage_counts[OrderStage.STAGE_3.value],
+        stage_4_orders=stage_counts[OrderStage.STAGE_4.value],
+        stage_5_orders=stage_counts[OrderStage.STAGE_5.value],
+        alibaba_orders=source_counts[OrderSource.ALIBABA.value],
+        domestic_orders=source_counts[OrderSource.DOMESTIC.value],
+        exhibition_orders=source_counts[OrderSource.EXHIBITION.value],
+        pending_logistics_review=stage_counts[OrderStage.STAGE_2.value],
+        pending_final_review=stage_counts[OrderStage.STAGE_4.value],
+        completed_orders=stage_counts[OrderStage.STAGE_5.value]
+    )
+
+
+async def run(args) -> None:
+    engine = create_bench_async_engine()
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    users = {
+        "superuser": SimpleNamespace(id=1, is_superuser=True),
+        "normal": SimpleNamespace(id=2, is_superuser=False),
+    }
+    implementations = {
+        "legacy": legacy_dashboard_stats,
+        "single_query": StatsService.get_dashboard_stats,
+    }
+
+    rows = []
+    try:
+        async with session_factory() as db:
+            async with db.begin():
+                rollup_rows = await SalesRollupService.rebuild(db)
+            print(f"汇总表 {rollup_rows} 行\n")
+            for user_label, user in users.items():
+                results = {}
+                for impl_label, impl in implementations.items():
+                    with QueryCounter(engine.sync_engine) as counter:
+                        results[impl_label] = await impl(db, user)
+                    durations = await measure_async(lambda: impl(db, user), repeat=args.repeat)
+                    stats = summarize(durations)
+                    rows.append([impl_label, user_label, counter.statements, stats["p50_ms"], stats["p99_ms"]])
+                legacy, current = results["legacy"], results["single_query"]
+                # 汇总表金额按行四舍五入到分，销售额允许有浮点误差
+                if (legacy.model_dump(exclude={"total_sales"}) != current.model_dump(exclude={"total_sales"})
+                        or not math.isclose(legacy.total_sales, current.total_sales, rel_tol=1e-6, abs_tol=0.01)):
+                    raise AssertionError(f"结果不一致（{user_label}）: {results}")
+    finally:
+        await engine.dispose()
+
+    print_table(["implementation", "user", "statements", "p50_ms", "p99_ms"], rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--keep", action="store_true", help="保留测试schema")
+    args = parser.parse_args()
+
+    sync_engine = create_bench_engine()
+    reset_schema(sync_engine)
+    try:
+        with sync_engine.begin() as conn:
+            for statement in SEED_SQL.split(";"):
+                if statement.strip():
+                    conn.execute(text(statement), {"rows": args.rows})
+            conn.execute(text("ANALYZE salesrecord"))
+        print(f"造数 {args.rows} 行，统计时间 {datetime.now(timezone.utc):%Y-%m-%d %H:%M} UTC\n")
+        asyncio.run(run(args))
+    finally:
+        if not args.keep:
+            drop_schema(sync_engine)
+        sync_engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
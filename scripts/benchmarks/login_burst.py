@@ -0,0 +1,118 @@
+"""
+登录突发负载测试
+
+对正在运行的服务发压：先在无登录负载时持续请求 GET /sales 作为基线，
+再在同一时间段内并发发起一批登录请求（每次登录都要做一次bcrypt校验），
+对比两个阶段 /sales 的延迟分布。密码哈希在事件循环中同步执行时，
+登录会阻塞同一进程的其他请求，/sales 的p99会随登录数量明显上升。
+
+与其他基准测试不同，这里直接访问 HTTP 服务，不使用 bench schema。
+账号需要事先存在；使用超级管理员账号时会在结束后输出 /stats/runtime 中的线程池指标。
+对比同步执行的效果可以用 PASSWORD_HASH_WORKERS=0 启动服务后再运行一次。
+
+示例：
+    uvicorn app.main:app --port 8000
+    python -m scripts.benchmarks.login_burst --base-url http://127.0.0.1:8000 \\
+        --phone 13800000000 --password admin123 --logins 200
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+import httpx
+
+from app.core.config import settings
+from scripts.benchmarks.common import print_table, summarize
+
+
+async def login(client: httpx.AsyncClient, phone: str, password: str) -> str:
+    """登录并返回访问令牌"""
+    response = await client.post(
+        f"{settings.API_V1_PREFIX}/auth/login",
+        data={"username": phone, "password": password},
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def poll_sales(client: httpx.AsyncClient, token: str, stop: asyncio.Event, durations: List[float]) -> None:
+    """持续请求 /sales 直到 stop 被设置，记录每次耗时"""
+    headers = {"Authorization": f"Bearer {token}"}
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get(f"{settings.API_V1_PREFIX}/sales", params={"limit": 20}, headers=headers)
+        response.raise_for_status()
+        durations.append(time.perf_counter() - start)
+
+
+async def measure_phase(client: httpx.AsyncClient, token: str, args, burst: bool) -> List[object]:
+    """运行一个阶段，返回结果表中的一行"""
+    stop = asyncio.Event()
+    durations: List[float] = []
+    pollers = [
+        asyncio.create_task(poll_sales(client, token, stop, durations))
+        for _ in range(args.readers)
+    ]
+
+    login_seconds = 0.0
+    if burst:
+        semaphore = asyncio.Semaphore(args.login_concurrency)
+
+        async def one_login():
+            async with semaphore:
+                await login(client, args.phone, args.password)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one_login() for _ in range(args.logins)))
+        login_seconds = time.perf_counter() - start
+    else:
+        await asyncio.sleep(args.baseline_seconds)
+
+    stop.set()
+    await asyncio.gather(*pollers)
+    stats = summarize(durations)
+    logins_per_second = args.logins / login_seconds if burst else 0.0
+    return [
+        "login_burst" if burst else "baseline",
+        len(durations),
+        stats["p50_ms"],
+        stats["p99_ms"],
+        stats["max_ms"],
+        logins_per_second,
+    ]
+
+
+async def run(args) -> None:
+    limits = httpx.Limits(max_connections=args.readers + args.login_concurrency + 1)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits) as client:
+        token = await login(client, args.phone, args.password)
+        rows = [
+            await measure_phase(client, token, args, burst=False),
+            await measure_phase(client, token, args, burst=True),
+        ]
+        print_table(["phase", "sales_requests", "p50_ms", "p99_ms", "max_ms", "logins_per_s"], rows)
+
+        response = await client.get(
+            f"{settings.API_V1_PREFIX}/stats/runtime",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        if response.status_code == 200:
+            print(f"\n密码哈希线程池: {response.json()['password_hash_pool']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--phone", required=True, help="登录手机号")
+    parser.add_argument("--password", required=True, help="登录密码")
+    parser.add_argument("--logins", type=int, default=200, help="突发阶段的登录次数")
+    parser.add_argument("--login-concurrency", type=int, default=20, help="同时进行的登录请求数")
+    parser.add_argument("--readers", type=int, default=4, help="持续请求 /sales 的并发数")
+    parser.add_argument("--baseline-seconds", type=float, default=5.0, help="基线阶段时长")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
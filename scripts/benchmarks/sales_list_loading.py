@@ -0,0 +1,125 @@
+"""
+销售记录列表加载策略基准测试
+
+对比两种预加载方式在“每个订单带大量附件/运费/采购”时的表现：
+- joined:   六个关系全部 joinedload（旧实现，三个集合JOIN后产生笛卡尔积）
+- selectin: 多对一 joinedload + 集合 selectinload（当前实现 SALES_RECORD_LOAD_OPTIONS）
+
+输出每页取回的行数、执行的语句数和耗时。
+
+示例：
+    python -m scripts.benchmarks.sales_list_loading --orders 2000 --attachments 20 --fees 10 --procurements 10
+"""
+import argparse
+from datetime import datetime, timezone
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session, joinedload
+
+from app.api.v1.sales import SALES_RECORD_LOAD_OPTIONS
+from app.models import Attachment, Procurement, SalesRecord, ShippingFees, User
+from scripts.benchmarks.common import (
+    QueryCounter,
+    create_bench_engine,
+    drop_schema,
+    measure,
+    print_table,
+    reset_schema,
+    summarize,
+)
+
+JOINED_LOAD_OPTIONS = (
+    joinedload(SalesRecord.user),
+    joinedload(SalesRecord.logistics_approved_by),
+    joinedload(SalesRecord.final_approved_by),
+    joinedload(SalesRecord.attachments),
+    joinedload(SalesRecord.shipping_fees),
+    joinedload(SalesRecord.procurement),
+)
+
+
+def seed(engine, orders: int, attachments: int, fees: int, procurements: int) -> None:
+    """写入测试数据"""
+    now = datetime.now(timezone.utc)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{
+            "id": 1, "phone": "13800000000", "email": "bench@example.com", "password_hash": "x",
+            "full_name": "基准测试用户", "role": "admin", "function": "sales_logistics",
+            "is_active": True, "is_superuser": True, "created_at": now, "updated_at": now,
+        }])
+        conn.execute(insert(SalesRecord), [{
+            "id": i, "order_number": f"BENCH{i:08d}", "user_id": 1, "order_type": "overseas",
+            "order_source": "alibaba", "product_name": f"锻造轮 {i}", "quantity": 4, "unit_price": 100.0,
+            "total_price": 400.0, "exchange_rate": 7.1, "factory_price": 1000.0, "refund_amount": 0.0,
+            "tax_refund": 0.0, "profit": 0.0, "stage": "stage_3", "is_voided": False,
+            "created_at": now, "updated_at": now,
+        } for i in range(1, orders + 1)])
+        conn.execute(insert(Attachment), [{
+            "sales_record_id": i, "attachment_type": "sales", "original_filename": f"scan_{j}.pdf",
+            "stored_filename": f"{i:016x}{j:016x}.pdf", "file_size": 1024, "content_type": "application/pdf",
+            "file_md5": f"{i:016x}{j:016x}", "created_at": now, "updated_at": now,
+        } for i in range(1, orders + 1) for j in range(attachments)])
+        conn.execute(insert(ShippingFees), [{
+            "sales_record_id": i, "shipping_fee": 50.0, "logistics_type": "domestic_express",
+            "payment_method": "月结", "logistics_company": "顺丰", "is_voided": False,
+            "created_at": now, "updated_at": now,
+        } for i in range(1, orders + 1) for _ in range(fees)])
+        conn.execute(insert(Procurement), [{
+            "sales_record_id": i, "supplier": "供应商", "procurement_item": "轮毂", "quantity": 1,
+            "amount": 200.0, "payment_method": "转账", "is_voided": False,
+            "created_at": now, "updated_at": now,
+        } for i in range(1, orders + 1) for _ in range(procurements)])
+
+
+def load_page(engine, options, offset: int, limit: int) -> int:
+    """按列表接口的方式查询一页，返回订单数"""
+    with Session(engine) as session:
+        query = (
+            select(SalesRecord)
+            .options(*options)
+            .order_by(SalesRecord.id.desc())
+            .offset(offset)
+            .limit(limit)
+        )
+        records = session.execute(query).unique().scalars().all()
+        # 访问集合，确保所有数据都已加载
+        for record in records:
+            len(record.attachments) + len(record.shipping_fees) + len(record.procurement)
+        return len(records)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--attachments", type=int, default=20)
+    parser.add_argument("--fees", type=int, default=10)
+    parser.add_argument("--procurements", type=int, default=10)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="保留测试schema")
+    args = parser.parse_args()
+
+    engine = create_bench_engine()
+    reset_schema(engine)
+    try:
+        seed(engine, args.orders, args.attachments, args.fees, args.procurements)
+        print(f"订单 {args.orders}，每单附件 {args.attachments} / 运费 {args.fees} / 采购 {args.procurements}，每页 {args.page_size} 条\n")
+
+        rows = []
+        for name, options in (("joined", JOINED_LOAD_OPTIONS), ("selectin", SALES_RECORD_LOAD_OPTIONS)):
+            for offset in (0, args.orders // 2):
+                with QueryCounter(engine) as counter:
+                    load_page(engine, options, offset, args.page_size)
+                durations = measure(lambda: load_page(engine, options, offset, args.page_size), repeat=args.repeat)
+                stats = summarize(durations)
+                rows.append([name, offset, counter.statements, counter.rows, stats["p50_ms"], stats["max_ms"]])
+
+        print_table(["strategy", "offset", "statements", "rows_fetched", "p50_ms", "max_ms"], rows)
+    finally:
+        if not args.keep:
+            drop_schema(engine)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
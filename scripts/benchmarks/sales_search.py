@@ -0,0 +1,184 @@
+"""
+销售记录搜索基准测试（pg_trgm 三元组索引）
+
+在百万级销售记录上对比订单编号/产品名称子串搜索在有无 GIN 三元组索引时的耗时，
+并测试相似度搜索（word_similarity）模式。
+
+注意：
+- 三元组按“字符”切分，中文同样适用，但要求数据库的 LC_CTYPE 能把汉字识别为字母
+  （如 en_US.UTF-8 / zh_CN.UTF-8）。LC_CTYPE=C 时汉字不产生三元组，索引对中文无效。
+- 少于3个字符的搜索词（例如“轮毂”）提取不出完整的三元组，索引帮不上忙，会退化为全表扫描。
+
+示例：
+    python -m scripts.benchmarks.sales_search --rows 1000000
+"""
+import argparse
+import json
+import time
+
+from sqlalchemy import func, literal, or_, select, text
+
+from app.models import SalesRecord
+from scripts.benchmarks.common import (
+    create_bench_engine,
+    drop_schema,
+    measure,
+    print_table,
+    reset_schema,
+    summarize,
+)
+
+TRGM_INDEXES = {
+    "ix_salesrecord_order_number_trgm": "order_number",
+    "ix_salesrecord_product_name_trgm": "product_name",
+}
+
+SEED_SQL = """
+INSERT INTO "user" (id, phone, email, password_hash, full_name, role, function, is_active, is_superuser, created_at, updated_at)
+VALUES (1, '13800000000', 'bench@example.com', 'x', '基准测试用户', 'admin', 'sales_logistics', true, true, now(), now());
+
+INSERT INTO salesrecord (
+    id, order_number, user_id, order_type, order_source, product_name, quantity, unit_price, total_price,
+    exchange_rate, factory_price, refund_amount, tax_refund, profit, stage, is_voided, created_at, updated_at
+)
+SELECT
+    g,
+    'ORD' || to_char(date '2022-01-01' + (g % 1200), 'YYYYMMDD') || lpad(g::text, 7, '0'),
+    1,
+    (ARRAY['overseas', 'domestic'])[1 + g % 2],
+    (ARRAY['alibaba', 'domestic', 'exhibition'])[1 + g % 3],
+    (ARRAY['锻造', '铸造', '旋压', '碳纤维', '铝合金', 'Forged', 'Cast', 'Flow Formed'])[1 + g % 8]
+        || (ARRAY['轮毂', '轮圈', '中心盖', '螺丝套装', ' Wheel', ' Rim', ' Hub Cap'])[1 + (g / 8) % 7]
+        || ' ' || (15 + g % 8)::text || (ARRAY['寸', ' inch'])[1 + (g / 56) % 2],
+    1 + g % 8,
+    100 + g % 500,
+    (100 + g % 500) * (1 + g % 8),
+    7.1, 0, 0, 0, 0,
+    (ARRAY['stage_1', 'stage_2', 'stage_3', 'stage_4', 'stage_5'])[1 + g % 5],
+    false,
+    now() - (g || ' minutes')::interval,
+    now()
+FROM generate_series(1, :rows) AS g;
+"""
+
+# (搜索词, 说明)
+SEARCH_TERMS = [
+    ("20230517", "订单编号片段"),
+    ("Flow Formed", "英文产品名"),
+    ("碳纤维轮毂", "中文产品名（>=3字）"),
+    ("轮毂", "中文产品名（2字，无法用三元组）"),
+    ("不存在的产品XYZ", "无匹配"),
+]
+
+SIMILARITY_TERMS = [
+    ("Flow Fromed", "英文拼写错误"),
+    ("碳纤维轮谷", "中文错别字"),
+]
+
+
+def contains_query(search: str, limit: int):
+    """与列表接口 contains 模式相同的查询"""
+    return (
+        select(SalesRecord.id)
+        .where(
+            or_(
+                SalesRecord.order_number.contains(search, autoescape=True),
+                SalesRecord.product_name.contains(search, autoescape=True),
+            )
+        )
+        .order_by(SalesRecord.id.desc())
+        .limit(limit + 1)
+    )
+
+
+def similarity_query(search: str, limit: int):
+    """与列表接口 similarity 模式相同的查询"""
+    return (
+        select(SalesRecord.id)
+        .where(
+            or_(
+                literal(search).op("<%")(SalesRecord.order_number),
+                literal(search).op("<%")(SalesRecord.product_name),
+            )
+        )
+        .order_by(
+            func.greatest(
+                func.word_similarity(search, SalesRecord.order_number),
+                func.word_similarity(search, SalesRecord.product_name),
+            ).desc(),
+            SalesRecord.id.desc(),
+        )
+        .limit(limit + 1)
+    )
+
+
+def uses_trgm_index(conn, query) -> bool:
+    """查看执行计划是否用到了三元组索引"""
+    compiled = query.compile(conn)
+    plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled.string}", compiled.params).scalar()
+    return any(name in json.dumps(plan) for name in TRGM_INDEXES)
+
+
+def run_queries(engine, build_query, terms, limit: int, repeat: int, phase: str):
+    rows = []
+    with engine.connect() as conn:
+        for term, label in terms:
+            query = build_query(term, limit)
+            matched = len(conn.execute(query).all())
+            durations = measure(lambda: conn.execute(query).all(), repeat=repeat)
+            stats = summarize(durations)
+            rows.append([phase, label, term, matched, "yes" if uses_trgm_index(conn, query) else "no",
+                         stats["p50_ms"], stats["p99_ms"]])
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="保留测试schema")
+    args = parser.parse_args()
+
+    engine = create_bench_engine()
+    reset_schema(engine)
+    try:
+        start = time.perf_counter()
+        with engine.begin() as conn:
+            # 先删掉三元组索引，造数后再建，顺便测量建索引耗时
+            for name in TRGM_INDEXES:
+                conn.execute(text(f'DROP INDEX "{name}"'))
+            for statement in SEED_SQL.split(";"):
+                if statement.strip():
+                    conn.execute(text(statement), {"rows": args.rows})
+            conn.execute(text("ANALYZE salesrecord"))
+        print(f"造数 {args.rows} 行，耗时 {time.perf_counter() - start:.1f}s")
+        with engine.connect() as conn:
+            print("LC_CTYPE:", conn.execute(text("SELECT datctype FROM pg_database WHERE datname = current_database()")).scalar())
+
+        results = run_queries(engine, contains_query, SEARCH_TERMS, args.page_size, args.repeat, "no-index")
+
+        start = time.perf_counter()
+        with engine.begin() as conn:
+            for name, column in TRGM_INDEXES.items():
+                conn.execute(text(f'CREATE INDEX "{name}" ON salesrecord USING gin ({column} gin_trgm_ops)'))
+            conn.execute(text("ANALYZE salesrecord"))
+        print(f"建立三元组索引耗时 {time.perf_counter() - start:.1f}s")
+        with engine.connect() as conn:
+            for name in TRGM_INDEXES:
+                size = conn.execute(text("SELECT pg_size_pretty(pg_relation_size(CAST(:name AS regclass)))"), {"name": name}).scalar()
+                print(f"  {name}: {size}")
+        print()
+
+        results += run_queries(engine, contains_query, SEARCH_TERMS, args.page_size, args.repeat, "trgm")
+        results += run_queries(engine, similarity_query, SIMILARITY_TERMS, args.page_size, args.repeat, "similarity")
+
+        print_table(["phase", "case", "term", "rows", "trgm_index", "p50_ms", "p99_ms"], results)
+    finally:
+        if not args.keep:
+            drop_schema(engine)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
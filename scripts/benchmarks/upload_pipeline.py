@@ -0,0 +1,119 @@
+"""
+上传文件保存吞吐量
+
+模拟并发上传若干个相同大小的文件（默认10MB，内容各不相同），对比两种保存方式：
+- legacy：在事件循环中先完整读一遍算MD5，再回到开头用 shutil.copyfileobj 写盘
+- single_pass：上传接口使用的流程，FileHandler.stage_upload_file 在线程池中边读边算MD5写临时文件，
+  再由 LocalStorage.put_file 重命名到存储位置
+
+同时在事件循环上运行一个每10ms唤醒一次的计时任务，记录它的最大延迟，
+用来观察保存文件时事件循环被阻塞的程度（同一进程中其他请求的额外等待）。
+不需要数据库，文件写入临时目录，结束后删除。
+
+示例：
+    python -m scripts.benchmarks.upload_pipeline --size-mb 10 --uploads 32 --concurrency 8
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+
+from app.storage import LocalStorage
+from app.utils.file_handler import FileHandler
+from scripts.benchmarks.common import print_table
+
+
+def make_upload(size: int, index: int) -> UploadFile:
+    """构建与 multipart 解析结果相同的上传对象（超过1MB的内容落在磁盘临时文件中）"""
+    spooled = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    block = os.urandom(1024 * 1024)
+    remaining = size
+    spooled.write(index.to_bytes(8, "big"))
+    while remaining > 0:
+        spooled.write(block[:remaining])
+        remaining -= len(block)
+    spooled.seek(0)
+    return UploadFile(spooled, size=size + 8, filename=f"upload_{index}.bin",
+                      headers=Headers({"content-type": "application/octet-stream"}))
+
+
+async def legacy_save(handler: FileHandler, upload_file: UploadFile):
+    """旧实现：两次读取，同步I/O在事件循环中执行"""
+    md5_hash = hashlib.md5()
+    upload_file.file.seek(0)
+    for chunk in iter(lambda: upload_file.file.read(8192), b""):
+        md5_hash.update(chunk)
+    upload_file.file.seek(0)
+    stored_filename = handler.generate_stored_filename(upload_file.filename, md5_hash.hexdigest())
+    file_path = handler.upload_dir / stored_filename
+    with open(file_path, "wb") as buffer:
+        shutil.copyfileobj(upload_file.file, buffer)
+    return md5_hash.hexdigest(), stored_filename, file_path.stat().st_size
+
+
+async def watch_loop_lag(stop: asyncio.Event, lags: List[float], interval: float = 0.01) -> None:
+    """记录计时任务实际唤醒时间与预期时间的差"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, loop.time() - expected))
+
+
+async def run_case(name: str, save, uploads: List[UploadFile], concurrency: int, upload_dir: Path) -> List[object]:
+    handler = FileHandler(str(upload_dir))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def save_one(upload_file: UploadFile) -> None:
+        async with semaphore:
+            await save(handler, upload_file)
+
+    stop = asyncio.Event()
+    lags: List[float] = []
+    watcher = asyncio.create_task(watch_loop_lag(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*(save_one(upload_file) for upload_file in uploads))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await watcher
+
+    total_mb = sum(upload_file.size for upload_file in uploads) / (1024 * 1024)
+    return [name, len(uploads), total_mb / elapsed, max(lags, default=0.0) * 1000]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="上传文件保存吞吐量")
+    parser.add_argument("--size-mb", type=int, default=10, help="每个文件的大小（MB）")
+    parser.add_argument("--uploads", type=int, default=32, help="上传文件数")
+    parser.add_argument("--concurrency", type=int, default=8, help="并发保存数")
+    args = parser.parse_args()
+
+    async def single_pass(handler: FileHandler, upload_file: UploadFile):
+        file_md5, tmp_path, file_size = await handler.stage_upload_file(
+            upload_file, max_size=(args.size_mb + 1) * 1024 * 1024
+        )
+        stored_filename = handler.generate_stored_filename(upload_file.filename, file_md5)
+        await LocalStorage(handler).put_file(tmp_path, stored_filename, upload_file.content_type, file_md5)
+        return file_md5, stored_filename, file_size
+
+    uploads = [make_upload(args.size_mb * 1024 * 1024, index) for index in range(args.uploads)]
+    rows = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for name, save in (("legacy", legacy_save), ("single_pass", single_pass)):
+            rows.append(await run_case(name, save, uploads, args.concurrency, Path(work_dir) / name))
+    for upload_file in uploads:
+        upload_file.file.close()
+
+    print_table(["implementation", "uploads", "mb_per_s", "max_loop_lag_ms"], rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
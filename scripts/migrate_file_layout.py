@@ -0,0 +1,58 @@
+"""
+附件文件迁移到分片目录布局
+
+把 files/ 下平铺存放的 {md5}{ext} 文件移动到 files/ab/cd/{md5}{ext}。
+迁移可以在服务运行时进行：下载、删除和上传同时识别两种布局，
+每个文件的移动是一次原子重命名，数据库中的 stored_filename 不需要修改。
+中断后重新运行即可从剩余的文件继续。
+
+    python -m scripts.migrate_file_layout --dry-run          # 只统计需要迁移的文件
+    python -m scripts.migrate_file_layout                    # 迁移全部文件
+    python -m scripts.migrate_file_layout --batch-size 500 --pause 0.5  # 每500个文件暂停0.5秒，降低磁盘压力
+"""
+import argparse
+import sys
+import time
+
+from app.utils.file_handler import file_handler
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="附件文件迁移到分片目录布局")
+    parser.add_argument("--dry-run", action="store_true", help="只统计，不移动文件")
+    parser.add_argument("--batch-size", type=int, default=1000, help="每批移动的文件数")
+    parser.add_argument("--pause", type=float, default=0.0, help="每批之间暂停的秒数")
+    args = parser.parse_args()
+
+    moved = 0
+    duplicates = 0
+    failed = 0
+    # 先取出文件名列表，避免边遍历边修改目录
+    filenames = list(file_handler.iter_legacy_files())
+    print(f"平铺布局中共 {len(filenames)} 个文件")
+    if args.dry_run:
+        return 0
+
+    for index, stored_filename in enumerate(filenames, start=1):
+        try:
+            if file_handler.move_to_sharded(stored_filename):
+                moved += 1
+            else:
+                duplicates += 1
+        except FileNotFoundError:
+            # 迁移期间被删除的文件
+            continue
+        except OSError as e:
+            failed += 1
+            print(f"移动失败: {stored_filename}: {e}")
+        if index % args.batch_size == 0:
+            print(f"已处理 {index}/{len(filenames)}")
+            if args.pause > 0:
+                time.sleep(args.pause)
+
+    print(f"迁移完成 - 移动: {moved}, 已存在分片副本: {duplicates}, 失败: {failed}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+销售日汇总维护命令
+
+    python -m scripts.sales_rollup rebuild   # 根据销售记录全量重建汇总表
+    python -m scripts.sales_rollup check     # 校验汇总表与销售记录是否一致，不一致时退出码为1
+"""
+import argparse
+import asyncio
+import sys
+
+from app.db.session import db
+from app.services.sales_rollup_service import SalesRollupService
+
+
+async def rebuild() -> int:
+    async with db.session() as session:
+        async with session.begin():
+            count = await SalesRollupService.rebuild(session)
+    print(f"重建完成，共 {count} 行汇总数据")
+    return 0
+
+
+async def check(limit: int) -> int:
+    async with db.session() as session:
+        mismatches = await SalesRollupService.check(session)
+    if not mismatches:
+        print("汇总数据一致")
+        return 0
+
+    print(f"发现 {len(mismatches)} 个不一致的汇总键：")
+    for item in mismatches[:limit]:
+        print(f"  {item['key']}")
+        print(f"    期望: {item['expected']}")
+        print(f"    实际: {item['actual']}")
+    if len(mismatches) > limit:
+        print(f"  ... 另有 {len(mismatches) - limit} 项未显示")
+    print("可执行 `python -m scripts.sales_rollup rebuild` 重建")
+    return 1
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="销售日汇总维护")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("rebuild", help="全量重建汇总表")
+    check_parser = subparsers.add_parser("check", help="校验汇总表")
+    check_parser.add_argument("--limit", type=int, default=20, help="最多显示的不一致项数")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "rebuild":
+            return await rebuild()
+        return await check(args.limit)
+    finally:
+        await db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,80 @@
+"""
+附件存储垃圾回收和一致性检查
+
+    python -m scripts.storage_gc check                  # 只报告，有孤立文件、缺失文件或计数不一致时退出码为1
+    python -m scripts.storage_gc clean                  # 删除超过宽限期（默认24小时）的孤立文件、过期预览图和临时文件，修正引用计数
+    python -m scripts.storage_gc clean --grace-hours 72 --batch-size 5000
+
+服务运行期间可以执行。使用对象存储（STORAGE_BACKEND=s3）时，预览图和临时文件只清理当前节点本机的。
+"""
+import argparse
+import asyncio
+import sys
+
+from app.core.config import settings
+from app.db.session import db
+from app.services.storage_gc_service import StorageGCService
+from app.storage import storage
+from app.utils.file_handler import file_handler
+
+
+def format_size(size: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}TB"
+
+
+async def run(clean: bool, grace_hours: float, batch_size: int) -> int:
+    grace_seconds = grace_hours * 3600
+
+    # 先修正引用计数，之后删除附件时 purge_if_unreferenced 的判断才可靠
+    blobs = await StorageGCService.check_blob_counts(storage, repair=clean, batch_size=batch_size)
+    print(f"blob 表: {blobs['blobs']} 行，计数不一致 {blobs['mismatched']}，缺少 blob 行 {blobs['untracked']}，已修正 {blobs['repaired']}")
+
+    files = await StorageGCService.check_files(storage, delete=clean, grace_seconds=grace_seconds, batch_size=batch_size)
+    print(f"存储({storage.name}): {files['files']} 个文件 {format_size(files['bytes'])}，被引用 {files['referenced']} 个文件名")
+    print(f"孤立文件: {files['orphans']} 个 {format_size(files['orphan_bytes'])}，"
+          f"宽限期内 {files['orphans_in_grace']}，已删除 {files['orphans_deleted']}")
+    print(f"缺失文件: {files['missing']} 个")
+    for name in files["missing_samples"]:
+        print(f"  {name}")
+
+    previews = await StorageGCService.check_previews(
+        file_handler, settings.PREVIEW_MAX_SIZE, delete=clean, grace_seconds=grace_seconds, batch_size=batch_size
+    )
+    print(f"预览图: {previews['previews']} 个，过期 {previews['stale']}，已删除 {previews['stale_deleted']}")
+    if previews["strays"]:
+        print(f"分片目录中的残留文件: {previews['strays']} 个，已删除 {previews['strays_deleted']}")
+
+    tmp = StorageGCService.clean_tmp_files(file_handler, delete=clean, grace_seconds=grace_seconds)
+    print(f"临时文件: {tmp['tmp_files']} 个 {format_size(tmp['tmp_bytes'])}，已删除 {tmp['tmp_deleted']}")
+
+    if storage.name == "local":
+        legacy = StorageGCService.count_legacy_files(file_handler)
+        if legacy:
+            print(f"平铺布局中还有 {legacy} 个文件未参与检查，可执行 `python -m scripts.migrate_file_layout` 迁移")
+
+    if clean:
+        return 0
+    inconsistent = blobs["mismatched"] + blobs["untracked"] + files["orphans"] + files["missing"]
+    return 1 if inconsistent else 0
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="附件存储垃圾回收和一致性检查")
+    parser.add_argument("command", choices=["check", "clean"], help="check: 只报告；clean: 删除并修正")
+    parser.add_argument("--grace-hours", type=float, default=24, help="修改时间在此范围内的文件不删除")
+    parser.add_argument("--batch-size", type=int, default=1000, help="每批读取的文件名数")
+    args = parser.parse_args()
+
+    try:
+        return await run(args.command == "clean", args.grace_hours, args.batch_size)
+    finally:
+        await storage.close()
+        await db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -357,6 +357,10 @@ class AttachmentsManager {
                     <div class="card-body d-flex align-items-center p-3">
                         <div class="d-flex align-items-center flex-grow-1">
                             <i class="${fileIcon} me-3 text-primary fs-4"></i>
+                            ${this.canPreview(attachment.content_type) ? `
+                            <img class="attachment-preview rounded border me-3 d-none" data-id="${attachment.id}"
+                                 alt="${attachment.original_filename}" style="width: 48px; height: 48px; object-fit: cover;">
+                            ` : ''}
                             <div class="flex-grow-1">
                                 <div class="fw-bold text-truncate mb-1" title="${attachment.original_filename}">
                                     ${attachment.original_filename}
@@ -394,9 +398,37 @@ class AttachmentsManager {
             `;
             
             container.appendChild(attachmentCard);
+            this.loadPreview(attachmentCard);
         });
     }
 
+    // 是否可以显示预览图（图片和PDF）
+    canPreview(contentType) {
+        return ['image/jpeg', 'image/png', 'image/gif', 'image/webp', 'application/pdf'].includes(contentType);
+    }
+
+    // 加载预览图（预览接口需要认证，通过fetch获取后显示；浏览器按ETag缓存），失败时保留文件图标
+    async loadPreview(attachmentCard) {
+        const img = attachmentCard.querySelector('.attachment-preview');
+        if (!img) return;
+        try {
+            const response = await fetch(`/api/v1/attachments/preview/${img.dataset.id}`, {
+                headers: {
+                    'Authorization': `Bearer ${getToken()}`
+                }
+            });
+            if (!response.ok) return;
+            const blob = await response.blob();
+            img.onload = () => URL.revokeObjectURL(img.src);
+            img.src = URL.createObjectURL(blob);
+            img.classList.remove('d-none');
+            const icon = img.previousElementSibling;
+            if (icon) icon.classList.add('d-none');
+        } catch (error) {
+            console.warn('加载预览图失败:', error);
+        }
+    }
+
     // 上传新附件（详情模态框）
     async uploadNewAttachments() {
         const fileInput = document.getElementById('new-attachments');
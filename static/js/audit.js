@@ -116,13 +116,15 @@ async function loadAuditLogs() {
         // 分页参数
         params.append('page', currentPage);
         params.append('size', pageSize);
+        // 记录数超过上限时使用估算总数，避免每次翻页都精确计数
+        params.append('total_mode', 'estimated');
         
         // 发送请求
         const response = await apiRequest(`/audit-logs?${params.toString()}`);
         
         if (response.success) {
             renderAuditTable(response.data.items);
-            renderPagination(response.data.total, response.data.page, response.data.pages);
+            renderPagination(response.data.total, response.data.page, response.data.pages, response.data.total_is_estimate);
         } else {
             showToast('error', response.message || '加载审计记录失败');
         }
@@ -247,7 +249,7 @@ function getActionBadgeClass(action) {
 }
 
 // 渲染分页
-function renderPagination(total, page, pages) {
+function renderPagination(total, page, pages, totalIsEstimate = false) {
     totalPages = pages;
     const container = document.getElementById('pagination-container');
     
@@ -259,7 +261,7 @@ function renderPagination(total, page, pages) {
     let paginationHtml = `
         <div class="d-flex justify-content-between align-items-center">
             <div class="text-muted">
-                共 ${total} 条记录，第 ${page} 页，共 ${pages} 页
+                ${totalIsEstimate ? '约' : '共'} ${total} 条记录，第 ${page} 页，${totalIsEstimate ? '约' : '共'} ${pages} 页
             </div>
             <ul class="pagination mb-0">
     `;
@@ -178,7 +178,7 @@ function updateSourceChart(stats) {
 async function loadRecentOrders() {
   try {
     // 获取最近10条订单
-    const orders = await apiRequest('/sales?limit=10', { method: 'GET' });
+    const orders = await apiRequest('/sales?limit=10&view=summary', { method: 'GET' });
     if (!orders) return;
     
     // 渲染最近订单表格
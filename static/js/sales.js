@@ -159,7 +159,8 @@ async function loadSalesRecords() {
     // 构建查询参数
     const queryParams = new URLSearchParams({
       skip: (currentPage - 1) * pageSize,
-      limit: pageSize
+      limit: pageSize,
+      view: 'summary'
     });
     
     if (currentStageFilter) {
@@ -285,7 +286,9 @@ function renderSalesTable(sales) {
     };
     
     // 附件数量显示
-    const attachmentCount = sale.attachments ? sale.attachments.length : 0;
+    const attachmentCount = sale.attachments_count !== undefined
+      ? sale.attachments_count
+      : (sale.attachments ? sale.attachments.length : 0);
     const attachmentBadge = attachmentCount > 0 
       ? `<span class="badge bg-primary">${attachmentCount}</span>` 
       : '<span class="text-muted">-</span>';
@@ -313,7 +316,7 @@ function renderSalesTable(sales) {
       <td>${currencySymbol}${sale.total_price ? sale.total_price.toFixed(2) : '0.00'}</td>
       <td><span class="${stageClass}">${stageText}</span></td>
       <td class="text-center">${attachmentBadge}</td>
-      <td>${sale.user ? sale.user.full_name : '-'}</td>
+      <td>${sale.creator_name || (sale.user ? sale.user.full_name : '-')}</td>
       <td>${formatDateTime(sale.created_at)}</td>
       <td>
         <div class="d-flex align-items-center gap-1">
@@ -0,0 +1,169 @@
+import asyncio
+import hashlib
+import io
+from types import SimpleNamespace
+
+from fastapi import FastAPI, UploadFile
+from fastapi.responses import FileResponse
+from fastapi.testclient import TestClient
+from starlette.datastructures import Headers
+
+from app.api.v1 import attachments as attachments_api
+from app.api.v1.attachments import content_disposition, download_cache_headers, etag_matches
+from app.services.audit_service import parse_detail_filters
+from app.storage import LocalStorage
+from app.utils.file_handler import FileHandler
+
+ATTACHMENT = SimpleNamespace(file_md5="0123456789abcdef0123456789abcdef")
+ETAG = '"0123456789abcdef0123456789abcdef"'
+
+
+def test_etag_matches_if_none_match_variants():
+    assert etag_matches(ETAG, ETAG)
+    assert etag_matches(f'"other", W/{ETAG}', ETAG)
+    assert etag_matches("*", ETAG)
+    assert not etag_matches('"other"', ETAG)
+    assert not etag_matches(None, ETAG)
+
+def test_download_headers():
+    headers = download_cache_headers(ATTACHMENT)
+    assert headers["ETag"] == ETAG
+    assert headers["Cache-Control"].startswith("private, max-age=") and headers["Cache-Control"].endswith("immutable")
+    assert content_disposition("report.pdf") == 'attachment; filename="report.pdf"'
+    assert content_disposition("合同.pdf") == "attachment; filename*=utf-8''%E5%90%88%E5%90%8C.pdf"
+
+def test_range_requests_use_md5_etag(tmp_path):
+    file_path = tmp_path / "file.txt"
+    file_path.write_bytes(b"0123456789")
+    app = FastAPI()
+
+    @app.get("/file")
+    async def get_file():
+        return FileResponse(file_path, filename="file.txt", headers=download_cache_headers(ATTACHMENT))
+
+    client = TestClient(app)
+    partial = client.get("/file", headers={"Range": "bytes=2-4", "If-Range": ETAG})
+    assert partial.status_code == 206 and partial.content == b"234"
+    assert partial.headers["etag"] == ETAG
+
+    stale = client.get("/file", headers={"Range": "bytes=2-4", "If-Range": '"stale"'})
+    assert stale.status_code == 200 and stale.content == b"0123456789"
+
+
+class FakeSession:
+    """只支持查询已有附件数（返回0）和添加记录"""
+
+    def __init__(self):
+        self.added = []
+
+    async def execute(self, query):
+        return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: []))
+
+    def add(self, instance):
+        self.added.append(instance)
+
+def test_upload_takes_file_locks_in_name_order(tmp_path, monkeypatch):
+    handler = FileHandler(str(tmp_path / "files"))
+    locked = []
+
+    async def add_reference(db, stored_filename, *args):
+        locked.append(stored_filename)
+        return 1
+
+    monkeypatch.setattr(attachments_api, "file_handler", handler)
+    monkeypatch.setattr(attachments_api, "storage", LocalStorage(handler))
+    monkeypatch.setattr(attachments_api.BlobService, "add_reference", add_reference)
+    contents = [b"second", b"first", b"third"]
+    files = [
+        UploadFile(io.BytesIO(content), filename=f"{index}.txt", headers=Headers({"content-type": "text/plain"}))
+        for index, content in enumerate(contents)
+    ]
+    session = FakeSession()
+
+    created = asyncio.run(attachments_api.validate_and_save_attachments(files, 1, "sales", session, user_id=1))
+
+    names = [f"{hashlib.md5(content).hexdigest()}.txt" for content in contents]
+    assert locked == sorted(names)
+    assert [attachment.stored_filename for attachment in created] == names
+    assert all(handler.file_exists(name) for name in names)
+    assert list(handler.tmp_dir.iterdir()) == []
+
+def test_upload_puts_files_before_taking_locks(tmp_path, monkeypatch):
+    handler = FileHandler(str(tmp_path / "files"))
+    local_storage = LocalStorage(handler)
+    name = f"{hashlib.md5(b'content').hexdigest()}.txt"
+    seen = []
+
+    async def add_reference(db, stored_filename, *args):
+        seen.append(handler.file_exists(stored_filename))
+        # 模拟放入存储后、加锁前被并发的清理删除
+        handler.delete_file(stored_filename)
+        return 1
+
+    monkeypatch.setattr(attachments_api, "file_handler", handler)
+    monkeypatch.setattr(attachments_api, "storage", local_storage)
+    monkeypatch.setattr(attachments_api.BlobService, "add_reference", add_reference)
+    files = [UploadFile(io.BytesIO(b"content"), filename="a.txt", headers=Headers({"content-type": "text/plain"}))]
+
+    asyncio.run(attachments_api.validate_and_save_attachments(files, 1, "sales", FakeSession(), user_id=1))
+
+    # 加锁登记引用时文件已在存储中；被删除后持锁重新写入
+    assert seen == [True]
+    assert handler.file_exists(name)
+    assert list(handler.tmp_dir.iterdir()) == []
+
+
+class UploadSession(FakeSession):
+    """上传接口使用：先查询销售记录，再查询已有附件"""
+
+    def __init__(self, sales_record):
+        super().__init__()
+        self.sales_record = sales_record
+
+    async def execute(self, query):
+        return SimpleNamespace(
+            scalar_one_or_none=lambda: self.sales_record,
+            scalars=lambda: SimpleNamespace(all=lambda: [])
+        )
+
+    async def commit(self):
+        for index, instance in enumerate(self.added, start=1):
+            instance.id = index
+
+    async def refresh(self, instance):
+        pass
+
+def test_upload_audit_can_be_found_by_detail_filters(tmp_path, monkeypatch):
+    handler = FileHandler(str(tmp_path / "files"))
+    logged = []
+
+    async def add_reference(db, stored_filename, *args):
+        return 1
+
+    async def log_action(**kwargs):
+        logged.append(kwargs)
+
+    monkeypatch.setattr(attachments_api, "file_handler", handler)
+    monkeypatch.setattr(attachments_api, "storage", LocalStorage(handler))
+    monkeypatch.setattr(attachments_api.BlobService, "add_reference", add_reference)
+    monkeypatch.setattr(attachments_api.AuditService, "log_action", log_action)
+    contents = [b"first", b"second"]
+    files = [
+        UploadFile(io.BytesIO(content), filename=f"{index}.txt", headers=Headers({"content-type": "text/plain"}))
+        for index, content in enumerate(contents)
+    ]
+    admin = SimpleNamespace(id=1, is_superuser=True, role="admin")
+
+    asyncio.run(attachments_api.upload_attachments(
+        7, "sales", files, UploadSession(SimpleNamespace(id=7)), admin, request=None
+    ))
+
+    def matching(detail):
+        # 与 details @> 过滤条件相同（过滤值都是标量）
+        filters = parse_detail_filters([detail])
+        return [entry for entry in logged if filters.items() <= entry["details"].items()]
+
+    for content in contents:
+        name = f"{hashlib.md5(content).hexdigest()}.txt"
+        assert len(matching(f"stored_filename={name}")) == 1
+    assert len(matching("sales_record_id=7")) == 2
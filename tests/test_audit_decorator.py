@@ -0,0 +1,74 @@
+import asyncio
+from typing import Annotated
+
+from fastapi import Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.dependencies import get_current_user, get_session
+from app.models.audit_log import AuditResourceType
+from app.models.user import User
+from app.services import audit_service
+from app.services.audit_writer import AuditLogWriter
+from app.utils import audit_decorator
+from app.utils.audit_decorator import _AuditParams, audit_update
+
+
+async def update_sales(
+    sales_id: int,
+    session: Annotated[AsyncSession, Depends(get_session)],
+    operator: Annotated[User, Depends(get_current_user)],
+    http_request: Request,
+    note: str = "默认"
+):
+    return {"id": sales_id}
+
+
+def test_params_are_resolved_by_annotation_once():
+    params = _AuditParams(update_sales)
+    session, user, request = AsyncSession(), User(id=1), Request({"type": "http", "headers": []})
+
+    assert params.resolve((5, session), {"operator": user, "http_request": request}) == (session, user, request)
+    assert params.arguments((5,), {"session": session}) == {"sales_id": 5, "session": session, "note": "默认"}
+
+def test_sync_session_annotation_is_not_used_as_db():
+    def handler(session: Session, current_user: User):
+        return None
+
+    params = _AuditParams(handler)
+    assert params.db is None
+    assert params.current_user.name == "current_user"
+
+def test_pep604_optional_annotations_are_resolved():
+    def handler(session: AsyncSession | None, operator: Annotated[User | None, Depends(get_current_user)]):
+        return None
+
+    params = _AuditParams(handler)
+    assert params.db.name == "session"
+    assert params.current_user.name == "operator"
+
+def test_deferred_audit_is_queued_without_session(monkeypatch):
+    batches = []
+
+    class RecordingWriter(AuditLogWriter):
+        async def _write_batch(self, batch):
+            batches.append(batch)
+
+    decorated = audit_update(
+        AuditResourceType.SALES_RECORD,
+        get_resource_id=lambda result: result["id"],
+        get_details=lambda arguments, result: {"note": arguments["note"]},
+    )(update_sales)
+
+    async def run():
+        writer = RecordingWriter(lambda: None, batch_size=10, flush_interval=60)
+        monkeypatch.setattr(audit_decorator, "audit_log_writer", writer)
+        monkeypatch.setattr(audit_service, "audit_log_writer", writer)
+        writer.start()
+        result = await decorated(sales_id=9, session=None, operator=User(id=3), http_request=None)
+        await writer.stop()
+        return result
+
+    assert asyncio.run(run()) == {"id": 9}
+    [[values]] = batches
+    assert (values["user_id"], values["resource_id"], values["details"]) == (3, 9, {"note": "默认"})
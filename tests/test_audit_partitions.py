@@ -0,0 +1,60 @@
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
+from app.models.audit_log import AuditLog
+from app.services.audit_partition_service import (
+    AuditPartitionService,
+    add_months,
+    month_of,
+    parse_partition_name,
+    partition_bounds,
+    partition_name,
+)
+
+
+def test_add_months_crosses_years():
+    assert add_months(date(2025, 11, 1), 3) == date(2026, 2, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+
+def test_month_of_uses_utc():
+    moment = datetime(2026, 3, 1, 2, 0, tzinfo=timezone(timedelta(hours=8)))
+    assert month_of(moment) == date(2026, 2, 1)
+
+def test_partition_name_round_trip():
+    assert partition_name(date(2026, 7, 1)) == "auditlog_p202607"
+    assert parse_partition_name("auditlog_p202607") == date(2026, 7, 1)
+    assert parse_partition_name("auditlog_default") is None
+
+def test_partition_bounds_are_half_open_utc_months():
+    start, end = partition_bounds(date(2025, 12, 1))
+    assert start == datetime(2025, 12, 1, tzinfo=timezone.utc)
+    assert end == datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+def test_auditlog_table_is_range_partitioned_by_created_at():
+    ddl = str(CreateTable(AuditLog.__table__).compile(dialect=postgresql.dialect()))
+    assert "PARTITION BY RANGE (created_at)" in ddl
+    assert "PRIMARY KEY (id, created_at)" in ddl
+
+
+class RecordingSession:
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        self.statements.append(str(statement))
+        return SimpleNamespace(rowcount=0)
+
+def test_create_partition_locks_default_partition_before_moving_rows():
+    session = RecordingSession()
+    asyncio.run(AuditPartitionService.create_partition(session, date(2026, 7, 1)))
+
+    statements = session.statements
+    lock_parent = statements.index("LOCK TABLE ONLY auditlog IN SHARE UPDATE EXCLUSIVE MODE")
+    lock_default = statements.index("LOCK TABLE auditlog_default IN ACCESS EXCLUSIVE MODE")
+    move = next(index for index, sql in enumerate(statements) if "DELETE FROM auditlog_default" in sql)
+    attach = next(index for index, sql in enumerate(statements) if "ATTACH PARTITION auditlog_p202607" in sql)
+    assert lock_parent < lock_default < move < attach
@@ -0,0 +1,193 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.schemas.audit_log import AuditLogQuery
+from app.services.audit_service import (
+    EXPORT_COLUMNS,
+    AuditService,
+    details_to_text,
+    encode_export_rows,
+    parse_detail_filters,
+)
+from app.utils.pagination import decode_cursor, encode_cursor
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def mappings(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = 0
+
+    async def execute(self, statement):
+        self.statements += 1
+        return FakeResult(self.rows)
+
+
+def stats_row(action=None, resource_type=None, day=None, total=0, successful=0, active_users=0):
+    return {
+        "action": action,
+        "resource_type": resource_type,
+        "day": day,
+        "g_action": 0 if action else 1,
+        "g_resource_type": 0 if resource_type else 1,
+        "g_day": 0 if day else 1,
+        "total": total,
+        "successful": successful,
+        "active_users": active_users,
+    }
+
+def test_audit_stats_query_uses_grouping_sets_and_filter():
+    sql = str(AuditService.build_audit_stats_query(
+        datetime(2026, 1, 1, tzinfo=timezone.utc), datetime(2026, 1, 31, tzinfo=timezone.utc)
+    ).compile(dialect=postgresql.dialect()))
+    assert "GROUPING SETS((), (auditlog.action), (auditlog.resource_type)" in sql
+    assert "FILTER (WHERE auditlog.success = true)" in sql
+
+def test_audit_stats_splits_grouping_sets_and_fills_missing_days():
+    session = FakeSession([
+        stats_row(total=5, successful=4, active_users=2),
+        stats_row(action="login", total=3, active_users=2),
+        stats_row(action="update", total=2, active_users=1),
+        stats_row(resource_type="user", total=5, active_users=2),
+        stats_row(day=date(2026, 1, 1), total=2, successful=2, active_users=1),
+        stats_row(day=date(2026, 1, 3), total=3, successful=2, active_users=2),
+    ])
+    stats = asyncio.run(AuditService.get_audit_stats(
+        session, datetime(2026, 1, 1, 8, tzinfo=timezone.utc), datetime(2026, 1, 3, 8, tzinfo=timezone.utc)
+    ))
+    assert session.statements == 1
+    assert stats["summary"] == {
+        "total_operations": 5,
+        "successful_operations": 4,
+        "failed_operations": 1,
+        "success_rate": 80.0,
+        "active_users": 2,
+    }
+    assert stats["action_stats"] == {"login": 3, "update": 2}
+    assert stats["resource_stats"] == {"user": 5}
+    assert [(d["date"], d["total"], d["failed"]) for d in stats["daily"]] == [
+        ("2026-01-01", 2, 0), ("2026-01-02", 0, 0), ("2026-01-03", 3, 1)
+    ]
+
+def test_audit_logs_rejects_invalid_cursor():
+    query = AuditLogQuery(cursor=encode_cursor({"id": 1}), total_mode="none")
+    with pytest.raises(ValueError):
+        asyncio.run(AuditService.get_audit_logs(FakeSession([]), query))
+
+def test_audit_logs_keyset_page_returns_next_cursor():
+    created_at = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    logs = [
+        SimpleNamespace(
+            id=10 - index, user_id=None, user=None, action="login", resource_type="user",
+            resource_id=None, description="登录", details=None, ip_address=None, user_agent=None,
+            success=True, error_message=None, created_at=created_at, updated_at=created_at
+        )
+        for index in range(3)
+    ]
+
+    class ScalarSession(FakeSession):
+        async def execute(self, statement):
+            self.statements += 1
+            self.statement = statement
+            return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: self.rows))
+
+    session = ScalarSession(logs)
+    query = AuditLogQuery(size=2, total_mode="none", cursor=encode_cursor({"created_at": created_at.isoformat(), "id": 11}))
+    result = asyncio.run(AuditService.get_audit_logs(session, query))
+
+    sql = str(session.statement.compile(dialect=postgresql.dialect()))
+    assert "(auditlog.created_at, auditlog.id) < (" in sql and "OFFSET" not in sql
+    assert [item.id for item in result["items"]] == [10, 9]
+    assert result["total"] is None
+    assert decode_cursor(result["next_cursor"]) == {"created_at": created_at.isoformat(), "id": 9}
+
+def test_parse_detail_filters():
+    assert parse_detail_filters(["sales_record_id=123", "stored_filename=abc.pdf", "file_names=[\"a.pdf\"]"]) == {
+        "sales_record_id": 123,
+        "stored_filename": "abc.pdf",
+        "file_names": ["a.pdf"],
+    }
+    with pytest.raises(ValueError):
+        parse_detail_filters(["sales_record_id"])
+
+def test_detail_filter_uses_jsonb_containment():
+    conditions = AuditService.build_conditions(AuditLogQuery(details={"sales_record_id": 123}))
+    sql = str(conditions[0].compile(dialect=postgresql.dialect()))
+    assert sql.startswith("auditlog.details @> ")
+
+def test_details_are_returned_as_json_text():
+    assert details_to_text({"file_names": ["合同.pdf"]}) == '{"file_names": ["合同.pdf"]}'
+    assert details_to_text(None) is None
+
+def export_row(id, details=None):
+    return {
+        "id": id, "created_at": datetime(2026, 10, 1, tzinfo=timezone.utc), "user_id": 1, "user_name": "张三",
+        "action": "create", "resource_type": "sales_record", "resource_id": 5, "description": "创建",
+        "details": details, "success": True, "error_message": None, "ip_address": None, "user_agent": None,
+    }
+
+def test_export_streams_gzip_in_batches():
+    class StreamResult:
+        closed = False
+
+        def mappings(self):
+            return self
+
+        async def partitions(self):
+            yield [export_row(1, {"a": 1})]
+            yield [export_row(2)]
+
+        async def close(self):
+            self.closed = True
+
+    class StreamSession:
+        result = StreamResult()
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def stream(self, statement):
+            self.statement = statement
+            return self.result
+
+    session = StreamSession()
+
+    async def collect(format):
+        return [chunk async for chunk in AuditService.export_audit_logs(AuditLogQuery(user_id=1), format, lambda: session)]
+
+    lines = gzip.decompress(b"".join(asyncio.run(collect("jsonl")))).decode("utf-8").splitlines()
+    assert [json.loads(line)["details"] for line in lines] == [{"a": 1}, None]
+    assert json.loads(lines[0])["user_name"] == "张三"
+    assert session.result.closed
+    sql = str(session.statement.compile(dialect=postgresql.dialect()))
+    assert "auditlog.user_id = " in sql and "ORDER BY auditlog.created_at, auditlog.id" in sql
+
+    rows = list(csv.reader(io.StringIO(gzip.decompress(b"".join(asyncio.run(collect("csv")))).decode("utf-8"))))
+    assert rows[0] == list(EXPORT_COLUMNS)
+    assert rows[1][EXPORT_COLUMNS.index("details")] == '{"a": 1}'
+    assert len(rows) == 3
+
+def test_encode_export_rows_csv_header_only():
+    assert encode_export_rows([], "csv", header=True).decode("utf-8").startswith("id,created_at,user_id")
+    assert encode_export_rows([], "jsonl") == b""
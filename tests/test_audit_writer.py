@@ -0,0 +1,162 @@
+import asyncio
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import DataError, OperationalError
+
+from app.models.audit_log import AuditAction, AuditResourceType
+from app.services.audit_service import AuditService
+from app.services.audit_writer import AuditLogWriter
+
+
+class RecordingSession:
+    """记录每个批次写入的行数"""
+
+    def __init__(self, batches):
+        self.batches = batches
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement):
+        compiled = statement.compile(dialect=postgresql.dialect())
+        self.batches.append(len([key for key in compiled.params if key.startswith("action")]))
+
+    async def commit(self):
+        pass
+
+
+class FailingSession(RecordingSession):
+    """前 transient_failures 次写入抛出连接错误，包含 bad_resource_id 的批次抛出数据错误"""
+
+    def __init__(self, batches, state, bad_resource_id=None):
+        super().__init__(batches)
+        self.state = state
+        self.bad_resource_id = bad_resource_id
+
+    async def execute(self, statement):
+        compiled = statement.compile(dialect=postgresql.dialect())
+        if self.state["transient_failures"] > 0:
+            self.state["transient_failures"] -= 1
+            raise OperationalError("INSERT", {}, ConnectionResetError("connection reset"))
+        resource_ids = [value for key, value in compiled.params.items() if key.startswith("resource_id")]
+        if self.bad_resource_id in resource_ids:
+            raise DataError("INSERT", {}, ValueError("invalid input"))
+        await super().execute(statement)
+
+
+def audit_values(index):
+    return AuditService.build_audit_values(
+        user_id=1,
+        action=AuditAction.UPDATE,
+        resource_type=AuditResourceType.SALES_RECORD,
+        resource_id=index,
+        description=f"更新销售记录 {index}",
+        details={"index": index},
+    )
+
+def test_build_audit_values_normalizes_details():
+    values = audit_values(3)
+    assert values["action"] == "update"
+    assert values["details"] == {"index": 3}
+    assert values["created_at"] == values["updated_at"]
+
+def test_writer_batches_by_size_and_flushes_on_stop():
+    batches = []
+
+    async def run():
+        writer = AuditLogWriter(lambda: RecordingSession(batches), batch_size=4, flush_interval=60)
+        writer.start()
+        for index in range(10):
+            await writer.enqueue(audit_values(index))
+        await writer.stop()
+        return writer.stats()
+
+    stats = asyncio.run(run())
+    assert batches == [4, 4, 2]
+    assert stats["written"] == 10 and stats["batches"] == 3 and not stats["running"]
+
+def test_writer_flushes_partial_batch_after_interval():
+    batches = []
+
+    async def run():
+        writer = AuditLogWriter(lambda: RecordingSession(batches), batch_size=100, flush_interval=0.05)
+        writer.start()
+        await writer.enqueue(audit_values(1))
+        await writer.flush()
+        flushed = list(batches)
+        await writer.stop()
+        return flushed
+
+    assert asyncio.run(run()) == [1]
+
+def test_writer_applies_backpressure_when_queue_is_full():
+    batches = []
+
+    async def run():
+        writer = AuditLogWriter(lambda: RecordingSession(batches), batch_size=2, flush_interval=60, max_queue_size=2)
+        writer.start()
+        # 队列容量只有2，入队方需要等待后台任务取走事件才能继续
+        await asyncio.wait_for(
+            asyncio.gather(*(writer.enqueue(audit_values(index)) for index in range(8))),
+            timeout=5
+        )
+        await writer.stop()
+        return writer.stats()
+
+    assert asyncio.run(run())["written"] == 8
+
+def test_writer_retries_transient_errors():
+    batches = []
+    state = {"transient_failures": 2}
+
+    async def run():
+        writer = AuditLogWriter(
+            lambda: FailingSession(batches, state), batch_size=5, flush_interval=60, retry_backoff=0.001
+        )
+        writer.start()
+        for index in range(5):
+            await writer.enqueue(audit_values(index))
+        await writer.stop()
+        return writer.stats()
+
+    stats = asyncio.run(run())
+    assert batches == [5]
+    assert stats["written"] == 5 and stats["failed"] == 0 and stats["retries"] == 2
+
+def test_writer_drops_batch_after_retries_are_exhausted():
+    state = {"transient_failures": 10}
+
+    async def run():
+        writer = AuditLogWriter(
+            lambda: FailingSession([], state), batch_size=5, flush_interval=60, max_retries=2, retry_backoff=0.001
+        )
+        writer.start()
+        for index in range(3):
+            await writer.enqueue(audit_values(index))
+        await writer.stop()
+        return writer.stats()
+
+    stats = asyncio.run(run())
+    # 临时错误不拆分批次
+    assert stats["failed"] == 3 and stats["written"] == 0 and stats["retries"] == 2
+
+def test_writer_bisects_batch_to_drop_only_bad_event():
+    batches = []
+    state = {"transient_failures": 0}
+
+    async def run():
+        writer = AuditLogWriter(
+            lambda: FailingSession(batches, state, bad_resource_id=3), batch_size=8, flush_interval=60
+        )
+        writer.start()
+        for index in range(8):
+            await writer.enqueue(audit_values(index))
+        await writer.stop()
+        return writer.stats()
+
+    stats = asyncio.run(run())
+    assert stats["written"] == 7 and stats["failed"] == 1 and stats["retries"] == 0
+    assert sum(batches) == 7
@@ -0,0 +1,63 @@
+import asyncio
+
+from sqlalchemy.dialects import postgresql
+
+from app.services import blob_service
+from app.services.blob_service import BlobService
+from app.storage import LocalStorage
+from app.utils.file_handler import FileHandler
+
+STORED_FILENAME = "0123456789abcdef0123456789abcdef.pdf"
+
+
+class ScalarResult:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar_one(self):
+        return self.value
+
+    def scalar_one_or_none(self):
+        return self.value
+
+
+class RecordingSession:
+    """记录执行的SQL，按顺序返回预设的标量结果"""
+
+    def __init__(self, *values):
+        self.values = list(values)
+        self.statements = []
+        self.commits = 0
+
+    async def execute(self, statement, params=None):
+        self.statements.append(str(statement.compile(dialect=postgresql.dialect())))
+        return ScalarResult(self.values.pop(0) if self.values else None)
+
+    async def commit(self):
+        self.commits += 1
+
+
+def test_add_reference_locks_and_upserts():
+    session = RecordingSession(None, 2)
+    ref_count = asyncio.run(BlobService.add_reference(session, STORED_FILENAME, "0123", 10, "application/pdf"))
+
+    assert ref_count == 2
+    assert "pg_advisory_xact_lock" in session.statements[0]
+    assert "ON CONFLICT (stored_filename) DO UPDATE SET ref_count = (blob.ref_count + " in session.statements[1]
+    assert session.statements[1].endswith("RETURNING blob.ref_count")
+
+def test_purge_deletes_file_only_without_references(tmp_path, monkeypatch):
+    handler = FileHandler(str(tmp_path / "files"))
+    monkeypatch.setattr(blob_service, "storage", LocalStorage(handler))
+    file_path = handler.get_sharded_path(STORED_FILENAME)
+    file_path.parent.mkdir(parents=True)
+    file_path.write_bytes(b"pdf")
+
+    referenced = RecordingSession(None, 1)
+    assert not asyncio.run(BlobService.purge_if_unreferenced(referenced, STORED_FILENAME))
+    assert file_path.exists() and referenced.commits == 1
+
+    unreferenced = RecordingSession(None, 0)
+    assert asyncio.run(BlobService.purge_if_unreferenced(unreferenced, STORED_FILENAME))
+    assert not file_path.exists()
+    assert unreferenced.statements[-1].startswith("DELETE FROM blob")
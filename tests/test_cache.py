@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from app.core.cache import AsyncCache, MemoryCacheBackend
+
+
+def test_memory_backend_lru_eviction():
+    async def run():
+        backend = MemoryCacheBackend(max_entries=2)
+        await backend.set("a", 1, ttl=60)
+        await backend.set("b", 2, ttl=60)
+        await backend.get("a")          # a 变为最近使用
+        await backend.set("c", 3, ttl=60)
+        return await backend.get("a"), await backend.get("b"), await backend.get("c")
+
+    assert asyncio.run(run()) == ((True, 1), (False, None), (True, 3))
+
+def test_memory_backend_ttl_expiry():
+    async def run():
+        backend = MemoryCacheBackend()
+        await backend.set("a", 1, ttl=-1)
+        return await backend.get("a")
+
+    assert asyncio.run(run()) == (False, None)
+
+def test_concurrent_misses_are_coalesced():
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def run():
+        cache = AsyncCache(MemoryCacheBackend(), ttl=60)
+        results = await asyncio.gather(*[cache.get_or_load("k", loader) for _ in range(10)])
+        return results, cache
+
+    results, cache = asyncio.run(run())
+    assert results == ["value"] * 10
+    assert calls == 1
+    assert cache.misses == 1
+
+def test_loader_error_is_shared_and_not_cached():
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def run():
+        cache = AsyncCache(MemoryCacheBackend(), ttl=60)
+        results = await asyncio.gather(*[cache.get_or_load("k", loader) for _ in range(3)], return_exceptions=True)
+        with pytest.raises(RuntimeError):
+            await cache.get_or_load("k", loader)
+        return results
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert calls == 2
+
+def test_invalidate_prefix_drops_entries_and_inflight_results():
+    values = iter(["old", "new"])
+
+    async def slow_loader():
+        await asyncio.sleep(0.01)
+        return next(values)
+
+    async def run():
+        cache = AsyncCache(MemoryCacheBackend(), ttl=60)
+        await cache.get_or_load("stats:user:1", lambda: asyncio.sleep(0, "cached"))
+        await cache.get_or_load("other", lambda: asyncio.sleep(0, "kept"))
+
+        # 加载期间失效：结果返回给调用者但不写入缓存
+        task = asyncio.create_task(cache.get_or_load("stats:global", slow_loader))
+        await asyncio.sleep(0)
+        await cache.invalidate_prefix("stats:")
+        first = await task
+
+        second = await cache.get_or_load("stats:global", slow_loader)
+        reloaded = await cache.get_or_load("stats:user:1", lambda: asyncio.sleep(0, "reloaded"))
+        kept = await cache.get_or_load("other", lambda: asyncio.sleep(0, "unexpected"))
+        return first, second, reloaded, kept
+
+    assert asyncio.run(run()) == ("old", "new", "reloaded", "kept")
+
+def test_zero_ttl_disables_cache():
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    async def run():
+        cache = AsyncCache(MemoryCacheBackend(), ttl=0)
+        return [await cache.get_or_load("k", loader) for _ in range(3)]
+
+    assert asyncio.run(run()) == [1, 2, 3]
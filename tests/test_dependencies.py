@@ -0,0 +1,42 @@
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy.orm.exc import DetachedInstanceError
+
+from app.core.dependencies import USER_CACHE_COLUMNS, build_cached_user
+from app.schemas.user import UserResponse
+
+
+def cached_values(**overrides):
+    values = {
+        "id": 7,
+        "phone": "13800000007",
+        "email": "user7@example.com",
+        "full_name": "测试用户",
+        "role": "normal",
+        "function": "logistics",
+        "is_active": True,
+        "is_superuser": False,
+        "created_at": datetime(2025, 1, 1, tzinfo=timezone.utc),
+        "updated_at": datetime(2025, 1, 2, tzinfo=timezone.utc),
+    }
+    values.update(overrides)
+    return values
+
+def test_user_cache_columns_exclude_password_hash():
+    keys = {column.key for column in USER_CACHE_COLUMNS}
+    assert "password_hash" not in keys
+    assert set(cached_values()) == keys
+
+def test_build_cached_user_supports_permission_checks():
+    user = build_cached_user(cached_values())
+    assert user.id == 7
+    assert user.has_logistics_function()
+    assert not user.has_sales_function()
+    assert not user.can_approve_final()
+    assert UserResponse.model_validate(user).full_name == "测试用户"
+
+def test_build_cached_user_does_not_expose_password_hash():
+    user = build_cached_user(cached_values())
+    with pytest.raises(DetachedInstanceError):
+        user.password_hash
@@ -0,0 +1,89 @@
+import asyncio
+import hashlib
+import io
+
+import pytest
+from fastapi import UploadFile
+
+from app.utils.file_handler import FileHandler, FileSizeExceededError
+
+
+def store(handler: FileHandler, upload_file: UploadFile, max_size=None) -> str:
+    """与上传接口相同：暂存后放入存储"""
+    file_md5, tmp_path, _ = asyncio.run(handler.stage_upload_file(upload_file, max_size=max_size))
+    stored_filename = handler.generate_stored_filename(upload_file.filename, file_md5)
+    handler.place_staged_file(tmp_path, stored_filename)
+    return stored_filename
+
+
+def test_stage_upload_file_hashes_and_stores_in_one_pass(tmp_path):
+    handler = FileHandler(str(tmp_path / "files"))
+    content = b"x" * 3_000_000
+
+    file_md5, tmp_path, file_size = asyncio.run(
+        handler.stage_upload_file(UploadFile(io.BytesIO(content), filename="合同.pdf"), max_size=len(content))
+    )
+    stored_filename = handler.generate_stored_filename("合同.pdf", file_md5)
+
+    assert file_md5 == hashlib.md5(content).hexdigest()
+    assert stored_filename == f"{file_md5}.pdf"
+    assert file_size == len(content)
+    assert handler.place_staged_file(tmp_path, stored_filename)
+    assert handler.get_file_path(stored_filename).read_bytes() == content
+    assert list(handler.tmp_dir.iterdir()) == []
+
+def test_stage_upload_file_rejects_oversized_file(tmp_path):
+    handler = FileHandler(str(tmp_path / "files"))
+
+    with pytest.raises(FileSizeExceededError):
+        asyncio.run(handler.stage_upload_file(UploadFile(io.BytesIO(b"x" * 2048), filename="a.txt"), max_size=1024))
+
+    assert list(handler.tmp_dir.iterdir()) == []
+    assert [path.name for path in handler.upload_dir.iterdir()] == [".tmp"]
+
+def test_files_are_stored_sharded_and_legacy_files_stay_readable(tmp_path):
+    handler = FileHandler(str(tmp_path / "files"))
+    legacy_name = "0123456789abcdef0123456789abcdef.pdf"
+    handler.get_legacy_path(legacy_name).write_bytes(b"legacy")
+
+    stored_filename = store(handler, UploadFile(io.BytesIO(b"new"), filename="a.txt"))
+    assert handler.get_file_path(stored_filename).relative_to(handler.upload_dir).parts == (
+        stored_filename[:2], stored_filename[2:4], stored_filename
+    )
+    assert handler.get_file_path(legacy_name) == handler.get_legacy_path(legacy_name)
+
+    assert list(handler.iter_legacy_files()) == [legacy_name]
+    assert handler.move_to_sharded(legacy_name)
+    assert handler.get_file_path(legacy_name) == handler.upload_dir / "01" / "23" / legacy_name
+    assert handler.get_file_path(legacy_name).read_bytes() == b"legacy"
+    assert list(handler.iter_legacy_files()) == []
+
+    assert handler.delete_file(legacy_name)
+    assert not handler.file_exists(legacy_name)
+
+def test_delete_finds_file_moved_by_migration_during_delete(tmp_path):
+    handler = FileHandler(str(tmp_path / "files"))
+    name = "0123456789abcdef0123456789abcdef.pdf"
+    legacy_path = handler.get_legacy_path(name)
+    legacy_path.write_bytes(b"legacy")
+
+    class MigratedOnAccess(type(legacy_path)):
+        """第一次访问平铺路径之前，迁移工具恰好把文件移到分片布局"""
+
+        def _migrate(self):
+            if legacy_path.exists():
+                handler.move_to_sharded(name)
+
+        def exists(self, **kwargs):
+            self._migrate()
+            return super().exists(**kwargs)
+
+        def unlink(self, missing_ok=False):
+            self._migrate()
+            return super().unlink(missing_ok)
+
+    handler.get_legacy_path = lambda stored_filename: MigratedOnAccess(legacy_path)
+
+    assert handler.delete_file(name)
+    assert not handler.get_sharded_path(name).exists()
+    assert not legacy_path.exists()
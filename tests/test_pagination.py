@@ -0,0 +1,24 @@
+import pytest
+
+from app.utils.pagination import encode_cursor, decode_cursor
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor({"id": 12345})
+    assert decode_cursor(cursor) == {"id": 12345}
+
+def test_cursor_is_url_safe():
+    cursor = encode_cursor({"id": 2 ** 40, "created_at": "2025-01-01T00:00:00+00:00"})
+    assert "=" not in cursor
+    assert "+" not in cursor and "/" not in cursor
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "", encode_cursor({"id": 1})[:-3] + "!!!"])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+def test_cursor_must_be_object():
+    import base64
+    cursor = base64.urlsafe_b64encode(b"[1, 2]").decode().rstrip("=")
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
@@ -0,0 +1,114 @@
+import asyncio
+import time
+from concurrent.futures import Executor, Future
+from concurrent.futures.process import BrokenProcessPool
+
+from app.services import preview_service
+from app.services.preview_service import PreviewGenerator
+from app.storage import LocalStorage
+from app.utils import preview_renderer
+from app.utils.file_handler import FileHandler
+
+STORED_FILENAME = "0123456789abcdef0123456789abcdef.png"
+
+
+def test_can_preview_depends_on_type_and_optional_dependency(monkeypatch):
+    monkeypatch.setattr(preview_renderer, "PILLOW_AVAILABLE", True)
+    monkeypatch.setattr(preview_renderer, "PYMUPDF_AVAILABLE", False)
+    assert preview_renderer.can_preview("image/png")
+    assert not preview_renderer.can_preview("application/pdf")
+    assert not preview_renderer.can_preview("text/plain")
+
+def test_preview_is_generated_once_and_cached_next_to_original(tmp_path, monkeypatch):
+    handler = FileHandler(str(tmp_path / "files"))
+    source = handler.get_sharded_path(STORED_FILENAME)
+    source.parent.mkdir(parents=True)
+    source.write_bytes(b"png")
+    renders = []
+
+    def fake_render(source_path, target_path, content_type, max_size):
+        renders.append(source_path)
+        time.sleep(0.05)
+        with open(target_path, "wb") as output:
+            output.write(b"jpeg")
+
+    monkeypatch.setattr(preview_service, "file_handler", handler)
+    monkeypatch.setattr(preview_service, "storage", LocalStorage(handler))
+    monkeypatch.setattr(preview_service, "render_preview", fake_render)
+    generator = PreviewGenerator(max_workers=0, max_size=64)
+
+    async def run():
+        return await asyncio.gather(*(generator.get_preview(STORED_FILENAME, "image/png") for _ in range(5)))
+
+    paths = asyncio.run(run())
+    assert len(renders) == 1 and generator.generated == 1
+    assert paths[0] == source.parent / f"{STORED_FILENAME}.preview-64.jpg"
+    assert asyncio.run(generator.get_preview(STORED_FILENAME, "image/png")).read_bytes() == b"jpeg"
+    assert len(renders) == 1
+    # 未启动时不预生成
+    assert not generator.schedule(STORED_FILENAME, "image/png")
+
+    assert handler.delete_file(STORED_FILENAME)
+    assert list(source.parent.iterdir()) == []
+
+
+def test_broken_pool_is_replaced_only_once(tmp_path, monkeypatch):
+    handler = FileHandler(str(tmp_path / "files"))
+    names = [f"{index:032x}.png" for index in range(3)]
+    for name in names:
+        source = handler.get_sharded_path(name)
+        source.parent.mkdir(parents=True, exist_ok=True)
+        source.write_bytes(b"png")
+
+    class BrokenExecutor(Executor):
+        def __init__(self):
+            self.shutdowns = 0
+
+        def submit(self, fn, *args, **kwargs):
+            future = Future()
+            future.set_exception(BrokenProcessPool("worker crashed"))
+            return future
+
+        def shutdown(self, wait=True, *, cancel_futures=False):
+            self.shutdowns += 1
+
+    monkeypatch.setattr(preview_service, "file_handler", handler)
+    monkeypatch.setattr(preview_service, "storage", LocalStorage(handler))
+    generator = PreviewGenerator(max_workers=1, max_size=64)
+    broken = BrokenExecutor()
+    replacements = []
+
+    def create_executor():
+        replacements.append(object())
+        return replacements[-1]
+
+    generator._executor = broken
+    monkeypatch.setattr(generator, "_create_executor", create_executor)
+
+    async def run():
+        return await asyncio.gather(
+            *(generator.get_preview(name, "image/png") for name in names),
+            return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, BrokenProcessPool) for result in results)
+    assert generator.failed == 3
+    # 同一个进程池上的任务都失败，只重建一次，新的进程池不会被关闭
+    assert broken.shutdowns == 1 and len(replacements) == 1
+    assert generator._executor is replacements[0]
+
+
+def test_preview_of_file_in_flat_layout(tmp_path, monkeypatch):
+    handler = FileHandler(str(tmp_path / "files"))
+    handler.get_legacy_path(STORED_FILENAME).write_bytes(b"png")
+    monkeypatch.setattr(preview_service, "file_handler", handler)
+    monkeypatch.setattr(preview_service, "storage", LocalStorage(handler))
+    monkeypatch.setattr(preview_renderer, "_render_image", lambda source_path, max_size, quality: b"jpeg")
+    generator = PreviewGenerator(max_workers=0, max_size=64)
+
+    # 分片目录还不存在，生成预览图时创建
+    path = asyncio.run(generator.get_preview(STORED_FILENAME, "image/png"))
+    assert path == handler.get_preview_path(STORED_FILENAME, 64)
+    assert path.read_bytes() == b"jpeg"
+    assert generator.generated == 1 and generator.failed == 0
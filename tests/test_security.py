@@ -0,0 +1,56 @@
+import asyncio
+import threading
+import time
+
+from app.core.security import PasswordHashPool, get_password_hash, verify_password
+
+
+def test_password_hash_pool_runs_off_event_loop_thread():
+    pool = PasswordHashPool(max_workers=1)
+
+    async def run():
+        return await pool.run(lambda: threading.current_thread().name)
+
+    try:
+        assert asyncio.run(run()).startswith("password-hash")
+        assert pool.stats()["completed"] == 1
+    finally:
+        pool.shutdown()
+
+def test_password_hash_pool_records_queue_depth():
+    pool = PasswordHashPool(max_workers=1)
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        task = asyncio.create_task(ticker())
+        await asyncio.gather(*(pool.run(time.sleep, 0.05) for _ in range(4)))
+        task.cancel()
+        return ticks
+
+    try:
+        # 计算期间事件循环仍然可以调度其他协程
+        assert asyncio.run(run()) > 10
+        stats = pool.stats()
+        # 第一个任务可能在其余任务提交前就已开始执行
+        assert stats["peak_queued"] in (3, 4)
+        assert stats["queued"] == 0 and stats["running"] == 0
+        assert stats["completed"] == 4
+    finally:
+        pool.shutdown()
+
+def test_password_hash_pool_inline_when_disabled():
+    pool = PasswordHashPool(max_workers=0)
+    hashed = get_password_hash("secret-password")
+
+    async def run():
+        return await pool.run(verify_password, "secret-password", hashed)
+
+    assert asyncio.run(run()) is True
+    assert pool.stats()["completed"] == 0
@@ -0,0 +1,60 @@
+import asyncio
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.services.sales_rollup_service import SalesRollupService
+from app.services.stats_service import StatsService, count_buckets, current_month_range
+
+
+def test_current_month_range():
+    first_day, next_month = current_month_range(datetime(2025, 6, 15, 8, 30, tzinfo=timezone.utc))
+    assert first_day == datetime(2025, 6, 1, tzinfo=timezone.utc)
+    assert next_month == datetime(2025, 7, 1, tzinfo=timezone.utc)
+
+def test_current_month_range_december():
+    first_day, next_month = current_month_range(datetime(2025, 12, 31, 23, 59, tzinfo=timezone.utc))
+    assert first_day == datetime(2025, 12, 1, tzinfo=timezone.utc)
+    assert next_month == datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+def test_dashboard_stats_query_scopes_sales_to_user():
+    normal = StatsService.build_dashboard_stats_query(SimpleNamespace(id=7, is_superuser=False))
+    superuser = StatsService.build_dashboard_stats_query(SimpleNamespace(id=1, is_superuser=True))
+
+    normal_sql = str(normal.compile(dialect=postgresql.dialect()))
+    superuser_sql = str(superuser.compile(dialect=postgresql.dialect()))
+
+    # 一条语句完成所有统计
+    assert normal_sql.count("SELECT") == 1
+    assert "FILTER" in normal_sql
+    # 只有本月销售额按用户过滤，订单数量统计所有人
+    assert "sales_daily_rollup.user_id" in normal_sql
+    assert "sales_daily_rollup.user_id" not in superuser_sql
+
+@pytest.mark.parametrize("bucket, start, end, expected", [
+    ("day", date(2025, 1, 1), date(2025, 1, 1), 1),
+    ("day", date(2024, 1, 1), date(2024, 12, 31), 366),
+    ("week", date(2025, 6, 2), date(2025, 6, 8), 1),    # 周一到周日
+    ("week", date(2025, 6, 8), date(2025, 6, 9), 2),    # 跨周
+    ("month", date(2024, 11, 30), date(2025, 2, 1), 4),
+])
+def test_count_buckets(bucket, start, end, expected):
+    assert count_buckets(bucket, start, end) == expected
+
+
+class RecordingSession:
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(str(statement.compile(dialect=postgresql.dialect())))
+
+def test_rollup_remove_record_locks_row_before_reading_it():
+    session = RecordingSession()
+    asyncio.run(SalesRollupService.remove_record(session, 5))
+
+    lock, apply = session.statements
+    assert lock.startswith("SELECT salesrecord.id") and lock.endswith("FOR UPDATE")
+    assert apply.startswith("INSERT INTO sales_daily_rollup")
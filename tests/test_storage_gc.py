@@ -0,0 +1,83 @@
+import asyncio
+import os
+import time
+
+from app.services.storage_gc_service import StorageGCService
+from app.storage import LocalStorage
+from app.storage.base import StoredObject
+from app.utils.file_handler import FileHandler
+
+
+def write(handler: FileHandler, name: str, content: bytes = b"x") -> None:
+    path = handler.get_sharded_path(name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+
+
+async def collect(iterator):
+    return [item async for item in iterator]
+
+
+def test_local_objects_are_listed_in_byte_order_without_previews(tmp_path):
+    handler = FileHandler(str(tmp_path / "files"))
+    names = ["ff00aa.pdf", "0a1b2c.png", "0a1b2c.jpg", "0a1c00.txt", "a0b1c2.pdf"]
+    for name in names:
+        write(handler, name)
+    write(handler, "0a1b2c.png.preview-320.jpg")
+    (handler.upload_dir / "legacy.pdf").write_bytes(b"x")
+
+    objects = asyncio.run(collect(LocalStorage(handler).iter_objects(page_size=2)))
+
+    assert [stored_object.key for stored_object in objects] == sorted(names)
+    assert StorageGCService.count_legacy_files(handler) == 1
+
+def test_merge_reports_orphans_and_missing_files():
+    async def objects():
+        for key in ("a.pdf", "b.pdf", "d.pdf"):
+            yield StoredObject(key, 1, 0.0)
+
+    async def referenced():
+        for name in ("b.pdf", "c.pdf", "d.pdf", "e.pdf"):
+            yield name
+
+    pairs = asyncio.run(collect(StorageGCService.merge(objects(), referenced())))
+
+    assert [(name, stored_object is not None, is_referenced) for name, stored_object, is_referenced in pairs] == [
+        ("a.pdf", True, False),
+        ("b.pdf", True, True),
+        ("c.pdf", False, True),
+        ("d.pdf", True, True),
+        ("e.pdf", False, True),
+    ]
+
+def test_clean_tmp_files_keeps_recent_uploads(tmp_path):
+    handler = FileHandler(str(tmp_path / "files"))
+    stale = handler.tmp_dir / "stale.part"
+    stale.write_bytes(b"x" * 10)
+    old = time.time() - 7200
+    os.utime(stale, (old, old))
+    recent = handler.tmp_dir / "recent.part"
+    recent.write_bytes(b"x")
+
+    report = StorageGCService.clean_tmp_files(handler, delete=True, grace_seconds=3600)
+
+    assert report == {"tmp_files": 1, "tmp_bytes": 10, "tmp_deleted": 1}
+    assert not stale.exists() and recent.exists()
+
+def test_stray_files_in_shard_dirs_do_not_break_order_and_are_swept(tmp_path):
+    handler = FileHandler(str(tmp_path / "files"))
+    names = ["0a1b2c.png", "0a1b3d.pdf", "0a1c00.txt"]
+    for name in names:
+        write(handler, name)
+    # 渲染中断留下的临时文件排在十六进制文件名之后
+    stray = handler.get_sharded_path("0a1b2c.png").with_name("tmpk3j2x9.part")
+    stray.write_bytes(b"x")
+    old = time.time() - 7200
+    os.utime(stray, (old, old))
+
+    objects = asyncio.run(collect(LocalStorage(handler).iter_objects()))
+    assert [stored_object.key for stored_object in objects] == names
+
+    report = asyncio.run(StorageGCService.check_previews(handler, 320, delete=True, grace_seconds=3600))
+    assert report["strays"] == 1 and report["strays_deleted"] == 1
+    assert not stray.exists()
@@ -0,0 +1,46 @@
+import asyncio
+import io
+import os
+import zipfile
+from datetime import datetime
+
+from app.storage import LocalStorage
+from app.utils.file_handler import FileHandler
+from app.utils.zip_stream import ZipEntry, iter_zip, unique_arcname
+
+
+def test_iter_zip_streams_readable_archive(tmp_path):
+    handler = FileHandler(str(tmp_path / "files"))
+    text = b"line\n" * 100_000
+    image = os.urandom(300_000)
+    for name, content in (("notes.txt", text), ("photo.jpg", image)):
+        path = handler.get_sharded_path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+    entries = [
+        ZipEntry("销售附件/说明.txt", "notes.txt", "text/plain", len(text), datetime(2026, 10, 17, 9, 30)),
+        ZipEntry("后勤附件/photo.jpg", "photo.jpg", "image/jpeg", len(image), datetime(1970, 1, 1)),
+    ]
+
+    async def collect():
+        return [chunk async for chunk in iter_zip(entries, LocalStorage(handler), chunk_size=64 * 1024)]
+
+    chunks = asyncio.run(collect())
+
+    assert len(chunks) > 2
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+        assert archive.testzip() is None
+        text_info, image_info = archive.infolist()
+        assert text_info.filename == "销售附件/说明.txt"
+        assert text_info.compress_type == zipfile.ZIP_DEFLATED
+        assert text_info.compress_size < text_info.file_size
+        assert text_info.date_time == (2026, 10, 17, 9, 30, 0)
+        assert image_info.compress_type == zipfile.ZIP_STORED
+        assert image_info.date_time == (1980, 1, 1, 0, 0, 0)
+        assert archive.read(image_info) == image
+
+def test_unique_arcname_appends_counter():
+    used = set()
+    assert unique_arcname("销售附件/报价单.pdf", used) == "销售附件/报价单.pdf"
+    assert unique_arcname("销售附件/报价单.PDF", used) == "销售附件/报价单 (2).PDF"
+    assert unique_arcname("销售附件/报价单.pdf", used) == "销售附件/报价单 (3).pdf"